@@ -12,24 +12,72 @@ def create_app(config_name='default'):
     app = Flask(__name__, template_folder="templates", static_folder="static")
     app.config.from_object(config[config_name])
 
+    from app.engine_profiles import apply_engine_options, register_connect_pragmas
+    profile = apply_engine_options(app)
+
     db.init_app(app)
     login_manager.init_app(app)
 
+    if profile and profile.get('pragmas'):
+        with app.app_context():
+            register_connect_pragmas(db.engine, profile['pragmas'])
+
+    from app.service.stats_service import stats_service
+    from app.service.password_service import password_hasher
+    from app.service.identity_cache import identity_cache
+    from app.service.valuation_service import valuation_service
+    from app.service.render_cache import render_cache
+    from app.service.lookup_cache import lookup_cache
+    from app.service.instrumentation import instrumentation
+    from app.service.job_service import job_queue
+    from app.service.session_store import server_sessions
+    from app.service.assets import assets
+    from app.service.response_middleware import response_middleware
+    stats_service.init_app(app)
+    password_hasher.init_app(app)
+    identity_cache.init_app(app)
+    valuation_service.init_app(app)
+    render_cache.init_app(app)
+    lookup_cache.init_app(app)
+    instrumentation.init_app(app)
+    job_queue.init_app(app)
+    server_sessions.init_app(app)
+    assets.init_app(app)
+    response_middleware.init_app(app)
+
+    # Регистрирует DDL полнотекстового индекса оборудования до первого create_all()
+    from app.model import equipment_search  # noqa: F401
+    # Регистрирует таблицу истории и события сессии, которые её заполняют
+    from app.model import equipment_history  # noqa: F401
+    # Таблица серверных сессий создаётся вместе с остальными, даже если сейчас сессии в cookie
+    from app.model import server_session  # noqa: F401
+
     from app.controller.main_controller import bp as main_bp
     from app.controller.equipment_controller import bp as equipment_bp
     from app.controller.auth_controller import bp as auth_bp
     from app.controller.users_controller import bp as users_bp
+    from app.controller.api_controller import bp as api_bp
+    from app.controller.reports_controller import bp as reports_bp
+    from app.controller.lookups_controller import bp as lookups_bp
+    from app.controller.jobs_controller import bp as jobs_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(equipment_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(users_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(reports_bp)
+    app.register_blueprint(lookups_bp)
+    app.register_blueprint(jobs_bp)
+
+    from app.bootstrap import register_commands
+    register_commands(app)
 
     return app
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    from app.model.user import User
-    # Исправлено: используем современный метод Session.get() вместо устаревшего Query.get()
-    return db.session.get(User, int(user_id))
\ No newline at end of file
+    from app.service.identity_cache import identity_cache
+    # Сначала смотрим в TTL+LRU кэш, в БД идём только при промахе
+    return identity_cache.load(int(user_id))
\ No newline at end of file
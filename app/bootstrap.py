@@ -0,0 +1,80 @@
+import os
+
+import click
+from flask.cli import with_appcontext
+
+from app.migrations import schema_is_current, upgrade_schema
+from app.model.user import UserRepo
+
+
+def init_database():
+    if schema_is_current():
+        return None
+    # Создаёт таблицы и догоняет схему существующей БД (например, новые индексы)
+    return upgrade_schema()
+
+
+def seed_admin(username='admin', password=None):
+    repo = UserRepo()
+    # Проверка существования дешёвая, хэш пароля считаем только если администратора ещё нет
+    if repo.get_by_username(username):
+        return None
+    return repo.add(username, password or os.environ.get('ADMIN_PASSWORD') or 'password123', 'admin')
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Создать таблицы и применить миграции схемы."""
+    applied = init_database()
+    if applied is None:
+        click.echo("Схема БД актуальна")
+    else:
+        click.echo("Схема БД обновлена")
+
+
+@click.command('seed-admin')
+@click.option('--username', default='admin', show_default=True)
+@click.option('--password', default=None, help="Пароль (по умолчанию ADMIN_PASSWORD или password123).")
+@with_appcontext
+def seed_admin_command(username, password):
+    """Создать учётную запись администратора, если её ещё нет."""
+    if seed_admin(username, password) is None:
+        click.echo(f"Администратор '{username}' уже существует")
+    else:
+        click.echo(f"Администратор '{username}' создан")
+
+
+@click.command('sweep-sessions')
+@with_appcontext
+def sweep_sessions_command():
+    """Удалить истёкшие серверные сессии."""
+    from flask import current_app
+    from app.service.session_store import ServerSessionInterface
+
+    interface = current_app.session_interface
+    if not isinstance(interface, ServerSessionInterface):
+        click.echo("Сессии хранятся в cookie, чистить нечего")
+        return
+    click.echo(f"Удалено истёкших сессий: {interface.sweep()}")
+
+
+@click.command('build-assets')
+@click.option('--output', 'output_dir', type=click.Path(file_okay=False), default=None,
+              help="Каталог сборки (по умолчанию ASSETS_DIR или static/dist).")
+@with_appcontext
+def build_assets_command(output_dir):
+    """Собрать статику: минификация CSS и JS, хэш в именах, .gz/.br и manifest.json."""
+    from flask import current_app
+    from app.service.assets import brotli, build
+
+    output_dir = output_dir or current_app.extensions['assets']['dir']
+    manifest = build(current_app.static_folder, output_dir)
+    click.echo(f"Собрано файлов: {len(manifest)} в {output_dir}" + ("" if brotli else " (без .br: нет модуля brotli)"))
+
+
+def register_commands(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(seed_admin_command)
+    app.cli.add_command(sweep_sessions_command)
+    app.cli.add_command(build_assets_command)
@@ -0,0 +1,443 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Blueprint, request, jsonify, current_app, make_response, url_for
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.model.equipment import (BULK_UPDATE_FIELDS, EquipmentRepo, SORT_COLUMNS, check_lookups,
+                                 clean_equipment_changes)
+from app.model.equipment_history import EquipmentHistoryRepo
+from app.model.job import JobRepo
+from app.model.row_version import VersionConflict
+from app.model.table_version import TableVersionRepo
+from app.model.user import UserRepo
+from app.service.export_service import EXPORT_FIELDS, EXPORT_FORMATS
+from app.service.import_service import IMPORT_FORMATS, detect_format
+from app.service.job_service import job_queue
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+equipment_repo = EquipmentRepo()
+user_repo = UserRepo()
+version_repo = TableVersionRepo()
+history_repo = EquipmentHistoryRepo()
+job_repo = JobRepo()
+
+USER_FIELDS = ('id', 'username', 'role', 'version')
+# version нужна клиенту, чтобы изменить запись через PATCH без риска перезаписать чужие правки
+EQUIPMENT_FIELDS = EXPORT_FIELDS + ('version',)
+EQUIPMENT_UPDATE_FIELDS = ('name', 'type', 'model', 'inventory_number', 'status', 'location',
+                           'purchase_date', 'price', 'specification', 'user_id')
+# Поля, которые отдаются только по явному запросу в fields: для них нужны данные других таблиц
+EQUIPMENT_EXTRA_FIELDS = ('holder',)
+USER_EXTRA_FIELDS = ('equipment_count', 'equipment_total')
+
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+
+def checked_equipment_changes(values, allowed, equipment_id=None):
+    """Изменения оборудования из JSON после проверки типов; ValueError — ответ 400."""
+    values = clean_equipment_changes(values, allowed)
+    check_lookups(values)
+    if 'user_id' in values and user_repo.get_by_id(values['user_id']) is None:
+        raise ValueError(f"Пользователь с ID {values['user_id']} не найден")
+    if 'inventory_number' in values:
+        existing = equipment_repo.get_by_inventory_number(values['inventory_number'])
+        if existing is not None and existing.id != equipment_id:
+            raise ValueError(f"Инвентарный номер {values['inventory_number']} уже используется")
+    return values
+
+
+def api_login_required(view):
+    # В API вместо редиректа на форму входа отвечаем 401
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return api_error("Требуется аутентификация", 401)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def api_admin_required(view):
+    @wraps(view)
+    @api_login_required
+    def wrapper(*args, **kwargs):
+        if current_user.role != 'admin':
+            return api_error("Недостаточно прав", 403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def selected_fields(allowed, extra=()):
+    raw = request.args.get('fields')
+    if not raw:
+        return allowed
+    fields = tuple(field.strip() for field in raw.split(',') if field.strip())
+    unknown = [field for field in fields if field not in allowed and field not in extra]
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+    return fields
+
+
+def serialize(obj, fields):
+    result = {}
+    for field in fields:
+        value = getattr(obj, field)
+        result[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+    return result
+
+
+def serialize_user(user, fields, totals):
+    result = serialize(user, [field for field in fields if field not in USER_EXTRA_FIELDS])
+    count, total = totals.get(user.id, (0, 0.0))
+    if 'equipment_count' in fields:
+        result['equipment_count'] = count
+    if 'equipment_total' in fields:
+        result['equipment_total'] = total
+    return result
+
+
+def conditional(*tables):
+    """Валидаторы ответа по версиям таблиц: 304 отдаётся до любых запросов к данным.
+
+    304 — только по If-None-Match. Last-Modified отдаётся для сведения, но If-Modified-Since
+    не проверяется: у HTTP-даты точность в секунду, и две записи в одну секунду дали бы
+    304 со старыми данными, а версия таблицы в ETag меняется при каждой записи.
+    Возвращает (etag, last_modified, ответ 304 или None).
+    """
+    versions = version_repo.get(*tables)
+    key = '|'.join(f'{name}:{versions[name][0]}' for name in tables)
+    key += '|' + request.full_path
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    modified = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    last_modified = max(modified).replace(tzinfo=timezone.utc, microsecond=0) if modified else None
+
+    response = None
+    if request.if_none_match and request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        add_validators(response, etag, last_modified)
+    return etag, last_modified, response
+
+
+def add_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    # Клиент может хранить ответ, но обязан перепроверять его через If-None-Match
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_json(payload, etag, last_modified):
+    return add_validators(jsonify(payload), etag, last_modified)
+
+
+def page_size():
+    per_page = request.args.get('per_page', type=int) or current_app.config['EQUIPMENT_PAGE_SIZE']
+    return max(1, min(per_page, current_app.config['EQUIPMENT_MAX_PAGE_SIZE']))
+
+
+@bp.route("/equipment")
+@api_login_required
+def list_equipment():
+    try:
+        fields = selected_fields(EQUIPMENT_FIELDS, EQUIPMENT_EXTRA_FIELDS)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    # Имя сотрудника берётся из users, поэтому её версия тоже входит в ETag
+    with_holder = 'holder' in fields
+    etag, last_modified, not_modified = conditional('equipment', 'lookups', *(('users',) if with_holder else ()))
+    if not_modified:
+        return not_modified
+
+    sort = request.args.get('sort', 'id')
+    if sort not in SORT_COLUMNS:
+        return api_error(f"Сортировка по полю '{sort}' не поддерживается", 400)
+    try:
+        page = equipment_repo.paginate(
+            type=request.args.get('type'),
+            status=request.args.get('status'),
+            location=request.args.get('location'),
+            sort=sort,
+            descending=request.args.get('order') == 'desc',
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=page_size(),
+            with_holder=with_holder
+        )
+    except ValueError as e:
+        return api_error(str(e), 400)
+
+    return conditional_json({
+        'items': [serialize(item, fields) for item in page],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }, etag, last_modified)
+
+
+@bp.route("/equipment", methods=["PATCH"])
+@api_login_required
+def bulk_update_equipment():
+    """Тело: {"ids": [1, 2] или "filter": {"location": ...}, "set": {"status": ...}}."""
+    if current_user.role not in ['admin', 'manager']:
+        return api_error("Недостаточно прав", 403)
+
+    payload = request.get_json(silent=True) or {}
+    ids = payload.get('ids') or []
+    filters = payload.get('filter') or {}
+    values = payload.get('set') or {}
+    if not isinstance(ids, list) or not all(isinstance(value, int) for value in ids):
+        return api_error("ids должен быть списком целых чисел", 400)
+    if len(ids) > current_app.config['BULK_UPDATE_MAX_IDS']:
+        return api_error(f"Слишком много ID за один раз (максимум {current_app.config['BULK_UPDATE_MAX_IDS']})", 400)
+    if not isinstance(filters, dict) or set(filters) - {'type', 'status', 'location'}:
+        return api_error("filter поддерживает только type, status и location", 400)
+    if not all(isinstance(value, str) for value in filters.values()):
+        return api_error("Значения filter должны быть строками", 400)
+    if not isinstance(values, dict):
+        return api_error("set должен быть объектом", 400)
+
+    try:
+        values = checked_equipment_changes(values, BULK_UPDATE_FIELDS)
+        updated = equipment_repo.bulk_update(values, ids=ids, **filters)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    except IntegrityError as e:
+        # Нарушение ограничения из-за параллельного изменения
+        db.session.rollback()
+        return api_error(str(e.orig), 409)
+    return jsonify({'updated': updated})
+
+
+@bp.route("/equipment/<int:equipment_id>")
+@api_login_required
+def get_equipment(equipment_id):
+    try:
+        fields = selected_fields(EQUIPMENT_FIELDS, EQUIPMENT_EXTRA_FIELDS)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    etag, last_modified, not_modified = conditional('equipment', 'lookups',
+                                                    *(('users',) if 'holder' in fields else ()))
+    if not_modified:
+        return not_modified
+
+    equipment = equipment_repo.get_by_id(equipment_id)
+    if not equipment:
+        return api_error("Оборудование не найдено", 404)
+    return conditional_json(serialize(equipment, fields), etag, last_modified)
+
+
+@bp.route("/equipment/<int:equipment_id>", methods=["PATCH"])
+@api_login_required
+def update_equipment(equipment_id):
+    """Тело: {"version": 3, "set": {"location": ...}}; 409, если запись изменили после чтения версии."""
+    if current_user.role not in ['admin', 'manager']:
+        return api_error("Недостаточно прав", 403)
+
+    payload = request.get_json(silent=True) or {}
+    version = payload.get('version')
+    values = payload.get('set') or {}
+    if not isinstance(version, int) or isinstance(version, bool):
+        return api_error("version обязателен и должен быть целым числом", 400)
+    if not isinstance(values, dict) or not values:
+        return api_error("set должен быть непустым объектом", 400)
+    try:
+        values = checked_equipment_changes(values, EQUIPMENT_UPDATE_FIELDS, equipment_id)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    if not values:
+        return api_error("set должен содержать хотя бы одно непустое значение", 400)
+
+    try:
+        equipment = equipment_repo.update(equipment_id, version=version, **values)
+    except VersionConflict as e:
+        return jsonify({'error': str(e), 'current_version': e.current_version}), 409
+    if equipment is None:
+        return api_error("Оборудование не найдено", 404)
+    return jsonify(serialize(equipment, EQUIPMENT_FIELDS))
+
+
+@bp.route("/equipment/<int:equipment_id>/history")
+@api_login_required
+def get_equipment_history(equipment_id):
+    # История пишется только вместе с изменением оборудования, поэтому хватает его версии
+    etag, last_modified, not_modified = conditional('equipment', 'lookups')
+    if not_modified:
+        return not_modified
+
+    per_page = page_size()
+    entries = history_repo.timeline(equipment_id, after=request.args.get('after', type=int), limit=per_page)
+    return conditional_json({
+        'items': [entry.to_dict() for entry in entries],
+        'next_after': entries[-1].id if len(entries) == per_page else None,
+    }, etag, last_modified)
+
+
+@bp.route("/equipment/<int:equipment_id>/state")
+@api_login_required
+def get_equipment_state(equipment_id):
+    """Поля оборудования на момент ?at=ГГГГ-ММ-ДДTЧЧ:ММ:СС (UTC) по истории изменений."""
+    try:
+        moment = datetime.fromisoformat(request.args.get('at', ''))
+    except ValueError:
+        return api_error("Параметр at должен быть датой в формате ISO 8601", 400)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+    etag, last_modified, not_modified = conditional('equipment', 'lookups')
+    if not_modified:
+        return not_modified
+    state = history_repo.state_at(equipment_id, moment)
+    if state is None:
+        return api_error("На этот момент оборудования не было", 404)
+    return conditional_json({'equipment_id': equipment_id, 'at': moment.isoformat(), 'state': state},
+                            etag, last_modified)
+
+
+@bp.route("/users")
+@api_admin_required
+def list_users():
+    try:
+        fields = selected_fields(USER_FIELDS, USER_EXTRA_FIELDS)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    with_totals = any(field in USER_EXTRA_FIELDS for field in fields)
+    etag, last_modified, not_modified = conditional('users', *(('equipment',) if with_totals else ()))
+    if not_modified:
+        return not_modified
+
+    users, next_after = user_repo.paginate(
+        role=request.args.get('role'),
+        after=request.args.get('after', type=int),
+        per_page=page_size()
+    )
+    # Итоги по оборудованию — один агрегирующий запрос на всю страницу
+    totals = user_repo.equipment_totals([user.id for user in users]) if with_totals else {}
+    return conditional_json({
+        'items': [serialize_user(user, fields, totals) for user in users],
+        'next_after': next_after,
+    }, etag, last_modified)
+
+
+@bp.route("/users/<int:user_id>")
+@api_admin_required
+def get_user(user_id):
+    try:
+        fields = selected_fields(USER_FIELDS, USER_EXTRA_FIELDS)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    with_totals = any(field in USER_EXTRA_FIELDS for field in fields)
+    etag, last_modified, not_modified = conditional('users', *(('equipment',) if with_totals else ()))
+    if not_modified:
+        return not_modified
+
+    user = user_repo.get_by_id(user_id)
+    if not user:
+        return api_error("Пользователь не найден", 404)
+    totals = user_repo.equipment_totals([user.id]) if with_totals else {}
+    return conditional_json(serialize_user(user, fields, totals), etag, last_modified)
+
+
+@bp.route("/users/<int:user_id>/activity")
+@api_admin_required
+def get_user_activity(user_id):
+    etag, last_modified, not_modified = conditional('equipment', 'lookups')
+    if not_modified:
+        return not_modified
+
+    per_page = page_size()
+    entries = history_repo.activity(user_id, before=request.args.get('before', type=int), limit=per_page)
+    return conditional_json({
+        'items': [entry.to_dict() for entry in entries],
+        'next_before': entries[-1].id if len(entries) == per_page else None,
+    }, etag, last_modified)
+
+
+def serialize_job(job):
+    data = job.to_dict()
+    data['url'] = url_for('api.get_job', job_id=job.id)
+    data['result_url'] = url_for('api.get_job_result', job_id=job.id)
+    return data
+
+
+def visible_job(job_id):
+    job = job_repo.get_by_id(job_id)
+    if job is None or (current_user.role != 'admin' and job.created_by != current_user.id):
+        return None
+    return job
+
+
+@bp.route("/jobs", methods=["POST"])
+@api_login_required
+def create_job():
+    """Ставит фоновую задачу и сразу отвечает 202 со ссылкой на её статус.
+
+    JSON: {"kind": "export_equipment", "payload": {"format": "csv", "location": ...}}
+    или {"kind": "rebuild_valuation"}; импорт — multipart с полем file (и необязательным format).
+    """
+    upload = request.files.get('file')
+    if upload:
+        kind = 'import_equipment'
+        payload = {'format': request.form.get('format') or detect_format(upload.filename or '')}
+        if payload['format'] not in IMPORT_FORMATS:
+            return api_error(f"Неподдерживаемый формат импорта '{payload['format']}'", 400)
+    else:
+        body = request.get_json(silent=True) or {}
+        kind = body.get('kind')
+        payload = body.get('payload') or {}
+        if kind not in ('export_equipment', 'rebuild_valuation'):
+            return api_error("kind должен быть export_equipment или rebuild_valuation (импорт — через multipart)", 400)
+        if not isinstance(payload, dict):
+            return api_error("payload должен быть объектом", 400)
+        if kind == 'export_equipment':
+            payload = {key: payload.get(key) for key in ('type', 'status', 'location')} | \
+                {'format': payload.get('format', 'csv')}
+            if payload['format'] not in EXPORT_FORMATS:
+                return api_error(f"Неподдерживаемый формат выгрузки '{payload['format']}'", 400)
+        else:
+            payload = {}
+
+    if not job_queue.get_handler(kind).allowed(current_user):
+        return api_error("Недостаточно прав", 403)
+    if upload:
+        payload['path'] = job_queue.save_upload(upload)
+    job = job_queue.enqueue(kind, payload, created_by=current_user.id)
+    response = jsonify(serialize_job(job))
+    response.status_code = 202
+    response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+    return response
+
+
+@bp.route("/jobs/<int:job_id>")
+@api_login_required
+def get_job(job_id):
+    job = visible_job(job_id)
+    if job is None:
+        return api_error("Задача не найдена", 404)
+    return jsonify(serialize_job(job))
+
+
+@bp.route("/jobs/<int:job_id>/result")
+@api_login_required
+def get_job_result(job_id):
+    job = visible_job(job_id)
+    if job is None:
+        return api_error("Задача не найдена", 404)
+    if job.status == 'failed':
+        return jsonify({'error': job.error, 'status': job.status}), 409
+    if job.status != 'done':
+        # Ещё не готово: клиент повторяет запрос позже
+        response = jsonify(serialize_job(job))
+        response.status_code = 202
+        response.headers['Retry-After'] = '2'
+        return response
+
+    result = dict(job.result_data or {})
+    if result.pop('path', None):
+        result['download_url'] = url_for('jobs.download_job_result', job_id=job.id)
+    return jsonify({'status': job.status, 'result': result})
\ No newline at end of file
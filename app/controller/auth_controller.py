@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, logout_user, login_required, current_user
 from app.model.user import UserRepo, User
+from app.service.password_service import password_hasher, HasherBusy
 
 bp = Blueprint("auth", __name__, url_prefix="/auth")
 repo = UserRepo()
@@ -16,12 +17,18 @@ def login():
         password = request.form.get("password")
         user = repo.get_by_username(username)
 
-        if user and user.check_password(password):
+        try:
+            valid = bool(user and password and password_hasher.verify(user.password_hash, password))
+            # Хэш со старыми параметрами пересчитываем, пока пароль известен
+            if valid and user.password_needs_rehash():
+                repo.set_password_hash(user, password_hasher.generate(password))
+        except HasherBusy:
+            flash("Сервер перегружен попытками входа, попробуйте ещё раз через несколько секунд", "error")
+            return render_template("auth/login.html"), 503
+
+        if valid:
             login_user(user)
             flash("Вход выполнен успешно!", "success")
-            session['logged_in'] = True
-            session['user'] = user.username
-            session['role'] = user.role
             return redirect(url_for('equipment.list_equipment'))
         else:
             flash("Неверное имя пользователя или пароль", "error")
@@ -47,7 +54,11 @@ def register():
         if repo.get_by_username(username):
             flash("Имя пользователя уже существует", "error")
         else:
-            repo.add(username, password)
+            try:
+                repo.add(username, password)
+            except HasherBusy:
+                flash("Сервер перегружен, попробуйте ещё раз через несколько секунд", "error")
+                return render_template("auth/register.html"), 503
             flash("Регистрация прошла успешно! Пожалуйста, войдите в систему.", "success")
             return redirect(url_for("auth.login"))
 
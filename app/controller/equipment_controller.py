@@ -1,13 +1,22 @@
-from flask import Blueprint, request, render_template, redirect, url_for, flash
+from flask import Blueprint, request, render_template, redirect, url_for, flash, current_app, Response, \
+    stream_with_context
 from flask_login import login_required, current_user
-from app.model.equipment import EquipmentRepo
-from app.model.user import UserRepo
+from app.model.equipment import EquipmentRepo, EquipmentPage, SORT_COLUMNS, clean_equipment_fields, parse_id_list
+from app.model.row_version import MISSING_VERSION, VersionConflict
+from app.service.export_service import EXPORT_FORMATS, EXPORT_MIMETYPES, export_equipment
+from app.service.import_service import EquipmentImporter, IMPORT_FORMATS, detect_format, read_rows
+from app.service.job_service import job_queue
+from app.controller.jobs_controller import job_accepted
+from app.service.lookup_cache import lookup_cache
+from app.service.render_cache import render_cache
+from app.service.stats_service import stats_service
+import click
 from datetime import datetime
 from app import db
+import csv
 
 bp = Blueprint("equipment", __name__, url_prefix="/equipment")
 equipment_repo = EquipmentRepo()
-user_repo = UserRepo()
 
 
 @bp.route("/")
@@ -17,32 +26,77 @@ def list_equipment():
     filter_type = request.args.get('type')
     filter_status = request.args.get('status')
     filter_location = request.args.get('location')
+    search_query = request.args.get('q', '').strip()
 
-    # Фильтрация оборудования
-    equipment_list = equipment_repo.filter_by(
-        type=filter_type,
-        status=filter_status,
-        location=filter_location
-    )
+    # Параметры сортировки и курсорной пагинации
+    sort = request.args.get('sort', 'id')
+    if sort not in SORT_COLUMNS:
+        sort = 'id'
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    per_page = request.args.get('per_page', type=int) or current_app.config['EQUIPMENT_PAGE_SIZE']
+    per_page = max(1, min(per_page, current_app.config['EQUIPMENT_MAX_PAGE_SIZE']))
+
+    def render_list():
+        # Фильтрация оборудования; при поисковом запросе — лучшие по релевантности результаты
+        if search_query:
+            equipment_page = EquipmentPage(equipment_repo.search(
+                search_query,
+                type=filter_type,
+                status=filter_status,
+                location=filter_location,
+                limit=per_page,
+                candidates=current_app.config['SEARCH_RANK_CANDIDATES'],
+                with_holder=True
+            ))
+        else:
+            equipment_page = equipment_repo.paginate(
+                type=filter_type,
+                status=filter_status,
+                location=filter_location,
+                sort=sort,
+                descending=order == 'desc',
+                after=request.args.get('after'),
+                before=request.args.get('before'),
+                per_page=per_page,
+                with_holder=True
+            )
+
+        # Параметры, которые сохраняются при переходе между страницами
+        page_args = {key: value for key, value in request.args.items()
+                     if key not in ('after', 'before') and value}
+
+        # Статистика по статусам и типам (кэшированный снимок)
+        stats = stats_service.snapshot()
+
+        # Все возможные типы, статусы и места для фильтров — из справочников в памяти процесса
+        all_types = lookup_cache.names('type')
+        all_statuses = lookup_cache.names('status')
+        all_locations = lookup_cache.names('location')
 
-    # Статистика по статусам и типам
-    status_counts = equipment_repo.count_by_status()
-    type_counts = equipment_repo.count_by_type()
+        return render_template("equipment/_list.html",
+                               equipment=equipment_page,
+                               page_args=page_args,
+                               sort=sort,
+                               order=order,
+                               sort_columns=SORT_COLUMNS,
+                               search_query=search_query,
+                               status_counts=stats.status_counts,
+                               type_counts=stats.type_counts,
+                               all_types=all_types,
+                               all_statuses=all_statuses,
+                               all_locations=all_locations)
 
-    # Все возможные типы и статусы для фильтров
-    all_types = ['Компьютер', 'Ноутбук', 'Монитор', 'Принтер', 'Сканер', 'Сервер', 'Роутер']
-    all_statuses = ['available', 'in_use', 'in_repair', 'retired']
-    all_locations = ['Офис 101', 'Офис 102', 'Офис 201', 'Склад', 'Бухгалтерия', 'ИТ-отдел']
-    all_users = user_repo.all()
+    # Фрагмент зависит только от параметров запроса, роли и версий оборудования, справочников
+    # и пользователей (колонка «Сотрудник»)
+    try:
+        content = render_cache.fragment(
+            "equipment/_list.html", ("equipment", "lookups", "users"),
+            dict(request.args.items(), role=current_user.role), render_list)
+    except ValueError as e:
+        flash(str(e), "error")
+        return redirect(url_for('equipment.list_equipment'))
 
-    return render_template("equipment/list.html",
-                           equipment=equipment_list,
-                           status_counts=status_counts,
-                           type_counts=type_counts,
-                           all_types=all_types,
-                           all_statuses=all_statuses,
-                           all_locations=all_locations,
-                           all_users=all_users)
+    return render_template("equipment/list.html", content=content)
 
 
 @bp.route("/", methods=["POST"])
@@ -52,42 +106,15 @@ def create_equipment():
         flash("У вас нет прав для добавления оборудования", "error")
         return redirect(url_for('equipment.list_equipment'))
 
-    # Валидация обязательных полей
-    name = request.form.get("name", "").strip()
-    inventory_number = request.form.get("inventory_number", "").strip()
-
-    if not name or not inventory_number:
-        flash("Название и инвентарный номер обязательны для заполнения", "error")
+    # Валидация полей формы
+    try:
+        fields = clean_equipment_fields(request.form)
+    except ValueError as e:
+        flash(str(e), "error")
         return redirect(url_for('equipment.list_equipment'))
 
     try:
-        type_ = request.form.get("type")
-        model = request.form.get("model")
-        status = request.form.get("status", "available")
-        location = request.form.get("location")
-        purchase_date = request.form.get("purchase_date")
-        price = request.form.get("price")
-        specification = request.form.get("specification")
-        user_id = request.form.get("user_id") or None
-
-        if purchase_date:
-            purchase_date = datetime.strptime(purchase_date, '%Y-%m-%d').date()
-
-        if price:
-            price = float(price)
-
-        equipment_repo.add(
-            name=name,
-            type=type_,
-            model=model,
-            inventory_number=inventory_number,
-            status=status,
-            location=location,
-            purchase_date=purchase_date,
-            price=price,
-            specification=specification,
-            user_id=user_id
-        )
+        equipment_repo.add(**fields)
         # Убедитесь, что здесь точно такой же текст, как в тесте
         flash("Оборудование успешно добавлено!", "success")
     except Exception as e:
@@ -112,6 +139,8 @@ def delete_equipment(equipment_id):
     try:
         equipment_repo.delete(equipment_id)
         flash("Оборудование успешно удалено!", "success")
+    except VersionConflict as e:
+        flash(str(e), "error")
     except Exception as e:
         db.session.rollback()
         flash(f"Ошибка при удалении оборудования: {str(e)}", "error")
@@ -137,7 +166,12 @@ def update_equipment():
         purchase_date = request.form.get('new_purchase_date')
         price = request.form.get('new_price')
         specification = request.form.get('new_specification')
-        user_id = request.form.get('new_user_id') or None
+        user_id = request.form.get('new_user_id', type=int)
+        # Версия, которую видел редактор: без неё изменение перезаписало бы чужие правки
+        version = request.form.get('version', type=int)
+        if version is None:
+            flash(MISSING_VERSION, "error")
+            return redirect(url_for('equipment.list_equipment'))
 
         if purchase_date:
             purchase_date = datetime.strptime(purchase_date, '%Y-%m-%d').date()
@@ -156,11 +190,185 @@ def update_equipment():
             purchase_date=purchase_date,
             price=price,
             specification=specification,
-            user_id=user_id
+            user_id=user_id,
+            version=version
         )
         flash("Оборудование успешно обновлено!", "success")
+    except VersionConflict as e:
+        flash(str(e), "error")
     except Exception as e:
         db.session.rollback()
         flash(f"Ошибка при обновлении оборудования: {str(e)}", "error")
 
-    return redirect(url_for('equipment.list_equipment'))
\ No newline at end of file
+    return redirect(url_for('equipment.list_equipment'))
+
+
+@bp.route("/bulk-update", methods=["POST"])
+@login_required
+def bulk_update_equipment():
+    if current_user.role not in ['admin', 'manager']:
+        flash("У вас нет прав для обновления оборудования", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    try:
+        ids = parse_id_list(request.form.get('ids', ''), limit=current_app.config['BULK_UPDATE_MAX_IDS'])
+        updated = equipment_repo.bulk_update(
+            values={
+                'status': request.form.get('bulk_status'),
+                'location': request.form.get('bulk_location'),
+                'user_id': request.form.get('bulk_user_id', type=int),
+            },
+            ids=ids,
+            type=request.form.get('filter_type'),
+            status=request.form.get('filter_status'),
+            location=request.form.get('filter_location')
+        )
+        flash(f"Обновлено записей: {updated}", "success")
+    except ValueError as e:
+        flash(str(e), "error")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Ошибка при массовом обновлении оборудования: {str(e)}", "error")
+
+    return redirect(url_for('equipment.list_equipment'))
+
+
+@bp.route("/import", methods=["POST"])
+@login_required
+def import_equipment():
+    if current_user.role not in ['admin', 'manager']:
+        flash("У вас нет прав для импорта оборудования", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash("Выберите файл для импорта", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    format = request.form.get('format') or detect_format(upload.filename)
+    if format not in IMPORT_FORMATS:
+        flash(f"Неподдерживаемый формат импорта '{format}'", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    # Большой файл занял бы воркер на минуты: сохраняем его и отдаём фоновой задаче
+    if request.form.get('background') or (request.content_length or 0) > current_app.config['IMPORT_INLINE_MAX_BYTES']:
+        job = job_queue.enqueue('import_equipment', {'path': job_queue.save_upload(upload), 'format': format},
+                                created_by=current_user.id)
+        return job_accepted(job)
+
+    importer = EquipmentImporter(
+        batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+        max_reported_errors=current_app.config['IMPORT_MAX_REPORTED_ERRORS']
+    )
+    try:
+        result = importer.run(read_rows(upload.stream, format))
+    except (ValueError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        flash(f"Ошибка при импорте оборудования: {str(e)}", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    flash(f"Импортировано записей: {result.imported}, ошибок: {result.error_count}",
+          "success" if not result.error_count else "warning")
+    # Во flash (cookie) попадают только первые ошибки, полный отчёт — через CLI
+    for error in result.errors[:5]:
+        flash(str(error), "error")
+
+    return redirect(url_for('equipment.list_equipment'))
+
+
+@bp.cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "format", type=click.Choice(IMPORT_FORMATS), help="Формат файла (по умолчанию по расширению).")
+@click.option("--batch-size", type=int, default=None, help="Размер пачки для INSERT.")
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False, writable=True),
+              help="Куда записать CSV-отчёт об ошибках (по умолчанию stderr).")
+@click.option("--create-lookups", is_flag=True,
+              help="Добавлять в справочники неизвестные типы, статусы и места (иначе это ошибка строки).")
+def import_equipment_command(path, format, batch_size, errors_path, create_lookups):
+    """Массовый импорт оборудования из CSV или JSONL."""
+    report = open(errors_path, "w", encoding="utf-8", newline="") if errors_path else None
+    writer = csv.writer(report) if report else None
+    if writer:
+        writer.writerow(["line", "inventory_number", "error"])
+
+    def on_error(error):
+        if writer:
+            writer.writerow([error.line, error.inventory_number or "", error.message])
+        else:
+            click.echo(str(error), err=True)
+
+    importer = EquipmentImporter(
+        batch_size=batch_size or current_app.config['IMPORT_BATCH_SIZE'],
+        max_reported_errors=0,
+        on_error=on_error,
+        create_lookups=create_lookups
+    )
+    try:
+        with open(path, "rb") as stream:
+            result = importer.run(read_rows(stream, format or detect_format(path)))
+    finally:
+        if report:
+            report.close()
+
+    click.echo(f"Импортировано записей: {result.imported}, ошибок: {result.error_count}")
+
+
+@bp.route("/export")
+@login_required
+def export_equipment_file():
+    format = request.args.get('format', 'csv')
+    if format not in EXPORT_FORMATS:
+        flash(f"Неподдерживаемый формат выгрузки '{format}'", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    chunks = export_equipment(
+        format=format,
+        type=request.args.get('type'),
+        status=request.args.get('status'),
+        location=request.args.get('location'),
+        batch_size=current_app.config['EXPORT_BATCH_SIZE']
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_MIMETYPES[format],
+        headers={'Content-Disposition': f'attachment; filename=equipment.{format}'}
+    )
+
+
+@bp.route("/export", methods=["POST"])
+@login_required
+def export_equipment_background():
+    # Постановка задачи меняет состояние, поэтому только POST: GET могут повторить префетчеры и краулеры
+    format = request.form.get('format', 'csv')
+    if format not in EXPORT_FORMATS:
+        flash(f"Неподдерживаемый формат выгрузки '{format}'", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    job = job_queue.enqueue('export_equipment', {
+        'format': format,
+        'type': request.form.get('type') or None,
+        'status': request.form.get('status') or None,
+        'location': request.form.get('location') or None,
+    }, created_by=current_user.id)
+    return job_accepted(job)
+
+
+@bp.cli.command("export")
+@click.option("--format", "format", type=click.Choice(EXPORT_FORMATS), default="csv", show_default=True)
+@click.option("--output", "output_path", type=click.Path(dir_okay=False, writable=True),
+              help="Файл для выгрузки (по умолчанию stdout).")
+@click.option("--type", "type_", help="Фильтр по типу.")
+@click.option("--status", help="Фильтр по статусу.")
+@click.option("--location", help="Фильтр по местоположению.")
+def export_equipment_command(format, output_path, type_, status, location):
+    """Потоковая выгрузка реестра оборудования в CSV или JSONL."""
+    chunks = export_equipment(format=format, type=type_, status=status, location=location,
+                              batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+    if output_path:
+        with open(output_path, "w", encoding="utf-8", newline="") as output:
+            for chunk in chunks:
+                output.write(chunk)
+    else:
+        stream = click.get_text_stream("stdout")
+        for chunk in chunks:
+            stream.write(chunk)
@@ -0,0 +1,71 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, current_app, send_file, abort
+from flask_login import login_required, current_user
+from app.model.job import JobRepo
+from app.model.table_version import utcnow
+from app.service.job_service import job_queue
+import click
+from datetime import timedelta
+
+bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+repo = JobRepo()
+
+
+def visible_job(job_id):
+    # Задачу видят её автор и администраторы
+    job = repo.get_by_id(job_id)
+    if job is None or (current_user.role != 'admin' and job.created_by != current_user.id):
+        abort(404)
+    return job
+
+
+def job_accepted(job):
+    """Ответ на тяжёлый запрос: 202 Accepted со страницей прогресса вместо ожидания результата."""
+    response = current_app.make_response(
+        (render_template("jobs/detail.html", job=job, title=job_queue.title(job.kind)), 202))
+    response.headers['Location'] = url_for('jobs.job_detail', job_id=job.id)
+    return response
+
+
+@bp.route("/")
+@login_required
+def list_jobs():
+    jobs = repo.recent(created_by=None if current_user.role == 'admin' else current_user.id)
+    return render_template("jobs/list.html", jobs=jobs, titles=job_queue.title)
+
+
+@bp.route("/<int:job_id>")
+@login_required
+def job_detail(job_id):
+    job = visible_job(job_id)
+    return render_template("jobs/detail.html", job=job, title=job_queue.title(job.kind))
+
+
+@bp.route("/<int:job_id>/download")
+@login_required
+def download_job_result(job_id):
+    job = visible_job(job_id)
+    result = job.result_data or {}
+    if job.status != 'done' or not result.get('path'):
+        flash("Файл задачи ещё не готов", "error")
+        return redirect(url_for('jobs.job_detail', job_id=job.id))
+    return send_file(result['path'], as_attachment=True, download_name=result['filename'])
+
+
+@bp.cli.command("worker")
+@click.option("--workers", type=int, default=None, help="Число потоков (по умолчанию JOB_WORKERS).")
+@click.option("--burst", is_flag=True, help="Выйти, когда очередь опустеет.")
+def worker_command(workers, burst):
+    """Запускает воркер очереди фоновых задач."""
+    app = current_app._get_current_object()
+    workers = workers or app.config['JOB_WORKERS']
+    click.echo(f"Воркер очереди задач: потоков {workers}{', до опустошения очереди' if burst else ''}")
+    job_queue.run_worker(app, workers=workers, burst=burst, log=click.echo)
+
+
+@bp.cli.command("prune")
+@click.option("--days", type=int, default=None, help="Старше скольких дней (по умолчанию JOB_RETENTION_DAYS).")
+def prune_command(days):
+    """Удаляет завершённые задачи и их файлы."""
+    days = current_app.config['JOB_RETENTION_DAYS'] if days is None else days
+    removed = job_queue.prune(utcnow() - timedelta(days=days))
+    click.echo(f"Удалено задач: {removed}")
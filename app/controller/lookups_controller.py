@@ -0,0 +1,75 @@
+from flask import Blueprint, request, render_template, redirect, url_for, flash
+from flask_login import login_required, current_user
+from app.model.lookup import LOOKUPS, LOOKUP_TITLES, LookupRepo
+
+bp = Blueprint("lookups", __name__, url_prefix="/lookups")
+repo = LookupRepo()
+
+
+def admin_only():
+    if current_user.role != 'admin':
+        flash("У вас нет прав для управления справочниками", "error")
+        return redirect(url_for('equipment.list_equipment'))
+    return None
+
+
+@bp.route("/")
+@login_required
+def list_lookups():
+    denied = admin_only()
+    if denied:
+        return denied
+
+    lookups = [(kind, LOOKUP_TITLES[kind], repo.all(kind)) for kind in LOOKUPS]
+    return render_template("lookups/list.html", lookups=lookups)
+
+
+@bp.route("/", methods=["POST"])
+@login_required
+def create_lookup():
+    denied = admin_only()
+    if denied:
+        return denied
+
+    try:
+        item = repo.add(request.form.get('kind'), request.form.get('name'))
+        flash(f"Значение '{item.name}' добавлено", "success")
+    except ValueError as e:
+        flash(str(e), "error")
+    return redirect(url_for('lookups.list_lookups'))
+
+
+@bp.route("/rename", methods=["POST"])
+@login_required
+def rename_lookup():
+    denied = admin_only()
+    if denied:
+        return denied
+
+    try:
+        item = repo.rename(request.form.get('kind'), request.form.get('id', type=int), request.form.get('name'))
+        if item:
+            flash(f"Значение переименовано в '{item.name}'", "success")
+        else:
+            flash("Значение не найдено", "error")
+    except ValueError as e:
+        flash(str(e), "error")
+    return redirect(url_for('lookups.list_lookups'))
+
+
+@bp.route("/delete/<kind>/<int:lookup_id>", methods=["POST"])
+@login_required
+def delete_lookup(kind, lookup_id):
+    denied = admin_only()
+    if denied:
+        return denied
+
+    try:
+        item = repo.delete(kind, lookup_id)
+        if item:
+            flash(f"Значение '{item.name}' удалено", "success")
+        else:
+            flash("Значение не найдено", "error")
+    except ValueError as e:
+        flash(str(e), "error")
+    return redirect(url_for('lookups.list_lookups'))
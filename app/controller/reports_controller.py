@@ -0,0 +1,51 @@
+from flask import Blueprint, request, render_template, redirect, url_for, flash
+from flask_login import login_required, current_user
+from app.model.valuation import ValuationRepo
+from app.service.valuation_service import VALUATION_GROUPS, valuation_service
+from app.service.job_service import job_queue
+from app.controller.jobs_controller import job_accepted
+import click
+from datetime import date, datetime
+
+bp = Blueprint("reports", __name__, url_prefix="/reports")
+
+
+@bp.route("/valuation")
+@login_required
+def valuation():
+    if current_user.role not in ['admin', 'manager']:
+        flash("У вас нет прав для просмотра отчётов", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    group_by = request.args.get('group', 'location')
+    if group_by not in VALUATION_GROUPS:
+        group_by = 'location'
+
+    as_of = date.today()
+    if request.args.get('as_of'):
+        try:
+            as_of = datetime.strptime(request.args['as_of'], '%Y-%m-%d').date()
+        except ValueError:
+            flash("Некорректная дата отчёта, ожидается ГГГГ-ММ-ДД", "error")
+
+    report = valuation_service.report(group_by=group_by, as_of=as_of)
+    return render_template("reports/valuation.html", report=report, groups=VALUATION_GROUPS)
+
+
+@bp.route("/valuation/rebuild", methods=["POST"])
+@login_required
+def rebuild_valuation():
+    if current_user.role not in ['admin', 'manager']:
+        flash("У вас нет прав для пересчёта отчётов", "error")
+        return redirect(url_for('equipment.list_equipment'))
+
+    # Полный пересчёт идёт по всей таблице equipment, поэтому только в фоне
+    job = job_queue.enqueue('rebuild_valuation', created_by=current_user.id)
+    return job_accepted(job)
+
+
+@bp.cli.command("rebuild-valuation")
+def rebuild_valuation_command():
+    """Пересчитывает сводку стоимости оборудования с нуля (после правок в обход приложения)."""
+    rows = ValuationRepo().rebuild()
+    click.echo(f"Строк в сводке стоимости: {rows}")
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
+from app.model.row_version import MISSING_VERSION, VersionConflict
 from app.model.user import UserRepo
+from app.service.password_service import HasherBusy
+from app.service.render_cache import render_cache
+from app.service.stats_service import stats_service
 from app import db  # Добавляем импорт db для обработки исключений
 
 bp = Blueprint("users", __name__, url_prefix="/users")
@@ -14,9 +18,21 @@ def list_users():
         flash("У вас нет прав для просмотра пользователей", "error")
         return redirect(url_for('equipment.list_equipment'))
 
-    users = repo.all()
-    role_counts = repo.count_by_role()
-    return render_template("users/list.html", users=users, role_counts=role_counts)
+    def render_list():
+        users = repo.all_with_equipment_totals()
+        role_counts = stats_service.snapshot().role_counts
+        return render_template("users/_list.html", users=users, role_counts=role_counts)
+
+    # Колонки с числом и стоимостью оборудования зависят и от версии таблицы equipment
+    content = render_cache.fragment("users/_list.html", ("users", "equipment"), {'role': current_user.role}, render_list)
+    return render_template("users/list.html", content=content)
+
+
+def hasher_busy():
+    # Пул хэширования паролей перегружен: как и вход, отвечаем 503, ничего не сохранив
+    db.session.rollback()
+    flash("Сервер перегружен, попробуйте ещё раз через несколько секунд", "error")
+    return list_users(), 503
 
 
 @bp.route("/", methods=["POST"])
@@ -42,6 +58,8 @@ def create_user():
         role = request.form.get("role", "user")
         repo.add(username, password, role)
         flash("Пользователь успешно создан!", "success")
+    except HasherBusy:
+        return hasher_busy()
     except Exception as e:
         db.session.rollback()
         flash(f"Ошибка при создании пользователя: {str(e)}", "error")
@@ -66,9 +84,17 @@ def update_user():
         if not username:
             flash("Имя пользователя обязательно для заполнения", "error")
             return redirect(url_for('users.list_users'))
+        version = request.form.get('version', type=int)
+        if version is None:
+            flash(MISSING_VERSION, "error")
+            return redirect(url_for('users.list_users'))
 
-        repo.update(user_id, username=username, password=password, role=role)
+        repo.update(user_id, username=username, password=password, role=role, version=version)
         flash("Пользователь успешно обновлен!", "success")
+    except VersionConflict as e:
+        flash(str(e), "error")
+    except HasherBusy:
+        return hasher_busy()
     except Exception as e:
         db.session.rollback()
         flash(f"Ошибка при обновлении пользователя: {str(e)}", "error")
@@ -0,0 +1,43 @@
+from sqlalchemy import event
+
+from config import ENGINE_PROFILES
+
+
+def resolve_profile_name(app):
+    name = app.config.get('DATABASE_ENGINE_PROFILE')
+    if name != 'auto':
+        return name
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        # Для БД в памяти WAL и mmap не имеют смысла
+        return None if ':memory:' in uri else 'sqlite'
+    if uri.startswith('mysql'):
+        return 'mysql'
+    return None
+
+
+def apply_engine_options(app):
+    """Подмешивает опции движка из профиля; явно заданные SQLALCHEMY_ENGINE_OPTIONS важнее."""
+    name = resolve_profile_name(app)
+    if not name:
+        return None
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Неизвестный профиль движка БД '{name}'")
+    profile = ENGINE_PROFILES[name]
+    options = dict(profile.get('engine_options', {}))
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.config['DATABASE_ENGINE_PROFILE'] = name
+    return profile
+
+
+def register_connect_pragmas(engine, pragmas):
+    # PRAGMA действуют на соединение, поэтому выставляем их при каждом новом подключении пула
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cursor.execute(f'PRAGMA {key}={value}')
+        finally:
+            cursor.close()
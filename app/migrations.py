@@ -0,0 +1,168 @@
+from sqlalchemy import inspect, text
+
+from app import db
+
+
+def missing_indexes(inspector):
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def create_missing_indexes():
+    # db.create_all() не трогает уже существующие таблицы, поэтому индексы,
+    # объявленные позже самих таблиц, создаём отдельно
+    created = []
+    for index in missing_indexes(inspect(db.engine)):
+        index.create(bind=db.engine)
+        created.append(index.name)
+    return created
+
+
+def _legacy_lookup_columns(inspector):
+    # Старая схема: type/status/location хранились строками прямо в equipment
+    if not inspector.has_table('equipment'):
+        return False
+    return 'type_id' not in {column['name'] for column in inspector.get_columns('equipment')}
+
+
+def migrate_equipment_lookups():
+    """Переносит строковые type/status/location оборудования в справочники.
+
+    Уникальные значения копируются в таблицы справочников, в equipment добавляются
+    колонки *_id и заполняются одним UPDATE на справочник, после чего старые колонки
+    и индексы по ним удаляются (новые индексы создаст create_missing_indexes).
+    Сводку стоимости со строковыми ключами пересоздаём: её заполнит следующий шаг.
+    """
+    from app.model.lookup import LOOKUPS
+    from app.model.valuation import EquipmentValuation
+
+    inspector = inspect(db.engine)
+    if not _legacy_lookup_columns(inspector):
+        return False
+
+    db.session.commit()
+    with db.engine.begin() as conn:
+        for kind, (model, column) in LOOKUPS.items():
+            table = model.__tablename__
+            conn.execute(text(
+                f"INSERT INTO {table} (name) SELECT DISTINCT {kind} FROM equipment "
+                f"WHERE {kind} IS NOT NULL AND {kind} NOT IN (SELECT name FROM {table})"))
+            conn.execute(text(f"ALTER TABLE equipment ADD COLUMN {column} INTEGER REFERENCES {table}(id)"))
+            conn.execute(text(
+                f"UPDATE equipment SET {column} = "
+                f"(SELECT {table}.id FROM {table} WHERE {table}.name = equipment.{kind})"))
+
+        for index in inspector.get_indexes('equipment'):
+            if set(index['column_names']) & set(LOOKUPS):
+                on_table = ' ON equipment' if conn.dialect.name == 'mysql' else ''
+                conn.execute(text(f"DROP INDEX {index['name']}{on_table}"))
+        for kind in LOOKUPS:
+            conn.execute(text(f"ALTER TABLE equipment DROP COLUMN {kind}"))
+
+        if inspector.has_table('equipment_valuation') and \
+                'type' in {column['name'] for column in inspector.get_columns('equipment_valuation')}:
+            conn.execute(text("DROP TABLE equipment_valuation"))
+    EquipmentValuation.__table__.create(bind=db.engine, checkfirst=True)
+
+    from app.service.lookup_cache import lookup_cache
+    lookup_cache.invalidate()
+    return True
+
+
+# Таблицы с колонкой version для оптимистической блокировки (version_id_col)
+VERSIONED_TABLES = ('equipment', 'users')
+
+
+def _version_columns_missing(inspector):
+    return any(inspector.has_table(table) and
+               'version' not in {column['name'] for column in inspector.get_columns(table)}
+               for table in VERSIONED_TABLES)
+
+
+def add_version_columns():
+    """Добавляет колонку version в существующие таблицы; у всех строк она становится 1."""
+    inspector = inspect(db.engine)
+    added = []
+    db.session.commit()
+    with db.engine.begin() as conn:
+        for table in VERSIONED_TABLES:
+            if inspector.has_table(table) and \
+                    'version' not in {column['name'] for column in inspector.get_columns(table)}:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+                added.append(table)
+    return added
+
+
+def _lookup_defaults_missing(inspector):
+    from app.model.lookup import LOOKUPS, LookupRepo
+    if not all(inspector.has_table(model.__tablename__) for model, _ in LOOKUPS.values()):
+        return True
+    return bool(LookupRepo().missing_defaults())
+
+
+def _seed_lookups():
+    from app.model.lookup import LookupRepo
+    return LookupRepo().seed_defaults()
+
+
+def _has_missing_indexes(inspector):
+    return bool(missing_indexes(inspector))
+
+
+def _search_index_missing(inspector):
+    from app.model.equipment_search import search_index_missing
+    return search_index_missing(inspector)
+
+
+def _create_search_index():
+    from app.model.equipment_search import create_search_index
+    return create_search_index()
+
+
+def _valuation_summary_missing(inspector):
+    return not inspector.has_table('equipment_valuation')
+
+
+def _fill_valuation_summary():
+    # Таблицу сводки создаёт create_all(); для уже заполненной БД считаем её целиком один раз,
+    # дальше она поддерживается репозиторием оборудования
+    from app.model.equipment import Equipment
+    from app.model.valuation import ValuationRepo
+    repo = ValuationRepo()
+    if repo.is_empty() and db.session.query(Equipment.id).first() is not None:
+        return repo.rebuild()
+    return 0
+
+
+# Шаги миграции: (проверка "нужен ли шаг" по инспектору, сам шаг).
+# Выполняются по порядку и должны быть идемпотентными
+MIGRATIONS = [
+    (_legacy_lookup_columns, migrate_equipment_lookups),
+    (_version_columns_missing, add_version_columns),
+    (_lookup_defaults_missing, _seed_lookups),
+    (_has_missing_indexes, create_missing_indexes),
+    (_search_index_missing, _create_search_index),
+    (_valuation_summary_missing, _fill_valuation_summary),
+]
+
+
+def schema_is_current():
+    # Быстрая проверка одним отражением: все таблицы модели есть и ни один шаг миграции не нужен
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    if any(table.name not in existing_tables for table in db.metadata.sorted_tables):
+        return False
+    return not any(needed(inspector) for needed, _ in MIGRATIONS)
+
+
+def upgrade_schema():
+    db.create_all()
+    applied = {}
+    for _, step in MIGRATIONS:
+        applied[step.__name__.lstrip('_')] = step()
+    return applied
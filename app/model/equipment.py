@@ -1,26 +1,301 @@
 from app import db
-from datetime import datetime, timezone
+from app.model.lookup import LOOKUPS, EquipmentType, LookupRepo
+from app.model.table_version import TableVersionRepo
+from app.service.lookup_cache import lookup_cache
+from app.model.row_version import check_version, versioned_write
+from app.model.valuation import ValuationDeltas, ValuationRepo
+from datetime import date, datetime, timezone
+import base64
+import json
+
+
+def default_purchase_date():
+    return datetime.now(timezone.utc).date()
 
 
 class Equipment(db.Model):
     __tablename__ = 'equipment'
+    # Составные индексы подобраны так, чтобы любая комбинация фильтров type/status/location
+    # начиналась с ведущей колонки одного из них, а GROUP BY по type и status читал покрывающий индекс
+    __table_args__ = (
+        db.Index('ix_equipment_type_status_location', 'type_id', 'status_id', 'location_id'),
+        db.Index('ix_equipment_status_location', 'status_id', 'location_id'),
+        db.Index('ix_equipment_location_type', 'location_id', 'type_id'),
+        db.Index('ix_equipment_user_id', 'user_id'),
+        # Индексы для сортировки списка по (колонка, id) при курсорной пагинации
+        db.Index('ix_equipment_type', 'type_id'),
+        db.Index('ix_equipment_name', 'name'),
+        db.Index('ix_equipment_model', 'model'),
+        # Отчёт о стоимости дочитывает оборудование пограничных месяцев по дате покупки
+        db.Index('ix_equipment_purchase_date', 'purchase_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    type = db.Column(db.String(50), nullable=False)  # Компьютер, ноутбук, монитор и т.д.
+    # Тип, статус и место — ссылки на справочники (app.model.lookup), названия берутся из lookup_cache
+    type_id = db.Column(db.Integer, db.ForeignKey('equipment_types.id'), nullable=False)
     model = db.Column(db.String(100), nullable=False)
     inventory_number = db.Column(db.String(50), unique=True, nullable=False)
-    status = db.Column(db.String(20), default='available')  # available, in_use, in_repair, retired
-    location = db.Column(db.String(100))
-    purchase_date = db.Column(db.Date, default=lambda: datetime.now(timezone.utc).date())
+    status_id = db.Column(db.Integer, db.ForeignKey('equipment_statuses.id'))
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'))
+    purchase_date = db.Column(db.Date, default=default_purchase_date)
     price = db.Column(db.Float)
     specification = db.Column(db.Text)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    # Оптимистическая блокировка: каждый UPDATE идёт с WHERE version = :прочитанная и увеличивает её
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+
+    @property
+    def type(self):
+        return lookup_name('type', self.type_id)
+
+    @type.setter
+    def type(self, value):
+        self.type_id = lookup_id('type', value)
+
+    @property
+    def status(self):
+        return lookup_name('status', self.status_id)
+
+    @status.setter
+    def status(self, value):
+        self.status_id = lookup_id('status', value)
+
+    @property
+    def location(self):
+        return lookup_name('location', self.location_id)
+
+    @location.setter
+    def location(self, value):
+        self.location_id = lookup_id('location', value)
+
+    @property
+    def holder(self):
+        # Без holder_loader() каждое обращение к assigned_user — отдельный запрос
+        return self.assigned_user.username if self.assigned_user else None
 
     def __repr__(self):
         return f'<Equipment {self.name} ({self.inventory_number})>'
 
 
+def lookup_name(kind, value):
+    return lookup_cache.name(kind, value)
+
+
+def lookup_id(kind, name):
+    # Только существующие значения: справочники пополняет администратор, опечатка не станет новым статусом
+    return LookupRepo().resolve(kind, [name])[name] if name else None
+
+
+def check_lookups(fields):
+    """Бросает UnknownLookup, если type, status или location из fields нет в справочнике."""
+    repo = LookupRepo()
+    for kind in LOOKUPS:
+        if fields.get(kind):
+            repo.resolve(kind, [fields[kind]])
+
+
+def with_lookup_ids(rows, create=False):
+    """Заменяет в словарях полей названия type/status/location на id справочников.
+
+    Неизвестное название — UnknownLookup, с create=True оно добавляется в справочник.
+    """
+    repo = LookupRepo()
+    for kind, (_, column) in LOOKUPS.items():
+        present = [row[kind] for row in rows if row.get(kind)]
+        ids = repo.resolve(kind, present, create=create) if present else {}
+        for row in rows:
+            if kind in row:
+                name = row.pop(kind)
+                row[column] = ids.get(name) if name else None
+    return rows
+
+
+def lookup_filter(kind, name):
+    """Условие по названию из справочника; неизвестное название не совпадает ни с чем."""
+    from sqlalchemy import false
+
+    value = lookup_cache.id(kind, name)
+    if value is None:
+        return false()
+    return getattr(Equipment, LOOKUPS[kind][1]) == value
+
+
+# Колонки, по которым разрешена сортировка списка (все NOT NULL, чтобы курсор был однозначным).
+# Тип сортируется по названию из справочника: JOIN идёт по уникальному индексу названий
+# и индексу equipment.type_id, так что порядок (название, id) читается без сортировки
+SORT_COLUMNS = {
+    'id': Equipment.id,
+    'name': Equipment.name,
+    'type': EquipmentType.name,
+    'model': Equipment.model,
+    'inventory_number': Equipment.inventory_number,
+}
+
+
+# Поля, которые можно менять массово (перемещение, смена статуса, выдача сотруднику)
+BULK_UPDATE_FIELDS = ('status', 'location', 'type', 'user_id')
+
+
+class EquipmentPage:
+    """Одна страница списка оборудования при курсорной (keyset) пагинации."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+EQUIPMENT_CONFLICT = ("Оборудование уже изменил другой пользователь (текущая версия {version}). "
+                      "Обновите страницу и внесите изменения заново")
+
+
+def holder_loader():
+    """Опция загрузки сотрудника, за которым числится оборудование.
+
+    selectinload загружает пользователей всей страницы одним запросом по списку user_id,
+    поэтому число запросов на страницу не зависит от числа строк, а основной запрос
+    со своим планом и индексами остаётся без JOIN.
+    """
+    from sqlalchemy.orm import selectinload
+    from app.model.user import User
+    return selectinload(Equipment.assigned_user).load_only(User.id, User.username)
+
+
+def encode_cursor(sort_value, equipment_id):
+    raw = json.dumps([sort_value, equipment_id], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        sort_value, equipment_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return sort_value, int(equipment_id)
+    except (ValueError, TypeError):
+        raise ValueError("Некорректный курсор пагинации")
+
+
+def parse_id_list(text, limit=None):
+    """Разбирает список ID вида '1, 2 5-10' в отсортированный список целых."""
+    ids = set()
+    for part in text.replace(',', ' ').split():
+        try:
+            if '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+                if end < start or (limit and end - start >= limit):
+                    raise ValueError
+                ids.update(range(start, end + 1))
+            else:
+                ids.add(int(part))
+        except ValueError:
+            raise ValueError(f"Некорректный ID или диапазон '{part}'")
+        if limit and len(ids) > limit:
+            raise ValueError(f"Слишком много ID за один раз (максимум {limit})")
+    return sorted(ids)
+
+
+def _clean_text(field, value):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"Поле {field} должно быть строкой")
+    return value.strip() or None
+
+
+def _clean_date(field, value):
+    if not value:
+        return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"Некорректная дата покупки '{value}', ожидается ГГГГ-ММ-ДД")
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Некорректная дата покупки '{value}', ожидается ГГГГ-ММ-ДД")
+
+
+def _clean_price(field, value):
+    if not value:
+        return None
+    # bool — подкласс int, но ценой не является
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Некорректная цена '{value}'")
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Некорректная цена '{value}'")
+
+
+def _clean_user_id(field, value):
+    if not value:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Некорректный ID пользователя '{value}'")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Некорректный ID пользователя '{value}'")
+
+
+# Поле оборудования -> проверка и приведение значения из формы, строки импорта или JSON
+EQUIPMENT_FIELD_CLEANERS = {
+    'name': _clean_text,
+    'type': _clean_text,
+    'model': _clean_text,
+    'inventory_number': _clean_text,
+    'status': _clean_text,
+    'location': _clean_text,
+    'purchase_date': _clean_date,
+    'price': _clean_price,
+    'specification': _clean_text,
+    'user_id': _clean_user_id,
+}
+
+
+def clean_equipment_fields(data):
+    """Проверяет и приводит к нужным типам поля оборудования из формы или строки импорта."""
+    fields = {field: clean(field, data.get(field)) for field, clean in EQUIPMENT_FIELD_CLEANERS.items()}
+    if not fields['name'] or not fields['inventory_number']:
+        raise ValueError("Название и инвентарный номер обязательны для заполнения")
+    if not fields['type'] or not fields['model']:
+        raise ValueError("Тип и модель обязательны для заполнения")
+    fields['status'] = fields['status'] or 'available'
+    return fields
+
+
+def clean_equipment_changes(values, allowed):
+    """Проверяет частичное изменение (PATCH в API) по тем же правилам, что clean_equipment_fields.
+
+    Допускаются только поля из allowed; пустые значения отбрасываются, как в формах.
+    """
+    unknown = set(values) - set(allowed)
+    if unknown:
+        raise ValueError(f"Изменение полей {', '.join(sorted(unknown))} не поддерживается")
+    cleaned = {}
+    for field, value in values.items():
+        value = EQUIPMENT_FIELD_CLEANERS[field](field, value)
+        if value is not None:
+            cleaned[field] = value
+    return cleaned
+
+
 class EquipmentRepo:
+    def _commit(self):
+        from app.service.stats_service import stats_service
+        # Версия таблицы растёт в той же транзакции, что и сами изменения
+        TableVersionRepo().bump('equipment')
+        db.session.commit()
+        stats_service.invalidate()
+
     def all(self):
         return db.session.query(Equipment).all()
 
@@ -33,69 +308,342 @@ class EquipmentRepo:
             inventory_number=inventory_number,
             status=status,
             location=location,
-            purchase_date=purchase_date,
+            # Дата по умолчанию ставится здесь, а не default колонки: сводка считается до INSERT
+            purchase_date=purchase_date or default_purchase_date(),
             price=price,
             specification=specification,
             user_id=user_id
         )
         db.session.add(equipment)
-        db.session.commit()
+        deltas = ValuationDeltas()
+        deltas.add_equipment(equipment)
+        ValuationRepo().apply(deltas)
+        self._commit()
         return equipment
 
+    def bulk_add(self, rows, create_lookups=False):
+        """Вставляет пачку строк одним INSERT (executemany) в одной транзакции.
+
+        create_lookups=True добавляет в справочники неизвестные типы, статусы и места.
+        """
+        from sqlalchemy import insert
+        from app.model.equipment_history import EquipmentHistoryRepo
+        if rows:
+            # Копии строк: при повторе пачки построчно id справочников определяются заново
+            rows = with_lookup_ids([dict(row) for row in rows], create=create_lookups)
+            for row in rows:
+                row['purchase_date'] = row.get('purchase_date') or default_purchase_date()
+            db.session.execute(insert(Equipment), rows)
+            # INSERT мимо ORM не вызывает событий сессии: историю пишем одним INSERT ... SELECT
+            EquipmentHistoryRepo().record_bulk(
+                'create', [Equipment.inventory_number.in_([row['inventory_number'] for row in rows])])
+            deltas = ValuationDeltas()
+            for row in rows:
+                deltas.add_row(row)
+            ValuationRepo().apply(deltas)
+            self._commit()
+        return len(rows)
+
+    def existing_inventory_numbers(self, inventory_numbers):
+        if not inventory_numbers:
+            return set()
+        query = db.session.query(Equipment.inventory_number).filter(
+            Equipment.inventory_number.in_(inventory_numbers))
+        return {number for (number,) in query}
+
     def delete(self, equipment_id):
         equipment = db.session.get(Equipment, equipment_id)
         if equipment:
-            db.session.delete(equipment)
-            db.session.commit()
+            deltas = ValuationDeltas()
+            deltas.add_equipment(equipment, sign=-1)
+            with versioned_write(equipment, EQUIPMENT_CONFLICT):
+                db.session.delete(equipment)
+                ValuationRepo().apply(deltas)
+                self._commit()
         return equipment
 
     def update(self, equipment_id, name=None, type=None, model=None, inventory_number=None,
-               status=None, location=None, purchase_date=None, price=None, specification=None, user_id=None):
+               status=None, location=None, purchase_date=None, price=None, specification=None, user_id=None,
+               version=None):
+        """Изменяет заполненные поля. version — версия, с которой начиналось редактирование:
+        если оборудование с тех пор изменили, бросается VersionConflict и ничего не пишется.
+        """
         equipment = db.session.get(Equipment, equipment_id)
         if not equipment:
             return None
+        check_version(equipment, version, EQUIPMENT_CONFLICT)
+
+        # Установка справочников и сводка могут вызвать autoflush, поэтому конфликт ловим на всём участке
+        with versioned_write(equipment, EQUIPMENT_CONFLICT):
+            # Сводку стоимости правим разницей: старая группа минус, новая плюс
+            deltas = ValuationDeltas()
+            deltas.add_equipment(equipment, sign=-1)
 
-        if name:
-            equipment.name = name
+            if name:
+                equipment.name = name
+            if type:
+                equipment.type = type
+            if model:
+                equipment.model = model
+            if inventory_number:
+                equipment.inventory_number = inventory_number
+            if status:
+                equipment.status = status
+            if location:
+                equipment.location = location
+            if purchase_date:
+                equipment.purchase_date = purchase_date
+            if price:
+                equipment.price = price
+            if specification:
+                equipment.specification = specification
+            if user_id:
+                equipment.user_id = user_id
+
+            deltas.add_equipment(equipment)
+            ValuationRepo().apply(deltas)
+            self._commit()
+        return equipment
+
+    def bulk_update(self, values, ids=None, type=None, status=None, location=None):
+        """Одним UPDATE ... WHERE меняет поля у выбранных id или у всего, что подходит под фильтр.
+
+        Возвращает число изменённых строк.
+        """
+        unknown = set(values) - set(BULK_UPDATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Массовое изменение полей {', '.join(sorted(unknown))} не поддерживается")
+        values = {key: value for key, value in values.items() if value not in (None, '')}
+        if not values:
+            raise ValueError("Не указано ни одного нового значения")
+        values = with_lookup_ids([values])[0]
+        if not ids and not (type or status or location):
+            # Защита от случайного обновления всей таблицы
+            raise ValueError("Укажите ID оборудования или хотя бы один фильтр")
+
+        where = []
+        if ids:
+            where.append(Equipment.id.in_(ids))
         if type:
-            equipment.type = type
-        if model:
-            equipment.model = model
-        if inventory_number:
-            equipment.inventory_number = inventory_number
+            where.append(lookup_filter('type', type))
         if status:
-            equipment.status = status
+            where.append(lookup_filter('status', status))
         if location:
-            equipment.location = location
-        if purchase_date:
-            equipment.purchase_date = purchase_date
-        if price:
-            equipment.price = price
-        if specification:
-            equipment.specification = specification
-        if user_id:
-            equipment.user_id = user_id
+            where.append(lookup_filter('location', location))
 
-        db.session.commit()
-        return equipment
+        rowcount = self._update_where(where, values)
+        if rowcount:
+            self._commit()
+        else:
+            db.session.rollback()
+        return rowcount
+
+    def unassign_user(self, user_id):
+        """Снимает оборудование с пользователя (перед его удалением) в текущей транзакции.
+
+        Сводка, история и версия таблицы обновляются как при массовом изменении;
+        коммит делает вызывающий. Возвращает число изменённых строк.
+        """
+        rowcount = self._update_where([Equipment.user_id == user_id], {'user_id': None})
+        if rowcount:
+            TableVersionRepo().bump('equipment')
+            # UPDATE прошёл мимо сессии: загруженные объекты иначе перезаписали бы старые значения
+            for item in list(db.session.identity_map.values()):
+                if isinstance(item, Equipment) and item.user_id == user_id:
+                    db.session.expire(item)
+        return rowcount
+
+    def _update_where(self, where, values):
+        from sqlalchemy import update
+        from app.model.equipment_history import EquipmentHistoryRepo
+
+        # Если меняются поля группировки сводки стоимости, переносим агрегаты затронутых групп
+        # (один SELECT ... GROUP BY до UPDATE, без чтения самих строк)
+        valuation = ValuationRepo()
+        deltas = ValuationDeltas()
+        regrouped = {'location_id', 'type_id', 'user_id'} & set(values)
+        if regrouped:
+            for key, count, cost, weighted in valuation.groups_for(where):
+                location_id, type_id, user_id, month = key
+                new_key = (values.get('location_id', location_id), values.get('type_id', type_id),
+                           values.get('user_id', user_id), month)
+                deltas.add_group(key, count, cost, weighted, sign=-1)
+                deltas.add_group(new_key, count, cost, weighted)
+
+        # История пишется до UPDATE, пока в строках старые значения
+        EquipmentHistoryRepo().record_bulk('update', where, values)
+        result = db.session.execute(
+            update(Equipment).where(*where).values(version=Equipment.version + 1, **values)
+            .execution_options(synchronize_session=False))
+        if result.rowcount:
+            valuation.apply(deltas)
+        return result.rowcount
 
     def get_by_id(self, equipment_id):
         return db.session.get(Equipment, equipment_id)
 
-    def filter_by(self, type=None, status=None, location=None):
+    def get_by_inventory_number(self, inventory_number):
+        return db.session.query(Equipment).filter_by(inventory_number=inventory_number).first()
+
+    def _filtered_query(self, type=None, status=None, location=None, with_holder=False):
         query = db.session.query(Equipment)
+        if with_holder:
+            query = query.options(holder_loader())
         if type:
-            query = query.filter_by(type=type)
+            query = query.filter(lookup_filter('type', type))
         if status:
-            query = query.filter_by(status=status)
+            query = query.filter(lookup_filter('status', status))
         if location:
-            query = query.filter_by(location=location)
-        return query.all()
+            query = query.filter(lookup_filter('location', location))
+        return query
 
-    def count_by_status(self):
+    def filter_by(self, type=None, status=None, location=None):
+        return self._filtered_query(type, status, location).all()
+
+    def count(self, type=None, status=None, location=None):
+        return self._filtered_query(type, status, location).order_by(None).count()
+
+    def iter_columns(self, columns, type=None, status=None, location=None, batch_size=1000):
+        """Потоково отдаёт кортежи колонок: серверный курсор и yield_per держат память постоянной.
+
+        Для type, status и location читаются id, а названия подставляются из lookup_cache.
+        """
+        lookups = [(index, column) for index, column in enumerate(columns) if column in LOOKUPS]
+        query = self._filtered_query(type, status, location) \
+            .with_entities(*[getattr(Equipment, LOOKUPS[column][1] if column in LOOKUPS else column)
+                             for column in columns]) \
+            .order_by(Equipment.id) \
+            .execution_options(yield_per=batch_size)
+        for row in query:
+            if lookups:
+                row = list(row)
+                for index, column in lookups:
+                    row[index] = lookup_cache.name(column, row[index])
+                row = tuple(row)
+            yield row
+
+    def paginate(self, type=None, status=None, location=None, sort='id', descending=False,
+                 after=None, before=None, per_page=50, with_holder=False):
+        """Курсорная пагинация по (sort, id): стоимость страницы не зависит от её номера.
+
+        with_holder=True догружает сотрудников страницы одним дополнительным запросом.
+        """
+        from sqlalchemy import tuple_
+
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Сортировка по полю '{sort}' не поддерживается")
+        column = SORT_COLUMNS[sort]
+        query = self._filtered_query(type, status, location, with_holder)
+        if column.class_ is EquipmentType:
+            query = query.join(EquipmentType, EquipmentType.id == Equipment.type_id)
+
+        # При движении назад идём в обратном порядке и затем разворачиваем результат
+        backwards = before is not None and after is None
+        cursor = before if backwards else after
+        reverse = descending != backwards
+
+        if cursor is not None:
+            value, last_id = decode_cursor(cursor)
+            # Сравнение кортежей (sort, id) > (:value, :id) превращается в поиск по диапазону индекса
+            if column is Equipment.id:
+                key, bound = Equipment.id, last_id
+            else:
+                key, bound = tuple_(column, Equipment.id), tuple_(value, last_id)
+            query = query.filter(key < bound if reverse else key > bound)
+
+        if column is Equipment.id:
+            order = [Equipment.id.desc() if reverse else Equipment.id.asc()]
+        elif reverse:
+            order = [column.desc(), Equipment.id.desc()]
+        else:
+            order = [column.asc(), Equipment.id.asc()]
+
+        rows = query.order_by(*order).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+
+        def cursor_for(item):
+            # Ключ сортировки совпадает с атрибутом: item.type — название из справочника
+            return encode_cursor(getattr(item, sort), item.id)
+
+        next_cursor = prev_cursor = None
+        if rows:
+            if backwards:
+                next_cursor = cursor_for(rows[-1])
+                prev_cursor = cursor_for(rows[0]) if has_more else None
+            else:
+                next_cursor = cursor_for(rows[-1]) if has_more else None
+                prev_cursor = cursor_for(rows[0]) if cursor is not None else None
+        return EquipmentPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+    def search(self, q, type=None, status=None, location=None, limit=50, candidates=2000, with_holder=False):
+        """Полнотекстовый поиск по названию, модели, инвентарному номеру и спецификации.
+
+        Слова запроса ищутся как префиксы и объединяются через AND; результаты
+        отсортированы по релевантности. В SQLite FTS5 сам отбирает `candidates` лучших
+        по rank совпадений (частичная сортировка без чтения строк equipment), и только они
+        соединяются с таблицей; при равной релевантности порядок — по id.
+        """
+        from sqlalchemy import or_, text
+        from app.model.equipment_search import (FTS_TABLE, SEARCH_COLUMNS, search_terms,
+                                                fts_match_expression, mysql_boolean_expression)
+
+        terms = search_terms(q or '')
+        if not terms:
+            return []
+        dialect = db.session.get_bind().dialect.name
+
+        if dialect == 'sqlite':
+            conditions = [f'{FTS_TABLE} MATCH :match']
+            params = {'match': fts_match_expression(terms), 'candidates': candidates, 'limit': limit}
+            for kind, value in (('type', type), ('status', status), ('location', location)):
+                if value:
+                    column = LOOKUPS[kind][1]
+                    params[column] = lookup_cache.id(kind, value)
+                    if params[column] is None:
+                        return []
+                    conditions.append(f'equipment.{column} = :{column}')
+            # CROSS JOIN фиксирует порядок соединения: сначала индекс FTS, затем строки по первичному ключу
+            join = f'CROSS JOIN equipment ON equipment.id = {FTS_TABLE}.rowid' if len(conditions) > 1 else ''
+            statement = text(f"""
+                SELECT equipment.* FROM (
+                    SELECT {FTS_TABLE}.rowid AS id, {FTS_TABLE}.rank AS rank
+                    FROM {FTS_TABLE} {join}
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY {FTS_TABLE}.rank
+                    LIMIT :candidates
+                ) AS candidates CROSS JOIN equipment ON equipment.id = candidates.id
+                ORDER BY candidates.rank, equipment.id
+                LIMIT :limit
+            """).bindparams(**params)
+            query = db.session.query(Equipment)
+            if with_holder:
+                query = query.options(holder_loader())
+            return query.from_statement(statement).all()
+
+        query = self._filtered_query(type, status, location, with_holder)
+        if dialect == 'mysql':
+            match = f"MATCH ({', '.join(SEARCH_COLUMNS)}) AGAINST (:match IN BOOLEAN MODE)"
+            query = query.filter(text(match)) \
+                .order_by(text(f'{match} DESC'), Equipment.id) \
+                .params(match=mysql_boolean_expression(terms))
+        else:
+            # Запасной вариант без индекса для прочих СУБД
+            for term in terms:
+                query = query.filter(or_(*[getattr(Equipment, column).ilike(f'%{term}%')
+                                           for column in SEARCH_COLUMNS]))
+            query = query.order_by(Equipment.id)
+        return query.limit(limit).all()
+
+    def _count_by(self, kind, column):
         from sqlalchemy import func
-        return db.session.query(Equipment.status, func.count(Equipment.id)).group_by(Equipment.status).all()
+        rows = db.session.query(column, func.count(Equipment.id)).group_by(column).all()
+        return [(lookup_cache.name(kind, lookup_id), count) for lookup_id, count in rows]
+
+    def count_by_status(self):
+        return self._count_by('status', Equipment.status_id)
 
     def count_by_type(self):
-        from sqlalchemy import func
-        return db.session.query(Equipment.type, func.count(Equipment.id)).group_by(Equipment.type).all()
\ No newline at end of file
+        return self._count_by('type', Equipment.type_id)
\ No newline at end of file
@@ -0,0 +1,208 @@
+import json
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import event, func, insert, inspect, literal, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.model.equipment import Equipment
+from app.model.lookup import LOOKUPS
+from app.model.table_version import utcnow
+
+# Поля, изменения которых попадают в историю; справочники — по id, как в самой таблице
+HISTORY_FIELDS = ('name', 'type_id', 'model', 'inventory_number', 'status_id', 'location_id',
+                  'purchase_date', 'price', 'specification', 'user_id')
+LOOKUP_FIELDS = {column: kind for kind, (_, column) in LOOKUPS.items()}
+
+# Ключ session.info, в котором before_flush оставляет изменения для after_flush
+_PENDING = 'equipment_history_pending'
+
+
+class EquipmentHistory(db.Model):
+    """Журнал изменений оборудования: строки только добавляются, UPDATE и DELETE не бывает.
+
+    changes — JSON {поле: [было, стало]}. У создания "было" пустое, у удаления — "стало".
+    Внешнего ключа на equipment нет намеренно: история удалённого оборудования остаётся.
+    Порядок событий — по id, поэтому оба индекса заканчиваются на id.
+    """
+    __tablename__ = 'equipment_history'
+    __table_args__ = (
+        db.Index('ix_equipment_history_item', 'equipment_id', 'id'),
+        db.Index('ix_equipment_history_actor', 'changed_by', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # create, update, delete
+    changes = db.Column(db.Text, nullable=False)
+    changed_by = db.Column(db.Integer)  # id пользователя; NULL — CLI и прочие изменения вне запроса
+    changed_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    @property
+    def diff(self):
+        return json.loads(self.changes)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'equipment_id': self.equipment_id,
+            'action': self.action,
+            'changes': readable_changes(self.diff),
+            'changed_by': self.changed_by,
+            'changed_at': self.changed_at.isoformat(),
+        }
+
+    def __repr__(self):
+        return f'<EquipmentHistory {self.equipment_id} {self.action}>'
+
+
+def json_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def readable(field, value):
+    """Заменяет id справочника его названием: ('type_id', 3) -> ('type', 'Ноутбук')."""
+    from app.service.lookup_cache import lookup_cache
+
+    kind = LOOKUP_FIELDS.get(field)
+    if kind:
+        return kind, lookup_cache.name(kind, value)
+    return field, value
+
+
+def readable_changes(changes):
+    result = {}
+    for field, values in changes.items():
+        result[readable(field, None)[0]] = [readable(field, value)[1] for value in values]
+    return result
+
+
+def current_actor_id():
+    from flask import g, has_app_context, has_request_context
+    from flask_login import current_user
+
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id
+    # Вне запроса (фоновые задачи) автора задаёт acting_as
+    if has_app_context():
+        return g.get('history_actor')
+    return None
+
+
+@contextmanager
+def acting_as(user_id):
+    """Записывает историю, сделанную вне запроса, от имени user_id (например, поставившего задачу)."""
+    from flask import g
+
+    previous = g.get('history_actor')
+    g.history_actor = user_id
+    try:
+        yield
+    finally:
+        g.history_actor = previous
+
+
+def attribute_changes(equipment):
+    changes = {}
+    state = inspect(equipment)
+    for field in HISTORY_FIELDS:
+        history = state.attrs[field].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old != new:
+            changes[field] = [json_value(old), json_value(new)]
+    return changes
+
+
+def snapshot(equipment, sign):
+    values = {field: json_value(getattr(equipment, field)) for field in HISTORY_FIELDS}
+    if sign > 0:
+        return {field: [None, value] for field, value in values.items()}
+    return {field: [value, None] for field, value in values.items()}
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_changes(session, flush_context, instances):
+    # Разница считается до flush, пока в атрибутах есть старые значения;
+    # id новых строк появятся только после INSERT, поэтому сама запись — в after_flush
+    pending = []
+    for equipment in session.new:
+        if isinstance(equipment, Equipment):
+            pending.append((equipment, 'create', snapshot(equipment, 1)))
+    for equipment in session.dirty:
+        if isinstance(equipment, Equipment):
+            changes = attribute_changes(equipment)
+            if changes:
+                pending.append((equipment, 'update', changes))
+    for equipment in session.deleted:
+        if isinstance(equipment, Equipment):
+            pending.append((equipment, 'delete', snapshot(equipment, -1)))
+
+    session.info[_PENDING] = (current_actor_id(), pending) if pending else None
+
+
+@event.listens_for(Session, 'after_flush')
+def _write_changes(session, flush_context):
+    # Все изменения flush — одним INSERT (executemany) в той же транзакции
+    collected = session.info.pop(_PENDING, None)
+    if not collected:
+        return
+    actor, pending = collected
+    now = utcnow()
+    session.connection().execute(insert(EquipmentHistory), [{
+        'equipment_id': equipment.id,
+        'action': action,
+        'changes': json.dumps(changes, ensure_ascii=False),
+        'changed_by': actor,
+        'changed_at': now,
+    } for equipment, action, changes in pending])
+
+
+class EquipmentHistoryRepo:
+    def record_bulk(self, action, where, values=None):
+        """Пишет историю массовой операции одним INSERT ... SELECT по строкам equipment.
+
+        Вызывается до UPDATE (значения "было" берутся из таблицы, "стало" — из values)
+        или после INSERT для create. Коммит делает вызывающий репозиторий.
+        """
+        if action == 'create':
+            pairs = {field: func.json_array(None, getattr(Equipment, field)) for field in HISTORY_FIELDS}
+        else:
+            pairs = {field: func.json_array(getattr(Equipment, field), literal(value))
+                     for field, value in values.items()}
+        changes = func.json_object(*[part for field, value in pairs.items() for part in (field, value)])
+        query = select(Equipment.id, literal(action), changes, literal(current_actor_id()), literal(utcnow())) \
+            .where(*where)
+        db.session.execute(insert(EquipmentHistory).from_select(
+            ['equipment_id', 'action', 'changes', 'changed_by', 'changed_at'], query))
+
+    def timeline(self, equipment_id, after=None, limit=100):
+        """События одной единицы оборудования от старых к новым (индекс equipment_id, id)."""
+        query = db.session.query(EquipmentHistory).filter(EquipmentHistory.equipment_id == equipment_id)
+        if after is not None:
+            query = query.filter(EquipmentHistory.id > after)
+        return query.order_by(EquipmentHistory.id).limit(limit).all()
+
+    def activity(self, user_id, before=None, limit=100):
+        """Изменения, сделанные пользователем, от новых к старым (индекс changed_by, id)."""
+        query = db.session.query(EquipmentHistory).filter(EquipmentHistory.changed_by == user_id)
+        if before is not None:
+            query = query.filter(EquipmentHistory.id < before)
+        return query.order_by(EquipmentHistory.id.desc()).limit(limit).all()
+
+    def state_at(self, equipment_id, moment):
+        """Поля оборудования на момент moment по истории или None, если его тогда не было."""
+        state = None
+        query = db.session.query(EquipmentHistory) \
+            .filter(EquipmentHistory.equipment_id == equipment_id, EquipmentHistory.changed_at <= moment) \
+            .order_by(EquipmentHistory.id)
+        for entry in query:
+            if entry.action == 'delete':
+                state = None
+                continue
+            state = dict(state or {})
+            for field, (_, new) in entry.diff.items():
+                state[field] = new
+        return dict(readable(field, value) for field, value in state.items()) if state else None
@@ -0,0 +1,86 @@
+import re
+
+from sqlalchemy import DDL, event, inspect, text
+
+from app import db
+from app.model.equipment import Equipment
+
+# Колонки, по которым идёт поиск, и их веса в ранжировании bm25 (SQLite)
+SEARCH_COLUMNS = ('name', 'model', 'inventory_number', 'specification')
+SEARCH_WEIGHTS = (10.0, 5.0, 8.0, 1.0)
+
+FTS_TABLE = 'equipment_fts'
+MYSQL_FULLTEXT_INDEX = 'ft_equipment_search'
+
+_columns = ', '.join(SEARCH_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+# Внешний FTS5-индекс (content='equipment') хранит только инвертированный индекс,
+# сами строки читаются из equipment; триггеры держат его в синхронизации при любых
+# вставках и изменениях, включая массовые INSERT/UPDATE в обход ORM
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_columns},
+        content='equipment', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    # Функция ранжирования для скрытой колонки rank: веса колонок в порядке SEARCH_COLUMNS
+    f"""INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25({", ".join(map(str, SEARCH_WEIGHTS))})')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON equipment BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON equipment BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON equipment BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+]
+MYSQL_FULLTEXT_DDL = f"ALTER TABLE equipment ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} ({_columns})"
+
+for _statement in SQLITE_FTS_DDL:
+    event.listen(Equipment.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Equipment.__table__, 'after_create', DDL(MYSQL_FULLTEXT_DDL).execute_if(dialect='mysql'))
+event.listen(Equipment.__table__, 'before_drop', DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(dialect='sqlite'))
+
+
+def search_index_missing(inspector):
+    dialect = db.engine.dialect.name
+    if not inspector.has_table('equipment'):
+        return False
+    if dialect == 'sqlite':
+        return not inspector.has_table(FTS_TABLE)
+    if dialect == 'mysql':
+        return MYSQL_FULLTEXT_INDEX not in {index['name'] for index in inspector.get_indexes('equipment')}
+    return False
+
+
+def create_search_index():
+    """Создаёт поисковый индекс для уже существующей таблицы equipment и заполняет его."""
+    if not search_index_missing(inspect(db.engine)):
+        return False
+    with db.engine.begin() as connection:
+        if db.engine.dialect.name == 'sqlite':
+            for statement in SQLITE_FTS_DDL:
+                connection.execute(text(statement))
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        else:
+            connection.execute(text(MYSQL_FULLTEXT_DDL))
+    return True
+
+
+def search_terms(query):
+    # Разбиваем на слова так же, как токенизатор unicode61: всё, что не буква и не цифра, — разделитель
+    return [term for term in re.split(r'[\W_]+', query.lower()) if term]
+
+
+def fts_match_expression(terms):
+    # Каждое слово — префикс в кавычках, слова объединяются через AND
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def mysql_boolean_expression(terms):
+    return ' '.join(f'+{term}*' for term in terms)
@@ -0,0 +1,168 @@
+import json
+
+from app import db
+from app.model.table_version import utcnow
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+JOB_STATUS_TITLES = {
+    'queued': 'В очереди',
+    'running': 'Выполняется',
+    'done': 'Готово',
+    'failed': 'Ошибка',
+}
+
+
+class Job(db.Model):
+    """Фоновая задача: очередь живёт в этой же БД, её разбирают воркеры `flask jobs worker`."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Воркер берёт самую старую задачу в очереди: поиск по (status, id) без сортировки
+        db.Index('ix_jobs_status', 'status', 'id'),
+        db.Index('ix_jobs_created_by', 'created_by', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='queued')
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    message = db.Column(db.String(200))
+    worker = db.Column(db.String(100))
+    created_by = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    started_at = db.Column(db.DateTime)
+    # Обновляется при каждом отчёте о прогрессе: по нему находятся задачи упавших воркеров
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def params(self):
+        return json.loads(self.payload or '{}')
+
+    @property
+    def result_data(self):
+        return json.loads(self.result) if self.result else None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    @property
+    def percent(self):
+        if self.status == 'done':
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, int(self.progress_done * 100 / self.progress_total))
+
+    @property
+    def status_title(self):
+        return JOB_STATUS_TITLES.get(self.status, self.status)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': {'done': self.progress_done, 'total': self.progress_total, 'percent': self.percent},
+            'message': self.message,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind}: {self.status}>'
+
+
+class JobRepo:
+    def enqueue(self, kind, payload=None, created_by=None):
+        job = Job(kind=kind, payload=json.dumps(payload or {}, ensure_ascii=False), created_by=created_by)
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def get_by_id(self, job_id):
+        return db.session.get(Job, job_id)
+
+    def recent(self, created_by=None, limit=50):
+        query = db.session.query(Job)
+        if created_by is not None:
+            query = query.filter(Job.created_by == created_by)
+        return query.order_by(Job.id.desc()).limit(limit).all()
+
+    def claim(self, worker):
+        """Забирает самую старую задачу из очереди или возвращает None.
+
+        UPDATE ... WHERE status = 'queued' работает как compare-and-set: если задачу
+        между SELECT и UPDATE забрал другой воркер, строка не изменится и берём следующую.
+        """
+        from sqlalchemy import update
+
+        while True:
+            job_id = db.session.query(Job.id).filter(Job.status == 'queued').order_by(Job.id).limit(1).scalar()
+            if job_id is None:
+                db.session.rollback()
+                return None
+            now = utcnow()
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == 'queued')
+                .values(status='running', worker=worker, started_at=now, updated_at=now)
+            )
+            db.session.commit()
+            if result.rowcount:
+                return self.get_by_id(job_id)
+
+    def set_progress(self, job_id, done, total=None, message=None):
+        """Пишет прогресс отдельной короткой транзакцией, не задевая транзакцию самой задачи."""
+        from sqlalchemy import update
+
+        values = {'progress_done': done, 'updated_at': utcnow()}
+        if total is not None:
+            values['progress_total'] = total
+        if message is not None:
+            values['message'] = message[:200]
+        with db.engine.begin() as connection:
+            connection.execute(update(Job).where(Job.id == job_id).values(**values))
+
+    def finish(self, job_id, result=None, message=None):
+        job = self.get_by_id(job_id)
+        job.status = 'done'
+        job.result = json.dumps(result, ensure_ascii=False) if result is not None else None
+        if message is not None:
+            job.message = message[:200]
+        job.finished_at = job.updated_at = utcnow()
+        db.session.commit()
+        return job
+
+    def fail(self, job_id, error):
+        job = self.get_by_id(job_id)
+        job.status = 'failed'
+        job.error = error
+        job.finished_at = job.updated_at = utcnow()
+        db.session.commit()
+        return job
+
+    def requeue_stale(self, older_than):
+        """Возвращает в очередь задачи, воркер которых перестал отчитываться (упал или был убит)."""
+        from sqlalchemy import update
+
+        result = db.session.execute(
+            update(Job)
+            .where(Job.status == 'running', Job.updated_at < older_than)
+            .values(status='queued', worker=None, started_at=None, updated_at=utcnow())
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def prune(self, older_than):
+        """Удаляет завершённые задачи старше older_than; возвращает их (для удаления файлов)."""
+        jobs = db.session.query(Job).filter(Job.status.in_(('done', 'failed')), Job.finished_at < older_than).all()
+        for job in jobs:
+            db.session.delete(job)
+        db.session.commit()
+        return jobs
@@ -0,0 +1,209 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.model.table_version import TableVersionRepo
+
+
+class EquipmentType(db.Model):
+    __tablename__ = 'equipment_types'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<EquipmentType {self.name}>'
+
+
+class EquipmentStatus(db.Model):
+    __tablename__ = 'equipment_statuses'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(20), unique=True, nullable=False)  # available, in_use, in_repair, retired
+
+    def __repr__(self):
+        return f'<EquipmentStatus {self.name}>'
+
+
+class Location(db.Model):
+    __tablename__ = 'locations'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<Location {self.name}>'
+
+
+# Справочник -> (модель, колонка-ссылка в equipment)
+LOOKUPS = {
+    'type': (EquipmentType, 'type_id'),
+    'status': (EquipmentStatus, 'status_id'),
+    'location': (Location, 'location_id'),
+}
+
+LOOKUP_TITLES = {
+    'type': 'Типы оборудования',
+    'status': 'Статусы',
+    'location': 'Местоположения',
+}
+
+# Начальное наполнение справочников (раньше эти списки были зашиты в list_equipment)
+DEFAULT_LOOKUPS = {
+    'type': ['Компьютер', 'Ноутбук', 'Монитор', 'Принтер', 'Сканер', 'Сервер', 'Роутер'],
+    'status': ['available', 'in_use', 'in_repair', 'retired'],
+    'location': ['Офис 101', 'Офис 102', 'Офис 201', 'Склад', 'Бухгалтерия', 'ИТ-отдел'],
+}
+
+
+class UnknownLookup(ValueError):
+    """Значения нет в справочнике: новые значения добавляет администратор на странице справочников."""
+
+    def __init__(self, kind, names):
+        self.kind = kind
+        self.names = names
+        super().__init__(f"Значения {', '.join(repr(name) for name in names)} нет в справочнике "
+                         f"«{LOOKUP_TITLES[kind]}»")
+
+
+def lookup_model(kind):
+    if kind not in LOOKUPS:
+        raise ValueError(f"Неизвестный справочник '{kind}'")
+    return LOOKUPS[kind][0]
+
+
+class LookupRepo:
+    def _commit(self):
+        from app.service.lookup_cache import lookup_cache
+        # Версия 'lookups' входит в ключи кэша рендеринга и ETag API
+        TableVersionRepo().bump('lookups')
+        db.session.commit()
+        lookup_cache.invalidate()
+
+    def all(self, kind):
+        model = lookup_model(kind)
+        return db.session.query(model).order_by(model.name).all()
+
+    def get_by_id(self, kind, lookup_id):
+        return db.session.get(lookup_model(kind), lookup_id)
+
+    def add(self, kind, name):
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("Название обязательно для заполнения")
+        model = lookup_model(kind)
+        if db.session.query(model.id).filter(model.name == name).first():
+            raise ValueError(f"Значение '{name}' уже есть в справочнике")
+        item = model(name=name)
+        db.session.add(item)
+        self._commit()
+        return item
+
+    def rename(self, kind, lookup_id, name):
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("Название обязательно для заполнения")
+        item = self.get_by_id(kind, lookup_id)
+        if item is None:
+            return None
+        model = lookup_model(kind)
+        if db.session.query(model.id).filter(model.name == name, model.id != lookup_id).first():
+            raise ValueError(f"Значение '{name}' уже есть в справочнике")
+        # Оборудование ссылается на id, поэтому переименование — одна строка, а не UPDATE всей таблицы
+        item.name = name
+        self._commit()
+        return item
+
+    def usage_count(self, kind, lookup_id):
+        from app.model.equipment import Equipment
+        column = getattr(Equipment, LOOKUPS[kind][1])
+        return db.session.query(Equipment.id).filter(column == lookup_id).count()
+
+    def delete(self, kind, lookup_id):
+        item = self.get_by_id(kind, lookup_id)
+        if item is None:
+            return None
+        used = self.usage_count(kind, lookup_id)
+        if used:
+            raise ValueError(f"Значение '{item.name}' используется у {used} ед. оборудования")
+        db.session.delete(item)
+        self._commit()
+        return item
+
+    def resolve(self, kind, names, create=False):
+        """Возвращает {название: id} для значений справочника.
+
+        Неизвестные названия — UnknownLookup; create=True добавляет их через ensure
+        (импорт с явным флагом).
+        """
+        from app.service.lookup_cache import lookup_cache
+
+        if create:
+            return self.ensure(kind, names)
+        ids = {name: lookup_cache.id(kind, name) for name in set(names) if name}
+        missing = sorted(name for name, lookup_id in ids.items() if lookup_id is None)
+        if missing:
+            raise UnknownLookup(kind, missing)
+        return ids
+
+    def ensure(self, kind, names):
+        """Возвращает {название: id}, добавляя недостающие значения в текущей транзакции.
+
+        Коммит делает вызывающий репозиторий. Кэш справочников сбрасывается после коммита
+        или отката транзакции, чтобы в нём не остались id из откаченной транзакции.
+        Значение, которое параллельно добавил другой писатель, не вставляется повторно,
+        а берётся из БД.
+        """
+        from sqlalchemy import insert
+        from app.service.lookup_cache import lookup_cache
+
+        names = {name for name in names if name}
+        ids = {name: lookup_cache.id(kind, name) for name in names}
+        missing = sorted(name for name, lookup_id in ids.items() if lookup_id is None)
+        if missing:
+            model = lookup_model(kind)
+            db.session.info['lookups_changed'] = True
+            # INSERT с пропуском дубликатов вместо точки сохранения: pysqlite без явного BEGIN
+            # фиксирует SAVEPOINT при RELEASE, и откат транзакции не убрал бы новое значение
+            db.session.execute(
+                insert(model).prefix_with('OR IGNORE', dialect='sqlite').prefix_with('IGNORE', dialect='mysql'),
+                [{'name': name} for name in missing])
+            ids.update(db.session.query(model.name, model.id).filter(model.name.in_(missing)).all())
+            TableVersionRepo().bump('lookups')
+            lookup_cache.invalidate()
+        return ids
+
+    def missing_defaults(self):
+        """{справочник: значения DEFAULT_LOOKUPS, которых в нём нет}."""
+        missing = {}
+        for kind, names in DEFAULT_LOOKUPS.items():
+            model = lookup_model(kind)
+            existing = {name for (name,) in db.session.query(model.name).filter(model.name.in_(names))}
+            absent = [name for name in names if name not in existing]
+            if absent:
+                missing[kind] = absent
+        return missing
+
+    def seed_defaults(self):
+        """Добавляет недостающие значения DEFAULT_LOOKUPS, в том числе в уже заполненные справочники
+        (после переноса старой БД в них есть только значения, встречавшиеся в данных)."""
+        added = 0
+        for kind, names in self.missing_defaults().items():
+            model = lookup_model(kind)
+            db.session.add_all(model(name=name) for name in names)
+            added += len(names)
+        if added:
+            self._commit()
+        return added
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # Во время транзакции кэш мог перечитать ещё не зафиксированные значения из ensure
+    if session.info.pop('lookups_changed', False):
+        from app.service.lookup_cache import lookup_cache
+        lookup_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _invalidate_after_rollback(session, previous_transaction):
+    if previous_transaction.parent is None and session.info.pop('lookups_changed', False):
+        from app.service.lookup_cache import lookup_cache
+        lookup_cache.invalidate()
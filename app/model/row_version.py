@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import db
+
+
+# Форма изменения пришла без версии: проверить, не изменили ли запись после показа списка, нечем
+MISSING_VERSION = "Не указана версия записи: выберите запись в списке кнопкой «Изменить» и повторите изменение"
+
+
+class VersionConflict(Exception):
+    """Строку успели изменить после того, как её прочитал автор изменения."""
+
+    def __init__(self, message, current_version=None):
+        super().__init__(message)
+        self.current_version = current_version
+
+
+def check_version(obj, expected_version, message):
+    """Сравнивает версию, с которой начиналось редактирование, с текущей."""
+    if expected_version is not None and obj.version != int(expected_version):
+        raise VersionConflict(message.format(version=obj.version), obj.version)
+
+
+@contextmanager
+def versioned_write(obj, message):
+    """Превращает StaleDataError (UPDATE ... WHERE version = :old не нашёл строку) в VersionConflict.
+
+    Так ловится гонка между чтением и записью: параллельный писатель успел увеличить версию.
+    """
+    model, object_id = type(obj), obj.id
+    try:
+        yield
+    except StaleDataError:
+        db.session.rollback()
+        current = db.session.query(model.version).filter_by(id=object_id).scalar()
+        raise VersionConflict(message.format(version=current), current)
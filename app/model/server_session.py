@@ -0,0 +1,18 @@
+from app import db
+
+
+class SessionRecord(db.Model):
+    """Серверная сессия: в cookie лежит только id, данные — здесь.
+
+    expires_at — Unix-время в секундах; по индексу на нём чистильщик удаляет истёкшие строки.
+    """
+    __tablename__ = 'sessions'
+    __table_args__ = (
+        db.Index('ix_sessions_expires_at', 'expires_at'),
+    )
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<SessionRecord {self.id[:8]}…>'
@@ -0,0 +1,37 @@
+from app import db
+from datetime import datetime, timezone
+
+
+def utcnow():
+    # SQLite хранит DateTime без часового пояса, поэтому держим наивное UTC-время
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class TableVersion(db.Model):
+    """Счётчик изменений таблицы: растёт при каждой записи через репозитории."""
+    __tablename__ = 'table_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f'<TableVersion {self.name}={self.version}>'
+
+
+class TableVersionRepo:
+    def bump(self, name):
+        """Увеличивает версию в текущей транзакции; коммит делает вызывающий репозиторий."""
+        from sqlalchemy import update
+        now = utcnow()
+        result = db.session.execute(
+            update(TableVersion)
+            .where(TableVersion.name == name)
+            .values(version=TableVersion.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            db.session.add(TableVersion(name=name, version=1, updated_at=now))
+
+    def get(self, *names):
+        rows = db.session.query(TableVersion).filter(TableVersion.name.in_(names)).all()
+        found = {row.name: (row.version, row.updated_at) for row in rows}
+        return {name: found.get(name, (0, None)) for name in names}
@@ -1,6 +1,8 @@
 from app import db
+from app.model.row_version import VersionConflict, check_version, versioned_write
+from app.model.table_version import TableVersionRepo
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.service.identity_cache import identity_cache
 
 
 class User(db.Model, UserMixin):
@@ -9,21 +11,43 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(50), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), default='user')  # user, admin, manager
+    # Оптимистическая блокировка, как у Equipment
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
 
     # Связь с оборудованием
     equipment = db.relationship('Equipment', backref='assigned_user', lazy=True)
 
+    # Хэш считается в ограниченном пуле password_hasher; при его перегрузке — HasherBusy
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from app.service.password_service import password_hasher
+        self.password_hash = password_hasher.generate(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        from app.service.password_service import password_hasher
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        from app.service.password_service import needs_rehash
+        return needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.username}, role: {self.role}>'
 
 
+USER_CONFLICT = ("Пользователя уже изменил другой администратор (текущая версия {version}). "
+                 "Обновите страницу и внесите изменения заново")
+
+
 class UserRepo:
+    def _commit(self):
+        from app.service.stats_service import stats_service
+        # Версия таблицы растёт в той же транзакции, что и сами изменения
+        TableVersionRepo().bump('users')
+        db.session.commit()
+        stats_service.invalidate()
+
     def get_by_username(self, username):
         return db.session.query(User).filter_by(username=username).first()
 
@@ -40,16 +64,55 @@ class UserRepo:
         user = User(username=username, role=role)
         user.set_password(password)
         db.session.add(user)
-        db.session.commit()  # Убедитесь, что коммит выполняется
+        self._commit()  # Убедитесь, что коммит выполняется
         return user
 
     def all(self):
         return db.session.query(User).all()
 
-    def update(self, user_id, username=None, password=None, role=None):
+    def equipment_totals(self, user_ids=None):
+        """{id пользователя: (единиц оборудования, суммарная цена)} одним агрегирующим запросом.
+
+        Читается сводка equipment_valuation, которую EquipmentRepo обновляет при каждой
+        записи: в ней строк столько, сколько групп (место, тип, месяц), а не единиц.
+        """
+        from sqlalchemy import func
+        from app.model.valuation import EquipmentValuation
+
+        query = db.session.query(EquipmentValuation.user_id,
+                                 func.sum(EquipmentValuation.item_count),
+                                 func.sum(EquipmentValuation.cost_total)) \
+            .filter(EquipmentValuation.user_id.isnot(None))
+        if user_ids is not None:
+            if not user_ids:
+                return {}
+            query = query.filter(EquipmentValuation.user_id.in_(user_ids))
+        rows = query.group_by(EquipmentValuation.user_id).all()
+        return {user_id: (int(count or 0), float(total or 0)) for user_id, count, total in rows if count}
+
+    def all_with_equipment_totals(self):
+        """Список (пользователь, единиц оборудования, суммарная цена) за два запроса."""
+        users = db.session.query(User).order_by(User.id).all()
+        totals = self.equipment_totals()
+        return [(user, *totals.get(user.id, (0, 0.0))) for user in users]
+
+    def paginate(self, role=None, after=None, per_page=50):
+        """Курсорная пагинация по id; возвращает (пользователи, id для следующей страницы)."""
+        query = db.session.query(User)
+        if role:
+            query = query.filter_by(role=role)
+        if after is not None:
+            query = query.filter(User.id > after)
+        users = query.order_by(User.id).limit(per_page + 1).all()
+        next_after = users[per_page - 1].id if len(users) > per_page else None
+        return users[:per_page], next_after
+
+    def update(self, user_id, username=None, password=None, role=None, version=None):
+        """Изменяет заполненные поля; при несовпадении version бросает VersionConflict."""
         user = db.session.get(User, user_id)
         if not user:
             return None
+        check_version(user, version, USER_CONFLICT)
 
         if username:
             user.username = username
@@ -58,14 +121,32 @@ class UserRepo:
         if role:
             user.role = role
 
-        db.session.commit()
+        with versioned_write(user, USER_CONFLICT):
+            self._commit()
+        identity_cache.invalidate(user.id)
+        return user
+
+    def set_password_hash(self, user, password_hash):
+        user.password_hash = password_hash
+        try:
+            with versioned_write(user, USER_CONFLICT):
+                self._commit()
+        except VersionConflict:
+            # Пользователя изменили параллельно: хэш пересчитается при следующем входе
+            pass
         return user
 
     def delete(self, user_id):
+        from app.model.equipment import EquipmentRepo
+
         user = db.session.get(User, user_id)
         if user:
+            # Оборудование снимается явно, а не каскадом ORM: так обновляются сводка, история и версия
+            EquipmentRepo().unassign_user(user_id)
+            db.session.expire(user, ['equipment'])
             db.session.delete(user)
-            db.session.commit()
+            self._commit()
+            identity_cache.invalidate(user_id)
         return user
 
     def count_by_role(self):
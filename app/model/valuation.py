@@ -0,0 +1,192 @@
+from app import db
+
+
+class EquipmentValuation(db.Model):
+    """Сводка по оборудованию для отчёта о стоимости: одна строка на
+    (место, тип, сотрудник, месяц покупки); место и тип — id справочников.
+
+    cost_day_weighted — сумма price * (день месяца - 1); вместе с cost_total она даёт
+    средневзвешенную дату покупки в месяце, и линейная амортизация всей строки
+    считается точно без чтения самого оборудования.
+    """
+    __tablename__ = 'equipment_valuation'
+    __table_args__ = (
+        db.Index('ix_equipment_valuation_key', 'type_id', 'location_id', 'user_id', 'purchase_month'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer)
+    type_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer)
+    purchase_month = db.Column(db.Date)  # первое число месяца, NULL — дата покупки не указана
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    cost_total = db.Column(db.Float, nullable=False, default=0)
+    cost_day_weighted = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<EquipmentValuation {self.type_id}/{self.location_id}/{self.purchase_month}: {self.item_count}>'
+
+
+KEY_FIELDS = ('location_id', 'type_id', 'user_id', 'purchase_date')
+
+
+def valuation_key(location_id, type_id, user_id, purchase_date):
+    month = purchase_date.replace(day=1) if purchase_date else None
+    return location_id, type_id, user_id, month
+
+
+def valuation_delta(purchase_date, price, sign=1):
+    price = price or 0.0
+    offset = purchase_date.day - 1 if purchase_date else 0
+    return sign, sign * price, sign * price * offset
+
+
+class ValuationDeltas:
+    """Накапливает изменения сводки в памяти, чтобы пачка записей давала по одному UPDATE на группу."""
+
+    def __init__(self):
+        self._deltas = {}
+
+    def add(self, location_id, type_id, user_id, purchase_date, price, sign=1):
+        key = valuation_key(location_id, type_id, user_id, purchase_date)
+        count, cost, weighted = valuation_delta(purchase_date, price, sign)
+        current = self._deltas.get(key, (0, 0.0, 0.0))
+        self._deltas[key] = (current[0] + count, current[1] + cost, current[2] + weighted)
+
+    def add_row(self, row, sign=1):
+        self.add(*(row.get(field) for field in KEY_FIELDS), row.get('price'), sign)
+
+    def add_equipment(self, equipment, sign=1):
+        self.add(*(getattr(equipment, field) for field in KEY_FIELDS), equipment.price, sign)
+
+    def add_group(self, key, count, cost, weighted, sign=1):
+        current = self._deltas.get(key, (0, 0.0, 0.0))
+        self._deltas[key] = (current[0] + sign * count, current[1] + sign * cost, current[2] + sign * weighted)
+
+    def items(self):
+        return [(key, delta) for key, delta in self._deltas.items() if any(delta)]
+
+
+def _month_expressions(dialect):
+    # Первое число месяца и номер дня от его начала: в каждой СУБД свои функции дат
+    from sqlalchemy import Integer, cast, func
+    from app.model.equipment import Equipment
+
+    if dialect == 'mysql':
+        return (func.date_format(Equipment.purchase_date, '%Y-%m-01'),
+                func.dayofmonth(Equipment.purchase_date) - 1)
+    return (func.strftime('%Y-%m-01', Equipment.purchase_date),
+            cast(func.strftime('%d', Equipment.purchase_date), Integer) - 1)
+
+
+class ValuationRepo:
+    """Поддерживает сводку EquipmentValuation; коммит делает EquipmentRepo."""
+
+    def _group_filter(self, key):
+        location_id, type_id, user_id, month = key
+        # == None SQLAlchemy превращает в IS NULL
+        return (EquipmentValuation.location_id == location_id, EquipmentValuation.type_id == type_id,
+                EquipmentValuation.user_id == user_id, EquipmentValuation.purchase_month == month)
+
+    def apply(self, deltas):
+        """Применяет накопленные изменения в текущей транзакции."""
+        from sqlalchemy import delete, insert, update
+
+        shrunk = False
+        for key, (count, cost, weighted) in deltas.items():
+            result = db.session.execute(
+                update(EquipmentValuation)
+                .where(*self._group_filter(key))
+                .values(item_count=EquipmentValuation.item_count + count,
+                        cost_total=EquipmentValuation.cost_total + cost,
+                        cost_day_weighted=EquipmentValuation.cost_day_weighted + weighted)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                location_id, type_id, user_id, month = key
+                db.session.execute(insert(EquipmentValuation).values(
+                    location_id=location_id, type_id=type_id, user_id=user_id, purchase_month=month,
+                    item_count=count, cost_total=cost, cost_day_weighted=weighted))
+            shrunk = shrunk or count < 0
+        if shrunk:
+            db.session.execute(
+                delete(EquipmentValuation)
+                .where(EquipmentValuation.item_count <= 0)
+                .execution_options(synchronize_session=False)
+            )
+
+    def groups_for(self, where):
+        """Агрегаты сводки по строкам оборудования, подходящим под условия, — для массовых UPDATE."""
+        from sqlalchemy import func
+        from app.model.equipment import Equipment
+
+        month, offset = _month_expressions(db.session.get_bind().dialect.name)
+        query = db.session.query(
+            Equipment.location_id, Equipment.type_id, Equipment.user_id, func.min(Equipment.purchase_date),
+            func.count(), func.coalesce(func.sum(Equipment.price), 0),
+            func.coalesce(func.sum(Equipment.price * offset), 0),
+        ).filter(*where).group_by(Equipment.location_id, Equipment.type_id, Equipment.user_id, month)
+        # Любая дата группы годится: ключ всё равно берётся по первому числу месяца
+        return [(valuation_key(*row[:4]), row[4], float(row[5]), float(row[6])) for row in query]
+
+    def rebuild(self, on_progress=None):
+        """Полностью пересчитывает сводку одним INSERT ... SELECT с GROUP BY.
+
+        С on_progress(done, total) сводка пересчитывается по одному типу оборудования:
+        DELETE и INSERT ... SELECT типа — одна короткая транзакция, после неё отчёт.
+        Изменения оборудования между транзакциями попадают в уже пересчитанный тип
+        дельтой или будут прочитаны вместе с ещё не пересчитанным, так что не теряются,
+        а блокировка записи не держится на всё время пересчёта.
+        """
+        from sqlalchemy import delete, func, insert, select, union
+        from app.model.equipment import Equipment
+
+        month, offset = _month_expressions(db.session.get_bind().dialect.name)
+        grouped = select(
+            Equipment.location_id, Equipment.type_id, Equipment.user_id, month,
+            func.count(), func.coalesce(func.sum(Equipment.price), 0),
+            func.coalesce(func.sum(Equipment.price * offset), 0),
+        ).group_by(Equipment.location_id, Equipment.type_id, Equipment.user_id, month)
+        columns = ['location_id', 'type_id', 'user_id', 'purchase_month',
+                   'item_count', 'cost_total', 'cost_day_weighted']
+
+        if on_progress is None:
+            db.session.execute(delete(EquipmentValuation))
+            db.session.execute(insert(EquipmentValuation).from_select(columns, grouped))
+            db.session.commit()
+            return db.session.query(EquipmentValuation).count()
+
+        # Типы и из оборудования, и из сводки: строки исчезнувших типов тоже удаляются
+        type_ids = sorted(db.session.scalars(union(
+            select(Equipment.type_id).distinct(), select(EquipmentValuation.type_id).distinct())).all())
+        db.session.rollback()
+        for done, type_id in enumerate(type_ids, 1):
+            db.session.execute(delete(EquipmentValuation).where(EquipmentValuation.type_id == type_id))
+            db.session.execute(insert(EquipmentValuation).from_select(
+                columns, grouped.where(Equipment.type_id == type_id)))
+            db.session.commit()
+            on_progress(done, len(type_ids))
+        return db.session.query(EquipmentValuation).count()
+
+    def is_empty(self):
+        return db.session.query(EquipmentValuation.id).first() is None
+
+    def summary(self, group_by):
+        """Строки сводки, свёрнутые до (группа, тип, месяц): тип нужен для срока службы.
+
+        group_by — колонка сводки: location_id, type_id или user_id.
+        """
+        from sqlalchemy import func
+
+        column = getattr(EquipmentValuation, group_by)
+        columns = [column] if column is EquipmentValuation.type_id else [column, EquipmentValuation.type_id]
+        query = db.session.query(
+            *columns, EquipmentValuation.purchase_month,
+            func.sum(EquipmentValuation.item_count),
+            func.sum(EquipmentValuation.cost_total),
+            func.sum(EquipmentValuation.cost_day_weighted),
+        ).group_by(*columns, EquipmentValuation.purchase_month)
+        for row in query:
+            if column is EquipmentValuation.type_id:
+                yield (row[0],) + tuple(row)
+            else:
+                yield tuple(row)
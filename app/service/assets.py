@@ -0,0 +1,287 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него собираются только .gz
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+# Собранные файлы отдаются по /static/<ASSETS_URL_PREFIX>/...
+ASSETS_URL_PREFIX = 'dist'
+# Что имеет смысл сжимать заранее; woff2 и картинки уже сжаты
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ttf', '.txt', '.json', '.map')
+# Сжатая копия хранится, только если она меньше оригинала хотя бы на 10%
+MIN_COMPRESSION_GAIN = 0.9
+
+_CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+# Пробел перед ':' не трогаем: 'div :hover' и 'div:hover' — разные селекторы
+_CSS_COLON = re.compile(r':\s+')
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(text):
+    """Убирает комментарии (кроме лицензионных /*! */), лишние пробелы и последнюю ';' в блоке."""
+    text = _CSS_COMMENT.sub('', text)
+    text = _CSS_SPACE.sub(' ', text)
+    text = _CSS_PUNCTUATION.sub(r'\1', text)
+    text = _CSS_COLON.sub(':', text)
+    return text.replace(';}', '}').strip()
+
+
+# После этих символов и слов '/' начинает регулярное выражение, а не деление
+_JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw')
+# Пробел рядом с этими символами не нужен; '+', '-' и '/' не входят: 'a - -b', 'a + +b'
+_JS_TIGHT = set('{}()[];,:=<>?!&|')
+# Перевод строки после этих символов (и перед закрывающими скобками) не влияет на вставку ';'
+_JS_LINE_OPEN = set('{;,([')
+_JS_LINE_CLOSE = set('})]')
+
+
+def _js_regex_allowed(out):
+    previous = ''.join(out[-12:]).rstrip()
+    if not previous:
+        return True
+    if previous[-1] in _JS_REGEX_AFTER:
+        return True
+    word = re.search(r'[A-Za-z_$][\w$]*$', previous)
+    return bool(word) and word.group(0) in _JS_REGEX_KEYWORDS
+
+
+def _js_skip_literal(text, index, quote):
+    # Индекс за закрывающей кавычкой; экранированные символы пропускаются
+    index += 1
+    while index < len(text) and text[index] != quote:
+        index += 2 if text[index] == '\\' else 1
+    return index + 1
+
+
+def _js_skip_regex(text, index):
+    index += 1
+    in_class = False
+    while index < len(text) and (in_class or text[index] != '/'):
+        if text[index] == '\\':
+            index += 1
+        elif text[index] == '[':
+            in_class = True
+        elif text[index] == ']':
+            in_class = False
+        index += 1
+    index += 1
+    while index < len(text) and (text[index].isalnum() or text[index] == '_'):
+        index += 1
+    return index
+
+
+def _js_skip_gap(text, index):
+    """Пропускает пробелы и комментарии (кроме /*! */); возвращает (индекс, был ли перевод строки)."""
+    newline = False
+    while index < len(text):
+        if text[index].isspace():
+            newline = newline or text[index] == '\n'
+            index += 1
+        elif text.startswith('//', index):
+            end = text.find('\n', index)
+            index = len(text) if end < 0 else end
+        elif text.startswith('/*', index) and not text.startswith('/*!', index):
+            end = text.find('*/', index + 2)
+            end = len(text) if end < 0 else end + 2
+            newline = newline or '\n' in text[index:end]
+            index = end
+        else:
+            break
+    return index, newline
+
+
+def minify_js(text):
+    """Убирает комментарии (кроме /*! */), отступы, лишние пробелы и переводы строк.
+
+    Строки, шаблоны и регулярные выражения копируются как есть. Имена не сокращаются, а перевод
+    строки остаётся везде, где от него может зависеть автоматическая вставка ';'.
+    """
+    out = []
+    index, length = 0, len(text)
+    while index < length:
+        char = text[index]
+        if char in '\'"`':
+            end = _js_skip_literal(text, index, char)
+            out.append(text[index:end])
+            index = end
+        elif char.isspace() or text.startswith('//', index) or (
+                text.startswith('/*', index) and not text.startswith('/*!', index)):
+            index, newline = _js_skip_gap(text, index)
+            previous = out[-1][-1] if out else ''
+            following = text[index] if index < length else ''
+            if not previous or not following:
+                continue
+            if newline and previous not in _JS_LINE_OPEN and following not in _JS_LINE_CLOSE:
+                out.append('\n')
+            elif not newline and previous not in _JS_TIGHT and following not in _JS_TIGHT:
+                out.append(' ')
+        elif text.startswith('/*!', index):
+            end = text.find('*/', index + 3)
+            end = length if end < 0 else end + 2
+            out.append(text[index:end])
+            index = end
+        elif char == '/' and _js_regex_allowed(out):
+            end = _js_skip_regex(text, index)
+            out.append(text[index:end])
+            index = end
+        else:
+            out.append(char)
+            index += 1
+    return ''.join(out)
+
+
+def hashed_name(path, content):
+    root, extension = posixpath.splitext(path)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+
+
+def rewrite_css_urls(text, path, manifest):
+    """Подменяет относительные url(...) в CSS на имена с хэшем из manifest."""
+    directory = posixpath.dirname(path)
+
+    def replace(match):
+        url = match.group(2)
+        if url.startswith(('data:', 'http:', 'https:', '/', '#')):
+            return match.group(0)
+        source = posixpath.normpath(posixpath.join(directory, url.partition('?')[0]))
+        if source not in manifest:
+            return match.group(0)
+        return f'url({posixpath.relpath(manifest[source], directory)})'
+
+    return _CSS_URL.sub(replace, text)
+
+
+def compress(path, content):
+    written = []
+    if not path.endswith(COMPRESSIBLE):
+        return written
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) <= len(content) * MIN_COMPRESSION_GAIN:
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(suffix)
+    return written
+
+
+def build(static_folder, output_dir=None):
+    """Собирает static_folder в output_dir: CSS и JS минифицируются, к именам добавляется хэш
+    содержимого, рядом кладутся .gz и .br. Возвращает manifest {исходное имя: имя с хэшем}.
+
+    Сначала обрабатываются не-CSS файлы, чтобы url(...) в CSS указывали на уже хэшированные шрифты.
+    """
+    output_dir = os.path.abspath(output_dir or os.path.join(static_folder, ASSETS_URL_PREFIX))
+    sources = []
+    for directory, subdirectories, files in os.walk(static_folder):
+        # Прошлую сборку, если она внутри static_folder, не собираем повторно
+        subdirectories[:] = [name for name in subdirectories
+                             if os.path.abspath(os.path.join(directory, name)) != output_dir]
+        for name in files:
+            sources.append(os.path.relpath(os.path.join(directory, name), static_folder).replace(os.sep, '/'))
+    sources.sort(key=lambda path: (path.endswith('.css'), path))
+
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    manifest = {}
+    for path in sources:
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            content = f.read()
+        if path.endswith('.css'):
+            text = rewrite_css_urls(content.decode('utf-8'), path, manifest)
+            content = (text if path.endswith('.min.css') else minify_css(text)).encode('utf-8')
+        elif path.endswith('.js') and not path.endswith('.min.js'):
+            content = minify_js(content.decode('utf-8')).encode('utf-8')
+        target = hashed_name(path, content)
+        full_target = os.path.join(output_dir, target)
+        os.makedirs(os.path.dirname(full_target), exist_ok=True)
+        with open(full_target, 'wb') as f:
+            f.write(content)
+        compress(full_target, content)
+        manifest[path] = target
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class Assets:
+    """Отдаёт собранную статику (`flask build-assets`) с хэшем в имени и вечным кэшем.
+
+    url_for('static', filename='style.css') превращается в /static/dist/style.<хэш>.css,
+    если файл есть в manifest; такие ответы кэшируются браузером на год (immutable), и при
+    повторных заходах запросов к статике нет вовсе. Изменение файла меняет хэш, а значит, и URL.
+    Сжатые копии выбираются по Accept-Encoding (br, затем gzip). Без сборки всё отдаётся как раньше.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_DIR', None)
+        app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        directory = app.config['ASSETS_DIR'] or os.path.join(app.static_folder, ASSETS_URL_PREFIX)
+        manifest = load_manifest(directory)
+        app.extensions['assets'] = {'dir': directory, 'manifest': manifest}
+        if not manifest:
+            return
+        app.url_defaults(self._hashed_url)
+        app.view_functions['static'] = self.static_view
+
+    @staticmethod
+    def _hashed_url(endpoint, values):
+        if endpoint != 'static':
+            return
+        target = current_app.extensions['assets']['manifest'].get(values.get('filename'))
+        if target:
+            values['filename'] = f'{ASSETS_URL_PREFIX}/{target}'
+
+    def static_view(self, filename):
+        state = current_app.extensions['assets']
+        prefix = ASSETS_URL_PREFIX + '/'
+        if not filename.startswith(prefix):
+            return current_app.send_static_file(filename)
+
+        filename = filename[len(prefix):]
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        compressible = filename.endswith(COMPRESSIBLE)
+        encoding = None
+        accepted = request.accept_encodings
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[candidate] and os.path.isfile(os.path.join(state['dir'], filename + suffix)):
+                encoding = candidate
+                filename += suffix
+                break
+
+        max_age = current_app.config['ASSETS_MAX_AGE']
+        response = send_from_directory(state['dir'], filename, mimetype=mimetype, max_age=max_age)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if compressible:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        response.cache_control.public = True
+        return response
+
+
+assets = Assets()
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+from app.model.equipment import EquipmentRepo
+
+# Порядок колонок совпадает с тем, что принимает импорт, чтобы выгрузку можно было загрузить обратно
+EXPORT_FIELDS = ('id', 'inventory_number', 'name', 'type', 'model', 'status', 'location',
+                 'purchase_date', 'price', 'specification', 'user_id')
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+# Строки склеиваются в куски примерно такого размера, чтобы не отдавать по одной строке на write()
+CHUNK_SIZE = 64 * 1024
+
+
+def _plain(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    # Заголовок уходит сразу, до первого обращения к БД
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow(['' if value is None else _plain(value) for value in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_lines(rows):
+    chunk = []
+    size = 0
+    first = True
+    for row in rows:
+        line = json.dumps(dict(zip(EXPORT_FIELDS, map(_plain, row))), ensure_ascii=False) + '\n'
+        chunk.append(line)
+        size += len(line)
+        # Первую строку отдаём сразу, дальше — кусками
+        if first or size >= CHUNK_SIZE:
+            first = False
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    yield ''.join(chunk)
+
+
+def _counted(rows, on_progress, every):
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % every == 0:
+            on_progress(count)
+    on_progress(count)
+
+
+def export_equipment(format='csv', type=None, status=None, location=None, batch_size=1000, on_progress=None):
+    """Генератор текстовых кусков выгрузки реестра оборудования.
+
+    on_progress(число строк) вызывается после каждых batch_size строк и в конце.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат выгрузки '{format}'")
+    rows = EquipmentRepo().iter_columns(EXPORT_FIELDS, type=type, status=status, location=location,
+                                        batch_size=batch_size)
+    if on_progress:
+        rows = _counted(rows, on_progress, batch_size)
+    if format == 'jsonl':
+        return _jsonl_lines(rows)
+    return _csv_lines(rows)
@@ -0,0 +1,55 @@
+from flask import current_app
+from flask_login import UserMixin
+
+from app import db
+from app.service.cache import TTLCache
+
+
+class UserPrincipal(UserMixin):
+    """Лёгкий снимок вошедшего пользователя: только то, что нужно шаблонам и проверкам ролей."""
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def __repr__(self):
+        return f'<UserPrincipal {self.username}, role: {self.role}>'
+
+
+class IdentityCache:
+    """Кэширует UserPrincipal для user_loader, чтобы не ходить в БД на каждый запрос.
+
+    UserRepo.update/delete сбрасывают запись в этом процессе; в остальных воркерах
+    смена роли или удаление вступают в силу не позже чем через USER_CACHE_TTL секунд.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_TTL', 60)
+        app.config.setdefault('USER_CACHE_SIZE', 1024)
+        app.extensions['identity_cache'] = TTLCache(
+            maxsize=app.config['USER_CACHE_SIZE'],
+            ttl=app.config['USER_CACHE_TTL']
+        )
+
+    def _cache(self):
+        return current_app.extensions['identity_cache']
+
+    def load(self, user_id):
+        from app.model.user import User
+
+        cache = self._cache()
+        principal = cache.get(user_id)
+        if principal is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            principal = UserPrincipal(user.id, user.username, user.role)
+            cache.set(user_id, principal)
+        return principal
+
+    def invalidate(self, user_id):
+        self._cache().pop(int(user_id))
+
+
+identity_cache = IdentityCache()
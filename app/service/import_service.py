@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.model.equipment import EquipmentRepo, check_lookups, clean_equipment_fields
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+class RowError:
+    def __init__(self, line, inventory_number, message):
+        self.line = line
+        self.inventory_number = inventory_number
+        self.message = message
+
+    def __str__(self):
+        if self.inventory_number:
+            return f"строка {self.line} ({self.inventory_number}): {self.message}"
+        return f"строка {self.line}: {self.message}"
+
+
+class ImportResult:
+    def __init__(self, max_reported_errors):
+        self.imported = 0
+        self.error_count = 0
+        # Храним только первые ошибки, полный отчёт получает on_error
+        self.errors = []
+        self._max_reported_errors = max_reported_errors
+
+    def add_error(self, error):
+        self.error_count += 1
+        if len(self.errors) < self._max_reported_errors:
+            self.errors.append(error)
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_csv_rows(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl_rows(stream):
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, ValueError("Некорректный JSON")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ValueError("Ожидается JSON-объект")
+            continue
+        # Значения JSON приводим к строкам, как в CSV и HTML-форме
+        yield line_number, {key: value if value is None else str(value) for key, value in row.items()}
+
+
+def read_rows(stream, format):
+    """Построчно читает байтовый поток загрузки, не загружая файл в память целиком."""
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат импорта '{format}'")
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if format == 'jsonl':
+        return read_jsonl_rows(text)
+    return read_csv_rows(text)
+
+
+class EquipmentImporter:
+    """Импортирует оборудование пачками: один INSERT и одна транзакция на пачку."""
+
+    def __init__(self, batch_size=1000, max_reported_errors=100, on_error=None, on_batch=None,
+                 create_lookups=False):
+        self.batch_size = batch_size
+        # Без флага строка с неизвестным типом, статусом или местом — ошибка строки, а не новое значение справочника
+        self.create_lookups = create_lookups
+        self.max_reported_errors = max_reported_errors
+        self.on_error = on_error
+        # Вызывается с промежуточным ImportResult после каждой пачки (прогресс фоновой задачи)
+        self.on_batch = on_batch
+        self.repo = EquipmentRepo()
+
+    def _error(self, result, line, inventory_number, message):
+        error = RowError(line, inventory_number, message)
+        result.add_error(error)
+        if self.on_error:
+            self.on_error(error)
+
+    def run(self, rows):
+        result = ImportResult(self.max_reported_errors)
+        batch = []
+        for line, row in rows:
+            if isinstance(row, Exception):
+                self._error(result, line, None, str(row))
+                continue
+            try:
+                fields = clean_equipment_fields(row)
+                if not self.create_lookups:
+                    check_lookups(fields)
+            except ValueError as e:
+                self._error(result, line, (row.get('inventory_number') or '').strip(), str(e))
+                continue
+            batch.append((line, fields))
+            if len(batch) >= self.batch_size:
+                self._flush(batch, result)
+                batch = []
+                if self.on_batch:
+                    self.on_batch(result)
+        self._flush(batch, result)
+        return result
+
+    def _flush(self, batch, result):
+        if not batch:
+            return
+
+        # Дубликаты внутри пачки и уже существующие в БД инвентарные номера отсекаем заранее
+        existing = self.repo.existing_inventory_numbers([fields['inventory_number'] for _, fields in batch])
+        seen = set()
+        rows = []
+        for line, fields in batch:
+            number = fields['inventory_number']
+            if number in existing or number in seen:
+                self._error(result, line, number, "Инвентарный номер уже существует")
+                continue
+            seen.add(number)
+            rows.append((line, fields))
+
+        try:
+            result.imported += self.repo.bulk_add([fields for _, fields in rows], self.create_lookups)
+        except IntegrityError:
+            # Пачку отклонила БД (например, параллельная вставка) — повторяем построчно,
+            # чтобы сохранить корректные строки и указать виновные
+            db.session.rollback()
+            for line, fields in rows:
+                try:
+                    result.imported += self.repo.bulk_add([fields], self.create_lookups)
+                except IntegrityError as e:
+                    db.session.rollback()
+                    self._error(result, line, fields['inventory_number'], str(e.orig))
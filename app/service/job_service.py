@@ -0,0 +1,262 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from flask import current_app
+
+from app import db
+from app.model.job import JobRepo
+from app.model.table_version import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+class JobHandler:
+    def __init__(self, kind, title, func, roles=None):
+        self.kind = kind
+        self.title = title
+        self.func = func
+        # None — задачу может поставить любой вошедший пользователь
+        self.roles = roles
+
+    def allowed(self, user):
+        return self.roles is None or user.role in self.roles
+
+
+class JobContext:
+    """То, что получает обработчик задачи: параметры, прогресс и каталог для файлов."""
+
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.job_id = job.id
+        self.params = job.params
+        self._reported = 0.0
+
+    def progress(self, done, total=None, message=None, force=False):
+        # Прогресс пишется не чаще раза в JOB_PROGRESS_INTERVAL секунд: иначе мелкие пачки
+        # превращают задачу в поток UPDATE по таблице jobs
+        now = time.monotonic()
+        if not force and now - self._reported < current_app.config['JOB_PROGRESS_INTERVAL']:
+            return
+        self._reported = now
+        JobRepo().set_progress(self.job_id, done, total, message)
+
+    def path(self, *parts):
+        return self.queue.path(*parts)
+
+
+class JobQueue:
+    """Очередь фоновых задач в таблице jobs.
+
+    Веб-запрос только ставит задачу (enqueue) и отвечает 202, а выполняют её воркеры
+    `flask jobs worker` — отдельный процесс с пулом потоков. Воркеров можно запустить
+    несколько: задача забирается атомарным UPDATE, поэтому двум воркерам она не достанется.
+    Задачи, воркер которых пропал (нет отчётов о прогрессе дольше JOB_STALE_AFTER секунд),
+    возвращаются в очередь: каждый воркер проверяет это при старте и затем каждые
+    JOB_STALE_SWEEP_INTERVAL секунд. Файлы задач (загрузки и результаты) лежат в JOB_STORAGE_DIR.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+
+    def init_app(self, app):
+        app.config.setdefault('JOB_WORKERS', 2)
+        app.config.setdefault('JOB_POLL_INTERVAL', 1.0)
+        app.config.setdefault('JOB_PROGRESS_INTERVAL', 1.0)
+        app.config.setdefault('JOB_STALE_AFTER', 900)
+        app.config.setdefault('JOB_STALE_SWEEP_INTERVAL', 60)
+        app.config.setdefault('JOB_RETENTION_DAYS', 7)
+        app.config.setdefault('JOB_STORAGE_DIR', None)
+        app.extensions['job_queue'] = {
+            'storage_dir': app.config['JOB_STORAGE_DIR'] or os.path.join(app.instance_path, 'jobs'),
+        }
+
+    def handler(self, kind, title, roles=None):
+        def decorator(func):
+            self._handlers[kind] = JobHandler(kind, title, func, roles)
+            return func
+        return decorator
+
+    def get_handler(self, kind):
+        return self._handlers.get(kind)
+
+    def title(self, kind):
+        handler = self._handlers.get(kind)
+        return handler.title if handler else kind
+
+    def path(self, *parts):
+        directory = current_app.extensions['job_queue']['storage_dir']
+        path = os.path.join(directory, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def save_upload(self, upload):
+        """Сохраняет загруженный файл для задачи и возвращает путь (имя — случайное)."""
+        extension = upload.filename.rsplit('.', 1)[-1].lower() if '.' in upload.filename else 'dat'
+        path = self.path('uploads', f'{uuid.uuid4().hex}.{extension}')
+        upload.save(path)
+        return path
+
+    def enqueue(self, kind, payload=None, created_by=None):
+        if kind not in self._handlers:
+            raise ValueError(f"Неизвестный тип задачи '{kind}'")
+        return JobRepo().enqueue(kind, payload, created_by)
+
+    def run_next(self, worker=None):
+        """Забирает и выполняет одну задачу в текущем контексте приложения; None — очередь пуста.
+
+        История изменений оборудования, которую пишет задача, записывается от имени её автора.
+        """
+        from app.model.equipment_history import acting_as
+
+        repo = JobRepo()
+        job = repo.claim(worker or f'{socket.gethostname()}:{os.getpid()}')
+        if job is None:
+            return None
+        handler = self._handlers.get(job.kind)
+        context = JobContext(self, job)
+        try:
+            if handler is None:
+                raise ValueError(f"Неизвестный тип задачи '{job.kind}'")
+            with acting_as(job.created_by):
+                result = handler.func(context)
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Задача %s (%s) завершилась ошибкой\n%s", job.id, job.kind, traceback.format_exc())
+            return repo.fail(job.id, str(e) or e.__class__.__name__)
+        return repo.finish(job.id, result)
+
+    def requeue_stale(self):
+        older_than = utcnow() - timedelta(seconds=current_app.config['JOB_STALE_AFTER'])
+        return JobRepo().requeue_stale(older_than)
+
+    def prune(self, older_than):
+        """Удаляет завершённые задачи вместе с их файлами; возвращает число задач."""
+        jobs = JobRepo().prune(older_than)
+        for job in jobs:
+            for path in (job.params.get('path'), (job.result_data or {}).get('path')):
+                if path and os.path.exists(path):
+                    os.remove(path)
+        return len(jobs)
+
+    def run_worker(self, app, workers=1, burst=False, log=print):
+        """Запускает workers потоков, которые разбирают очередь.
+
+        burst=True — выйти, когда очередь опустеет (удобно для cron и тестов),
+        иначе потоки опрашивают таблицу каждые JOB_POLL_INTERVAL секунд до Ctrl+C.
+        """
+        stop = threading.Event()
+        name = f'{socket.gethostname()}:{os.getpid()}'
+
+        def loop(number):
+            with app.app_context():
+                while not stop.is_set():
+                    try:
+                        job = self.run_next(f'{name}/{number}')
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception("Ошибка воркера очереди задач")
+                        job = None
+                    if job is not None:
+                        log(f"[{number}] задача {job.id} ({job.kind}): {job.status}")
+                        continue
+                    if burst:
+                        return
+                    stop.wait(app.config['JOB_POLL_INTERVAL'])
+                db.session.remove()
+
+        def sweep():
+            with app.app_context():
+                try:
+                    requeued = self.requeue_stale()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Ошибка при возврате зависших задач в очередь")
+                    return
+            if requeued:
+                log(f"Возвращено в очередь зависших задач: {requeued}")
+
+        sweep()
+        next_sweep = time.monotonic() + app.config['JOB_STALE_SWEEP_INTERVAL']
+        threads = [threading.Thread(target=loop, args=(number,), name=f'job-worker-{number}', daemon=True)
+                   for number in range(1, workers + 1)]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                # Задачи упавшего соседнего воркера возвращаются, пока этот работает
+                if time.monotonic() >= next_sweep:
+                    sweep()
+                    next_sweep = time.monotonic() + app.config['JOB_STALE_SWEEP_INTERVAL']
+                for thread in threads:
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            # Текущие задачи дорабатывают, новые не берутся
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+
+job_queue = JobQueue()
+
+
+@job_queue.handler('import_equipment', "Импорт оборудования", roles=('admin', 'manager'))
+def import_equipment_job(context):
+    from app.service.import_service import EquipmentImporter, read_rows
+
+    path = context.params['path']
+    total = os.path.getsize(path)
+    with open(path, 'rb') as stream:
+        importer = EquipmentImporter(
+            batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+            max_reported_errors=current_app.config['IMPORT_MAX_REPORTED_ERRORS'],
+            # Прогресс — по позиции в файле: число строк заранее неизвестно
+            on_batch=lambda result: context.progress(
+                stream.tell(), total, f"Импортировано записей: {result.imported}, ошибок: {result.error_count}"),
+        )
+        result = importer.run(read_rows(stream, context.params['format']))
+    context.progress(total, total, force=True)
+    os.remove(path)
+    return {
+        'imported': result.imported,
+        'error_count': result.error_count,
+        'errors': [str(error) for error in result.errors],
+    }
+
+
+@job_queue.handler('export_equipment', "Выгрузка оборудования")
+def export_equipment_job(context):
+    from app.model.equipment import EquipmentRepo
+    from app.service.export_service import export_equipment
+
+    params = context.params
+    filters = {key: params.get(key) for key in ('type', 'status', 'location')}
+    total = EquipmentRepo().count(**filters)
+    exported = [0]
+
+    def on_progress(done):
+        exported[0] = done
+        context.progress(done, total, f"Выгружено записей: {done}")
+
+    chunks = export_equipment(format=params['format'], batch_size=current_app.config['EXPORT_BATCH_SIZE'],
+                              on_progress=on_progress, **filters)
+    path = context.path('exports', f'equipment-{context.job_id}.{params["format"]}')
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        for chunk in chunks:
+            output.write(chunk)
+    return {'path': path, 'filename': f'equipment.{params["format"]}', 'rows': exported[0]}
+
+
+@job_queue.handler('rebuild_valuation', "Пересчёт сводки стоимости", roles=('admin', 'manager'))
+def rebuild_valuation_job(context):
+    from app.model.valuation import ValuationRepo
+
+    rows = ValuationRepo().rebuild(on_progress=lambda done, total: context.progress(
+        done, total, f"Обработано типов оборудования: {done} из {total}"))
+    context.progress(1, 1, f"Строк сводки: {rows}", force=True)
+    return {'rows': rows}
@@ -0,0 +1,121 @@
+import bisect
+import threading
+import time
+
+from flask import current_app
+
+from app import db
+
+
+class LookupTable:
+    def __init__(self, rows):
+        self.by_id = dict(rows)
+        self.by_name = {name: lookup_id for lookup_id, name in self.by_id.items()}
+        self.names = sorted(self.by_name)
+
+    def add(self, lookup_id, name):
+        self.by_id[lookup_id] = name
+        self.by_name[name] = lookup_id
+        bisect.insort(self.names, name)
+
+
+class LookupCache:
+    """Справочники типов, статусов и мест целиком в памяти процесса.
+
+    Загружаются одним запросом при первом обращении. LookupRepo сбрасывает кэш при
+    изменениях в этом процессе. Промах по id или названию проверяется одним запросом
+    по уникальному индексу, а не перезагрузкой всех справочников: так мусорные значения
+    фильтров в адресе стоят один поиск, а новые значения из других воркеров дописываются
+    в кэш. Переименования подхватываются не позже LOOKUP_CACHE_TTL или раньше, если кэш
+    рендеринга увидит более новую версию 'lookups' (sync()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('LOOKUP_CACHE_TTL', 300)
+        app.extensions['lookup_cache'] = {'tables': None, 'expires_at': 0.0, 'version': 0}
+
+    def _state(self):
+        return current_app.extensions['lookup_cache']
+
+    def _load(self):
+        from sqlalchemy import literal, select, union_all
+        from app.model.lookup import LOOKUPS
+        from app.model.table_version import TableVersionRepo
+
+        # Версия читается до справочников: загруженные значения не старше неё
+        version = TableVersionRepo().get('lookups')['lookups'][0]
+        query = union_all(*[
+            select(literal(kind), model.id, model.name) for kind, (model, _) in LOOKUPS.items()
+        ])
+        rows = {kind: [] for kind in LOOKUPS}
+        for kind, lookup_id, name in db.session.execute(query):
+            rows[kind].append((lookup_id, name))
+        return {kind: LookupTable(kind_rows) for kind, kind_rows in rows.items()}, version
+
+    def _tables(self):
+        state = self._state()
+        now = time.monotonic()
+        with self._lock:
+            tables = state['tables']
+            if tables is not None and now < state['expires_at']:
+                return tables
+        tables, version = self._load()
+        ttl = current_app.config['LOOKUP_CACHE_TTL']
+        with self._lock:
+            state['tables'] = tables
+            state['version'] = version
+            state['expires_at'] = now + ttl if ttl is not None else float('inf')
+        return tables
+
+    def names(self, kind):
+        return self._tables()[kind].names
+
+    def _fetch(self, kind, tables, condition):
+        # Значение могли добавить в другом воркере: ищем одну строку и дописываем её в кэш
+        from app.model.lookup import lookup_model
+
+        model = lookup_model(kind)
+        row = db.session.query(model.id, model.name).filter(condition(model)).first()
+        if row is None:
+            return None
+        with self._lock:
+            if row.id not in tables[kind].by_id and row.name not in tables[kind].by_name:
+                tables[kind].add(row.id, row.name)
+        return row
+
+    def name(self, kind, lookup_id):
+        if lookup_id is None:
+            return None
+        tables = self._tables()
+        name = tables[kind].by_id.get(lookup_id)
+        if name is None:
+            row = self._fetch(kind, tables, lambda model: model.id == lookup_id)
+            name = row.name if row else None
+        return name
+
+    def id(self, kind, name):
+        if not name:
+            return None
+        tables = self._tables()
+        lookup_id = tables[kind].by_name.get(name)
+        if lookup_id is None:
+            row = self._fetch(kind, tables, lambda model: model.name == name)
+            lookup_id = row.id if row else None
+        return lookup_id
+
+    def sync(self, versions):
+        """Сбрасывает кэш, если версия 'lookups' в versions новее загруженной."""
+        state = self._state()
+        with self._lock:
+            if state['tables'] is not None and versions.get('lookups', 0) > state['version']:
+                state['tables'] = None
+
+    def invalidate(self):
+        with self._lock:
+            self._state()['tables'] = None
+
+
+lookup_cache = LookupCache()
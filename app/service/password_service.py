@@ -0,0 +1,75 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Все слоты пула хэширования заняты дольше PASSWORD_HASH_TIMEOUT."""
+
+
+@lru_cache(maxsize=8)
+def canonical_method(method):
+    # Werkzeug дописывает параметры по умолчанию ('scrypt' -> 'scrypt:32768:8:1'),
+    # поэтому сравниваем с префиксом реального хэша, посчитанного один раз на процесс
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != canonical_method(hash_method())
+
+
+def web_processes():
+    # Столько процессов запускает gunicorn.conf.py
+    return int(os.environ.get('WEB_CONCURRENCY') or (os.cpu_count() or 1) * 2 + 1)
+
+
+class PasswordHasher:
+    """Выполняет проверку и генерацию хэшей паролей в ограниченном пуле потоков.
+
+    hashlib отпускает GIL на время scrypt/pbkdf2, так что пул действительно
+    ограничивает число ядер, занятых логинами, а запросы сверх очереди
+    получают HasherBusy вместо того, чтобы занимать воркер.
+
+    Пул свой у каждого процесса, поэтому по умолчанию PASSWORD_HASH_HOST_WORKERS делится
+    между процессами gunicorn: на машине всего около PASSWORD_HASH_HOST_WORKERS потоков
+    хэширования, но не меньше одного на процесс.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_HOST_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+        if not app.config.get('PASSWORD_HASH_WORKERS'):
+            app.config['PASSWORD_HASH_WORKERS'] = max(1, app.config['PASSWORD_HASH_HOST_WORKERS'] // web_processes())
+        app.config.setdefault('PASSWORD_HASH_QUEUE', 32)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+        workers = app.config['PASSWORD_HASH_WORKERS']
+        app.extensions['password_hasher'] = {
+            'executor': ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash'),
+            'slots': threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE']),
+        }
+
+    def _submit(self, fn, *args):
+        state = current_app.extensions['password_hasher']
+        timeout = current_app.config['PASSWORD_HASH_TIMEOUT']
+        if not state['slots'].acquire(timeout=timeout):
+            raise HasherBusy()
+        try:
+            return state['executor'].submit(fn, *args).result()
+        finally:
+            state['slots'].release()
+
+    def verify(self, password_hash, password):
+        return self._submit(check_password_hash, password_hash, password)
+
+    def generate(self, password):
+        return self._submit(generate_password_hash, password, hash_method())
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import current_app
+from markupsafe import Markup
+
+from app.model.table_version import TableVersionRepo
+from app.service.cache import TTLCache
+
+RENDER_CACHE_BACKENDS = ('memory', 'disk', None)
+
+
+class MemoryBackend:
+    """LRU в памяти процесса: самый быстрый вариант, но у каждого воркера своя копия."""
+
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, html):
+        self._cache.set(key, html)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class DiskBackend:
+    """Файлы в локальном каталоге: общий кэш для всех воркеров одного хоста.
+
+    Запись атомарна (временный файл + os.replace), устаревание — по mtime,
+    лишние файлы удаляются от самых старых при каждой prune_every-й записи.
+    """
+
+    def __init__(self, directory, maxsize, ttl, prune_every=64):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.html')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if self.ttl is not None and os.path.getmtime(path) + self.ttl <= time.time():
+                return None
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key, html):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.html')]
+        except OSError:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:max(0, len(entries) - self.maxsize)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory) if os.path.isdir(self.directory) else ():
+            if entry.name.endswith('.html'):
+                os.remove(entry.path)
+
+
+class RenderCache:
+    """Кэш отрендеренных фрагментов страниц.
+
+    Ключ — имя фрагмента, параметры запроса, роль и версии таблиц из table_versions,
+    которые репозитории увеличивают при каждой записи. Поэтому запись в любом воркере
+    сразу делает старые фрагменты недостижимыми, а TTL лишь ограничивает устаревание
+    после правок в обход репозиториев. При попадании не выполняются ни запросы к данным,
+    ни рендеринг: остаётся одно чтение версий по первичному ключу.
+
+    Перед рендерингом при промахе снимки процесса (статистика, справочники) сверяются
+    с теми же версиями: иначе воркер, ещё не видевший запись, положил бы под новый ключ
+    фрагмент со старыми данными, и его получили бы все воркеры.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('RENDER_CACHE_BACKEND', 'memory')
+        app.config.setdefault('RENDER_CACHE_SIZE', 256)
+        app.config.setdefault('RENDER_CACHE_TTL', 300)
+        app.config.setdefault('RENDER_CACHE_DIR', None)
+
+        backend = app.config['RENDER_CACHE_BACKEND']
+        if backend not in RENDER_CACHE_BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд кэша рендеринга '{backend}'")
+        size, ttl = app.config['RENDER_CACHE_SIZE'], app.config['RENDER_CACHE_TTL']
+        if backend == 'memory':
+            backend = MemoryBackend(size, ttl)
+        elif backend == 'disk':
+            directory = app.config['RENDER_CACHE_DIR'] or os.path.join(app.instance_path, 'render-cache')
+            backend = DiskBackend(directory, size, ttl)
+        app.extensions['render_cache'] = {'backend': backend, 'hits': 0, 'misses': 0}
+
+    def _state(self):
+        return current_app.extensions['render_cache']
+
+    def fragment(self, name, tables, params, render):
+        """Возвращает HTML фрагмента из кэша или вызывает render() и сохраняет результат."""
+        state = self._state()
+        backend = state['backend']
+        if backend is None:
+            return Markup(render())
+
+        versions = TableVersionRepo().get(*tables)
+        key = json.dumps([name, sorted(params.items()), [versions[table][0] for table in tables]],
+                         ensure_ascii=False, default=str)
+        html = backend.get(key)
+        if html is None:
+            state['misses'] += 1
+            self._sync_snapshots({table: versions[table][0] for table in tables})
+            html = render()
+            backend.set(key, html)
+        else:
+            state['hits'] += 1
+        return Markup(html)
+
+    @staticmethod
+    def _sync_snapshots(versions):
+        from app.service.lookup_cache import lookup_cache
+        from app.service.stats_service import stats_service
+        lookup_cache.sync(versions)
+        stats_service.sync(versions)
+
+    def clear(self):
+        backend = self._state()['backend']
+        if backend is not None:
+            backend.clear()
+
+
+render_cache = RenderCache()
@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+
+from flask import current_app, request
+
+from app.service.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него клиенты получают gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('text/html', 'text/css', 'text/plain', 'text/csv', 'application/json',
+                          'application/javascript', 'application/x-ndjson', 'image/svg+xml')
+
+
+class ResponseMiddleware:
+    """Слабые ETag для HTML-страниц и сжатие текстовых ответов.
+
+    GET-страница получает ETag W/"<хэш тела>" и Cache-Control: private, no-cache: браузер хранит
+    её и перепроверяет через If-None-Match, а неизменённая страница уходит как 304 без тела.
+    Рендеринг при этом выполняется, экономится передача. ETag слабый, потому что один и тот же
+    для сжатого и несжатого представления.
+
+    Текстовые ответы от COMPRESSION_MIN_SIZE байт сжимаются в br (если установлен brotli
+    и клиент его принимает) или gzip. Сжатые тела страниц хранятся в LRU по хэшу тела, поэтому
+    одинаковая страница (например, из кэша рендеринга) сжимается один раз. Потоковые ответы
+    (выгрузки) и файлы не трогаются: их размер заранее неизвестен, а статика сжата при сборке.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESSION_ENABLED', True)
+        app.config.setdefault('COMPRESSION_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESSION_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESSION_BROTLI_QUALITY', 4)
+        app.config.setdefault('COMPRESSION_CACHE_SIZE', 64)
+        app.config.setdefault('PAGE_ETAGS_ENABLED', True)
+        if not (app.config['COMPRESSION_ENABLED'] or app.config['PAGE_ETAGS_ENABLED']):
+            return
+        app.extensions['response_middleware'] = TTLCache(maxsize=app.config['COMPRESSION_CACHE_SIZE'], ttl=None)
+        app.after_request(self._after_request)
+
+    @staticmethod
+    def _buffered(response):
+        return not response.is_streamed and not response.direct_passthrough
+
+    def _after_request(self, response):
+        config = current_app.config
+        digest = None
+        if (config['PAGE_ETAGS_ENABLED'] and request.method in ('GET', 'HEAD') and response.status_code == 200
+                and response.mimetype == 'text/html' and 'ETag' not in response.headers
+                and self._buffered(response)):
+            digest = hashlib.sha1(response.get_data()).hexdigest()[:20]
+            response.set_etag(digest, weak=True)
+            if 'Cache-Control' not in response.headers:
+                response.headers['Cache-Control'] = 'private, no-cache'
+            response.make_conditional(request)
+
+        if config['COMPRESSION_ENABLED']:
+            self._compress(response, digest)
+        return response
+
+    def _compress(self, response, digest):
+        if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 304)
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers
+                or not self._buffered(response)):
+            return
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESSION_MIN_SIZE']:
+            return
+        response.vary.add('Accept-Encoding')
+
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            encoding = 'br'
+        elif accepted['gzip']:
+            encoding = 'gzip'
+        else:
+            return
+
+        cache = current_app.extensions['response_middleware']
+        compressed = cache.get((digest, encoding)) if digest else None
+        if compressed is None:
+            if encoding == 'br':
+                compressed = brotli.compress(data, quality=current_app.config['COMPRESSION_BROTLI_QUALITY'])
+            else:
+                compressed = gzip.compress(data, compresslevel=current_app.config['COMPRESSION_GZIP_LEVEL'], mtime=0)
+            if digest:
+                cache.set((digest, encoding), compressed)
+        if len(compressed) >= len(data):
+            return
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # Сильный ETag описывает конкретные байты, а они изменились
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+
+response_middleware = ResponseMiddleware()
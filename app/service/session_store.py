@@ -0,0 +1,296 @@
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+from app.service.cache import TTLCache
+
+SESSION_BACKENDS = ('cookie', 'database', 'sqlite')
+# secrets.token_urlsafe(32): 43 символа base64url; всё остальное (в том числе старые
+# подписанные cookie) считается отсутствием сессии
+SID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+
+class ServerSession(SecureCookieSession):
+    """Данные сессии и её id; отслеживание изменений — как у cookie-сессии Flask."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.expires_at = expires_at
+        # Пользователь Flask-Login на момент открытия: вход и выход не оставляют старой записи
+        self.opened_user_id = self.get('_user_id')
+        self.accessed = False
+
+
+class DatabaseStore:
+    """Таблица sessions в основной БД приложения: общая для всех воркеров и хостов.
+
+    Работает через отдельное соединение движка, не затрагивая транзакцию db.session запроса.
+    """
+
+    def __init__(self):
+        from app.model.server_session import SessionRecord
+        self.table = SessionRecord.__table__
+
+    @staticmethod
+    def _engine():
+        from app import db
+        return db.engine
+
+    def load(self, sid):
+        from sqlalchemy import select
+
+        with self._engine().connect() as connection:
+            row = connection.execute(
+                select(self.table.c.data, self.table.c.expires_at).where(self.table.c.id == sid)).first()
+        return tuple(row) if row else None
+
+    def expires_at(self, sid):
+        from sqlalchemy import select
+
+        with self._engine().connect() as connection:
+            return connection.execute(
+                select(self.table.c.expires_at).where(self.table.c.id == sid)).scalar()
+
+    def save(self, sid, data, expires_at, old_sid=None, old_expires_at=None):
+        """Пишет новую запись и в той же транзакции укорачивает (или удаляет при None) старую."""
+        from sqlalchemy import delete, insert, update
+
+        with self._engine().begin() as connection:
+            connection.execute(insert(self.table).values(id=sid, data=data, expires_at=expires_at))
+            if old_sid and old_expires_at is None:
+                connection.execute(delete(self.table).where(self.table.c.id == old_sid))
+            elif old_sid:
+                connection.execute(update(self.table).where(self.table.c.id == old_sid)
+                                   .values(expires_at=old_expires_at))
+
+    def expire(self, sid, expires_at):
+        from sqlalchemy import update
+
+        with self._engine().begin() as connection:
+            connection.execute(update(self.table).where(self.table.c.id == sid)
+                               .values(expires_at=expires_at))
+
+    def delete(self, sid):
+        from sqlalchemy import delete
+
+        with self._engine().begin() as connection:
+            connection.execute(delete(self.table).where(self.table.c.id == sid))
+
+    def sweep(self, now):
+        from sqlalchemy import delete
+
+        with self._engine().begin() as connection:
+            return connection.execute(delete(self.table).where(self.table.c.expires_at <= now)).rowcount
+
+
+class SqliteStore:
+    """Отдельный файл SQLite на хосте: сессии не нагружают основную БД.
+
+    Подходит, когда все воркеры живут на одной машине; соединение — своё у каждого потока.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS sessions '
+                               '(id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def load(self, sid):
+        # fetchall, а не fetchone: недочитанный курсор держит снимок WAL и не видит чужих записей
+        rows = self._connection().execute('SELECT data, expires_at FROM sessions WHERE id = ?', (sid,)).fetchall()
+        return rows[0] if rows else None
+
+    def expires_at(self, sid):
+        rows = self._connection().execute('SELECT expires_at FROM sessions WHERE id = ?', (sid,)).fetchall()
+        return rows[0][0] if rows else None
+
+    def save(self, sid, data, expires_at, old_sid=None, old_expires_at=None):
+        with self._connection() as connection:
+            connection.execute('INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)',
+                               (sid, data, expires_at))
+            if old_sid and old_expires_at is None:
+                connection.execute('DELETE FROM sessions WHERE id = ?', (old_sid,))
+            elif old_sid:
+                connection.execute('UPDATE sessions SET expires_at = ? WHERE id = ?', (old_expires_at, old_sid))
+
+    def expire(self, sid, expires_at):
+        with self._connection() as connection:
+            connection.execute('UPDATE sessions SET expires_at = ? WHERE id = ?', (expires_at, sid))
+
+    def delete(self, sid):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM sessions WHERE id = ?', (sid,))
+
+    def sweep(self, now):
+        with self._connection() as connection:
+            return connection.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,)).rowcount
+
+
+class ServerSessionInterface(SessionInterface):
+    """Сессии на сервере: cookie несёт только непрозрачный id, данные лежат в хранилище.
+
+    Перед хранилищем стоит LRU в памяти процесса. Чтобы он не отдавал устаревшие данные
+    при нескольких воркерах, записи неизменяемы: каждое изменение сессии сохраняется под
+    новым id, а старый доживает SESSION_ROTATE_GRACE секунд (для запросов, уже ушедших
+    со старой cookie). Из LRU берутся только данные: срок записи каждый раз читается из
+    хранилища по первичному ключу, поэтому выход, удаление или укорочение сессии в другом
+    воркере действуют сразу. При входе, выходе и очистке сессии старая запись удаляется сразу. Неизменённая сессия
+    ничего не пишет; срок продлевается, только когда прошла половина PERMANENT_SESSION_LIFETIME.
+    Истёкшие записи удаляются каждые SESSION_SWEEP_EVERY сохранений и командой `flask sweep-sessions`.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, cache_size=4096, cache_ttl=300, rotate_grace=10, sweep_every=1000):
+        self.store = store
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.rotate_grace = rotate_grace
+        self.sweep_every = sweep_every
+        self._saves = 0
+        self._lock = threading.Lock()
+
+    def _load(self, sid):
+        record = self.cache.get(sid)
+        if record is None:
+            record = self.store.load(sid)
+            if record is None:
+                return None
+            record = tuple(record)
+            self.cache.set(sid, record)
+            return record
+        # Данные под id не меняются, а срок и само существование записи — меняются в любом воркере
+        expires_at = self.store.expires_at(sid)
+        if expires_at is None:
+            self.cache.pop(sid)
+            return None
+        return record[0], expires_at
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and SID_PATTERN.match(sid):
+            record = self._load(sid)
+            if record is not None and record[1] > time.time():
+                data, expires_at = record
+                return ServerSession(self.serializer.loads(data), sid=sid, expires_at=expires_at)
+        return ServerSession()
+
+    def _set_cookie(self, app, session, response):
+        response.set_cookie(
+            self.get_cookie_name(app),
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            partitioned=self.get_cookie_partitioned(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def save_session(self, app, session, response):
+        if session.accessed:
+            response.vary.add('Cookie')
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+
+        if not session.modified:
+            # Скользящий срок без записи на каждый запрос: продлеваем, когда осталось меньше половины.
+            # Запись, заменённая новым id, доживает последние rotate_grace секунд и не продлевается
+            if session.sid and self.rotate_grace < session.expires_at - now < lifetime / 2:
+                session.expires_at = now + lifetime
+                self.store.expire(session.sid, session.expires_at)
+                self.cache.pop(session.sid)
+                if session.permanent:
+                    self._set_cookie(app, session, response)
+            return
+
+        old_sid = session.sid
+        if not session:
+            if old_sid:
+                self.store.delete(old_sid)
+                self.cache.pop(old_sid)
+                response.delete_cookie(
+                    self.get_cookie_name(app),
+                    domain=self.get_cookie_domain(app),
+                    path=self.get_cookie_path(app),
+                    secure=self.get_cookie_secure(app),
+                    partitioned=self.get_cookie_partitioned(app),
+                    samesite=self.get_cookie_samesite(app),
+                    httponly=self.get_cookie_httponly(app),
+                )
+                response.vary.add('Cookie')
+            return
+
+        data = self.serializer.dumps(dict(session))
+        session.sid = secrets.token_urlsafe(32)
+        session.expires_at = now + lifetime
+        old_expires_at = None
+        if old_sid and session.get('_user_id') == session.opened_user_id:
+            old_expires_at = min(session.expires_at, now + self.rotate_grace)
+        self.store.save(session.sid, data, session.expires_at, old_sid, old_expires_at)
+        self.cache.set(session.sid, (data, session.expires_at))
+        if old_sid:
+            self.cache.pop(old_sid)
+        self._set_cookie(app, session, response)
+        response.vary.add('Cookie')
+
+        with self._lock:
+            self._saves += 1
+            sweep = self.sweep_every and self._saves % self.sweep_every == 0
+        if sweep:
+            self.store.sweep(now)
+
+    def sweep(self):
+        return self.store.sweep(time.time())
+
+
+class ServerSessions:
+    """Подключает серверные сессии по SESSION_BACKEND: 'cookie' (подписанная cookie Flask),
+    'database' (таблица sessions основной БД) или 'sqlite' (файл SESSION_SQLITE_PATH)."""
+
+    def init_app(self, app):
+        app.config.setdefault('SESSION_BACKEND', 'cookie')
+        app.config.setdefault('SESSION_SQLITE_PATH', None)
+        app.config.setdefault('SESSION_CACHE_SIZE', 4096)
+        app.config.setdefault('SESSION_CACHE_TTL', 300)
+        app.config.setdefault('SESSION_ROTATE_GRACE', 10)
+        app.config.setdefault('SESSION_SWEEP_EVERY', 1000)
+
+        backend = app.config['SESSION_BACKEND']
+        if backend not in SESSION_BACKENDS:
+            raise ValueError(f"Неизвестное хранилище сессий '{backend}'")
+        if backend == 'cookie':
+            return
+        if backend == 'database':
+            store = DatabaseStore()
+        else:
+            store = SqliteStore(app.config['SESSION_SQLITE_PATH'] or os.path.join(app.instance_path, 'sessions.db'))
+        app.session_interface = ServerSessionInterface(
+            store,
+            cache_size=app.config['SESSION_CACHE_SIZE'],
+            cache_ttl=app.config['SESSION_CACHE_TTL'],
+            rotate_grace=app.config['SESSION_ROTATE_GRACE'],
+            sweep_every=app.config['SESSION_SWEEP_EVERY'],
+        )
+
+
+server_sessions = ServerSessions()
@@ -0,0 +1,114 @@
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func, literal, null, select, union_all
+
+from app import db
+from app.model.equipment import Equipment
+from app.model.user import User
+from app.service.lookup_cache import lookup_cache
+
+
+class StatsSnapshot:
+    """Счётчики дашборда, посчитанные одним запросом."""
+
+    def __init__(self, rows):
+        by_status, by_type, by_role = {}, {}, {}
+        for source, key, status, count in rows:
+            if source == 'equipment':
+                # Оборудование группируется по id справочников (в UNION ALL с ролями MySQL
+                # может вернуть их строками), названия подставляются из lookup_cache
+                type_ = lookup_cache.name('type', int(key)) if key is not None else None
+                status = lookup_cache.name('status', int(status)) if status is not None else None
+                by_type[type_] = by_type.get(type_, 0) + count
+                by_status[status] = by_status.get(status, 0) + count
+            else:
+                by_role[key] = count
+
+        self.status_counts = sorted(by_status.items(), key=lambda item: str(item[0]))
+        self.type_counts = sorted(by_type.items(), key=lambda item: str(item[0]))
+        self.role_counts = sorted(by_role.items(), key=lambda item: str(item[0]))
+        self.total_equipment = sum(by_type.values())
+        self.total_users = sum(by_role.values())
+
+
+# Таблицы, от которых зависит снимок: названия типов и статусов берутся из справочников
+STATS_TABLES = ('equipment', 'users', 'lookups')
+
+
+class StatsService:
+    """Кэширует снимок статистики в памяти процесса до первой записи в оборудование или пользователей.
+
+    TTL (STATS_CACHE_TTL) ограничивает устаревание снимка в других воркерах,
+    которые не видят инвалидацию этого процесса. Снимок помнит версии таблиц, прочитанные
+    до его подсчёта: sync() сбрасывает его, если кэш рендеринга видит версии новее.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STATS_CACHE_TTL', 30)
+        app.extensions['stats_service'] = {'snapshot': None, 'expires_at': 0.0, 'generation': 0, 'versions': {}}
+
+    def _state(self):
+        return current_app.extensions['stats_service']
+
+    def _query(self):
+        # Одна выборка вместо трёх: группировка по (type, status) даёт и счётчики по типам,
+        # и счётчики по статусам, а роли пользователей добавляются через UNION ALL
+        equipment = select(
+            literal('equipment'), Equipment.type_id, Equipment.status_id, func.count(Equipment.id)
+        ).group_by(Equipment.type_id, Equipment.status_id)
+        users = select(
+            literal('users'), User.role, null(), func.count(User.id)
+        ).group_by(User.role)
+        return union_all(equipment, users)
+
+    def snapshot(self):
+        from app.model.table_version import TableVersionRepo
+
+        state = self._state()
+        now = time.monotonic()
+        with self._lock:
+            if state['snapshot'] is not None and now < state['expires_at']:
+                return state['snapshot']
+            generation = state['generation']
+
+        # Версии читаются до подсчёта: снимок не старше них
+        versions = {table: version for table, (version, _) in TableVersionRepo().get(*STATS_TABLES).items()}
+        # Названия типов и статусов тоже должны быть не старше этих версий
+        lookup_cache.sync(versions)
+        snapshot = StatsSnapshot(db.session.execute(self._query()).all())
+        ttl = current_app.config['STATS_CACHE_TTL']
+        with self._lock:
+            # Если во время запроса была запись, снимок уже устарел и в кэш не кладётся
+            if state['generation'] == generation:
+                state['snapshot'] = snapshot
+                state['versions'] = versions
+                state['expires_at'] = now + ttl if ttl is not None else float('inf')
+        return snapshot
+
+    def sync(self, versions):
+        """Сбрасывает снимок, если какая-то из versions ({таблица: версия}) новее, чем при его подсчёте."""
+        state = self._state()
+        with self._lock:
+            if state['snapshot'] is None:
+                return
+            stale = any(version > state['versions'].get(table, 0)
+                        for table, version in versions.items() if table in STATS_TABLES)
+        if stale:
+            self.invalidate()
+
+    def invalidate(self):
+        state = self._state()
+        with self._lock:
+            state['snapshot'] = None
+            state['expires_at'] = 0.0
+            state['generation'] += 1
+
+
+stats_service = StatsService()
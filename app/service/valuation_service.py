@@ -0,0 +1,173 @@
+import calendar
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from app import db
+from app.model.equipment import Equipment
+from app.model.user import User
+from app.model.valuation import ValuationRepo
+from app.service.lookup_cache import lookup_cache
+
+try:
+    import numpy
+except ImportError:  # numpy необязателен: без него амортизация считается циклом на Python
+    numpy = None
+
+VALUATION_GROUPS = {
+    'location': 'Место',
+    'type': 'Тип',
+    'user_id': 'Сотрудник',
+}
+# Группировка -> колонка сводки и equipment
+GROUP_COLUMNS = {'location': 'location_id', 'type': 'type_id', 'user_id': 'user_id'}
+
+# Начиная с какого числа строк переходим на numpy (на малых массивах накладные расходы больше выигрыша)
+VECTORIZE_MIN_ROWS = 256
+
+
+def straight_line_values(prices, ages, lives):
+    """Остаточная стоимость при линейной амортизации: price * clamp(1 - age / life, 0, 1).
+
+    prices, ages (в днях) и lives (срок службы в днях) — последовательности одной длины.
+    """
+    if numpy is not None and len(prices) >= VECTORIZE_MIN_ROWS:
+        prices = numpy.asarray(prices, dtype=float)
+        ratio = numpy.asarray(ages, dtype=float) / numpy.asarray(lives, dtype=float)
+        return (prices * numpy.clip(1.0 - ratio, 0.0, 1.0)).tolist()
+    return [price * min(1.0, max(0.0, 1.0 - age / life)) for price, age, life in zip(prices, ages, lives)]
+
+
+class ValuationRow:
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.item_count = 0
+        self.cost = 0.0
+        self.book_value = 0.0
+        self.undated_count = 0
+        self.undated_cost = 0.0
+
+    @property
+    def depreciation(self):
+        return self.cost - self.book_value
+
+
+class ValuationReport:
+    def __init__(self, group_by, as_of, rows):
+        self.group_by = group_by
+        self.as_of = as_of
+        self.rows = rows
+        self.total = ValuationRow(None, 'Итого')
+        for row in rows:
+            for field in ('item_count', 'cost', 'book_value', 'undated_count', 'undated_cost'):
+                setattr(self.total, field, getattr(self.total, field) + getattr(row, field))
+
+
+def useful_life_days(type_id):
+    years = current_app.config['DEPRECIATION_USEFUL_LIFE_BY_TYPE'].get(
+        lookup_cache.name('type', type_id), current_app.config['DEPRECIATION_USEFUL_LIFE_YEARS'])
+    return years * 365.25
+
+
+def month_end(month):
+    return month.replace(day=calendar.monthrange(month.year, month.month)[1])
+
+
+class ValuationService:
+    """Отчёт о балансовой стоимости на дату по сводке equipment_valuation.
+
+    Каждая строка сводки заменяется одной "усреднённой" позицией с ценой cost_total и датой
+    покупки, средневзвешенной по цене. Пока все позиции строки лежат на одном линейном
+    участке (ещё амортизируются или уже списаны полностью), это точно. Исключение — месяц
+    даты отчёта и месяц, в котором истекает срок службы: их позиции дочитываются из
+    equipment по индексу purchase_date. Поэтому стоимость отчёта O(групп * месяцев),
+    а не O(строк оборудования).
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('DEPRECIATION_USEFUL_LIFE_YEARS', 5)
+        app.config.setdefault('DEPRECIATION_USEFUL_LIFE_BY_TYPE', {})
+
+    def report(self, group_by='location', as_of=None):
+        if group_by not in VALUATION_GROUPS:
+            raise ValueError(f"Группировка по полю '{group_by}' не поддерживается")
+        as_of = as_of or date.today()
+        today = as_of.toordinal()
+
+        rows = {}
+        prices, ages, lives, owners = [], [], [], []
+        boundary = []
+
+        def row_for(key):
+            if key not in rows:
+                rows[key] = ValuationRow(key, key)
+            return rows[key]
+
+        for key, type_id, month, count, cost, weighted in ValuationRepo().summary(GROUP_COLUMNS[group_by]):
+            row = row_for(key)
+            if month is None:
+                row.undated_count += count
+                row.undated_cost += cost
+                continue
+            if month > as_of:
+                continue
+            life = useful_life_days(type_id)
+            cutoff = today - life
+            start, end = month.toordinal(), month_end(month).toordinal()
+            # Месяц с датой отчёта или с окончанием срока службы считаем по самим позициям
+            if end > today or start <= cutoff < end:
+                boundary.append((type_id, month))
+                continue
+            row.item_count += count
+            row.cost += cost
+            mean_day = start + (weighted / cost if cost else 0)
+            prices.append(cost)
+            ages.append(today - mean_day)
+            lives.append(life)
+            owners.append(row)
+
+        for key, type_id, purchase_date, price in self._boundary_items(group_by, boundary):
+            if purchase_date > as_of:
+                continue
+            row = row_for(key)
+            row.item_count += 1
+            row.cost += price or 0.0
+            prices.append(price or 0.0)
+            ages.append(today - purchase_date.toordinal())
+            lives.append(useful_life_days(type_id))
+            owners.append(row)
+
+        for row, value in zip(owners, straight_line_values(prices, ages, lives)):
+            row.book_value += value
+
+        result = [row for row in rows.values() if row.item_count or row.undated_count]
+        self._label(group_by, result)
+        result.sort(key=lambda row: (row.key is None, str(row.label)))
+        return ValuationReport(group_by, as_of, result)
+
+    def _boundary_items(self, group_by, boundary):
+        if not boundary:
+            return []
+        column = getattr(Equipment, GROUP_COLUMNS[group_by])
+        conditions = [
+            and_(Equipment.type_id == type_id,
+                 Equipment.purchase_date.between(month, month_end(month)))
+            for type_id, month in set(boundary)
+        ]
+        return db.session.query(column, Equipment.type_id, Equipment.purchase_date, Equipment.price) \
+            .filter(or_(*conditions)).all()
+
+    def _label(self, group_by, rows):
+        if group_by == 'user_id':
+            ids = [row.key for row in rows if row.key is not None]
+            names = dict(db.session.query(User.id, User.username).filter(User.id.in_(ids))) if ids else {}
+            for row in rows:
+                row.label = names.get(row.key, f'#{row.key}') if row.key is not None else 'Не закреплено'
+        else:
+            for row in rows:
+                row.label = lookup_cache.name(group_by, row.key) if row.key is not None else 'Не указано'
+
+
+valuation_service = ValuationService()
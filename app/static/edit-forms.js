@@ -0,0 +1,26 @@
+// Кнопки «Изменить» в списках подставляют в форму обновления ID и версию записи.
+// Версию сервер сверяет с текущей, поэтому чужие правки не перезаписываются молча
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-edit-id]').forEach(function(button) {
+        const idInput = document.getElementById(button.dataset.editTarget);
+        const versionInput = document.getElementById(button.dataset.editTarget + '-version');
+        if (!idInput || !versionInput) {
+            return;
+        }
+        button.addEventListener('click', function() {
+            idInput.value = button.dataset.editId;
+            versionInput.value = button.dataset.editVersion;
+            idInput.scrollIntoView({behavior: 'smooth', block: 'center'});
+        });
+    });
+
+    document.querySelectorAll('input[type="hidden"][id$="-version"]').forEach(function(versionInput) {
+        const idInput = document.getElementById(versionInput.id.replace(/-version$/, ''));
+        if (idInput) {
+            // ID, исправленный вручную, уже не соответствует версии из списка
+            idInput.addEventListener('input', function() {
+                versionInput.value = '';
+            });
+        }
+    });
+});
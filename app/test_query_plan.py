@@ -0,0 +1,147 @@
+import pytest
+from sqlalchemy import event, inspect, text
+from app import create_app, db
+from app.migrations import create_missing_indexes
+from app.model.equipment import EquipmentRepo, SORT_COLUMNS
+from app.model.user import UserRepo
+from app.model.lookup import LookupRepo
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        LookupRepo().seed_defaults()
+        repo = EquipmentRepo()
+        user = UserRepo().add('owner', 'password123')
+        for i in range(20):
+            repo.add(f'Ноутбук {i}', 'Ноутбук', 'HP', f'INV-{i:03d}', 'available', 'Склад', user_id=user.id)
+        yield app
+        db.drop_all()
+
+
+@pytest.fixture
+def captured(app):
+    # Собираем SQL, который реально выполняют методы репозитория
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def query_plan(statement, parameters):
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    # Чтение покрывающего индекса для GROUP BY и поиск по FTS5 с MATCH (idxStr вида '0:M4') допустимы,
+    # обход самой таблицы — нет
+    return [step for step in plan
+            if step.startswith('SCAN') and 'COVERING INDEX' not in step
+            and not ('VIRTUAL TABLE INDEX' in step and ':M' in step)]
+
+
+def assert_no_scans(statements):
+    assert statements
+    for statement, parameters in statements:
+        plan = query_plan(statement, parameters)
+        assert not full_scans(plan), f'{statement}\n{plan}'
+
+
+@pytest.mark.parametrize('filters', [
+    {'type': 'Ноутбук'},
+    {'status': 'available'},
+    {'location': 'Склад'},
+    {'type': 'Ноутбук', 'status': 'available'},
+    {'type': 'Ноутбук', 'location': 'Склад'},
+    {'status': 'available', 'location': 'Склад'},
+    {'type': 'Ноутбук', 'status': 'available', 'location': 'Склад'},
+])
+def test_filter_by_uses_index(app, captured, filters):
+    EquipmentRepo().filter_by(**filters)
+    assert_no_scans(captured)
+
+
+def test_group_by_counts_use_index(app, captured):
+    repo = EquipmentRepo()
+    repo.count_by_status()
+    repo.count_by_type()
+    assert_no_scans(captured)
+
+
+def test_user_equipment_relationship_uses_index(app, captured):
+    user = UserRepo().get_by_username('owner')
+    captured.clear()
+    assert len(user.equipment) == 20
+    assert_no_scans(captured)
+
+
+@pytest.mark.parametrize('sort', sorted(SORT_COLUMNS))
+@pytest.mark.parametrize('descending', [False, True])
+def test_keyset_pages_seek_by_index(app, captured, sort, descending):
+    repo = EquipmentRepo()
+    first = repo.paginate(sort=sort, descending=descending, per_page=5)
+
+    # Первая страница читает индекс по порядку и останавливается на LIMIT
+    statement, parameters = captured.pop()
+    plan = query_plan(statement, parameters)
+    assert 'LIMIT' in statement
+    assert not [step for step in plan if 'TEMP B-TREE' in step], plan
+
+    repo.paginate(sort=sort, descending=descending, per_page=5, after=first.next_cursor)
+    repo.paginate(sort=sort, descending=descending, per_page=5, before=first.next_cursor)
+    assert_no_scans(captured)
+
+
+def test_filtered_page_uses_index(app, captured):
+    EquipmentRepo().paginate(location='Склад', sort='name', per_page=5)
+    assert_no_scans(captured)
+
+
+def test_history_timeline_and_activity_use_index(app, captured):
+    from app.model.equipment_history import EquipmentHistoryRepo
+    repo = EquipmentHistoryRepo()
+    assert len(repo.timeline(1)) == 1
+    repo.timeline(1, after=1)
+    repo.activity(1, before=100)
+    for statement, parameters in captured:
+        assert not [step for step in query_plan(statement, parameters) if 'TEMP B-TREE' in step]
+    assert_no_scans(captured)
+
+
+def test_missing_indexes_are_created_for_existing_db(app):
+    db.session.execute(text('DROP INDEX ix_equipment_status_location'))
+    db.session.commit()
+
+    assert create_missing_indexes() == ['ix_equipment_status_location']
+    names = {index['name'] for index in inspect(db.engine).get_indexes('equipment')}
+    assert 'ix_equipment_status_location' in names
+    assert create_missing_indexes() == []
+
+
+def test_search_index_is_created_for_existing_db(app):
+    from app.migrations import schema_is_current, upgrade_schema
+
+    db.session.execute(text('DROP TABLE equipment_fts'))
+    db.session.commit()
+    assert not schema_is_current()
+
+    upgrade_schema()
+    assert schema_is_current()
+    assert [item.inventory_number for item in EquipmentRepo().search('INV-007')] == ['INV-007']
+
+
+def test_search_uses_fts_index(app, captured):
+    EquipmentRepo().search('ноутбук', location='Склад')
+    plan = query_plan(*captured[-1])
+    assert any('VIRTUAL TABLE INDEX' in step for step in plan), plan
+    # Ранжируется только ограниченный набор кандидатов, его обход — не обход таблицы
+    assert full_scans(plan) == ['SCAN candidates'], plan
@@ -0,0 +1,127 @@
+"""Байты на проводе и время до первого байта для HTML-страниц: без сжатия, gzip, br и 304.
+
+    python -m benchmarks.compression_bench --dataset 10k
+    python -m benchmarks.compression_bench --dataset 10k --path '/equipment/?status=in_use' --render-cache none
+
+Поднимает gunicorn (как benchmarks.http_bench в режиме server) дважды: с выключенными
+COMPRESSION_ENABLED и PAGE_ETAGS_ENABLED — так приложение отвечало до middleware — и с включёнными.
+Под пользователем набора последовательно запрашивает --path по keep-alive соединению:
+  identity    — без Accept-Encoding;
+  gzip, br    — с Accept-Encoding (br — только если на сервере установлен brotli);
+  revalidate  — повторный запрос с If-None-Match от предыдущего ответа (ожидается 304).
+Байты на проводе — строка статуса, заголовки и тело ответа как они пришли по сокету;
+TTFB — от отправки запроса до разбора заголовков ответа, total — до конца тела.
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import dataset  # noqa: E402
+from benchmarks.http_bench import READER, HttpSession, gunicorn_server, logged_in, percentile  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def measure(connection, path, headers):
+    started = time.perf_counter()
+    connection.request('GET', path, headers=headers)
+    response = connection.getresponse()
+    ttfb = time.perf_counter() - started
+    body = response.read()
+    total = time.perf_counter() - started
+    header_bytes = len(f'HTTP/1.1 {response.status} {response.reason}\r\n') + 2
+    header_bytes += sum(len(f'{name}: {value}\r\n') for name, value in response.getheaders())
+    return response, body, ttfb, total, header_bytes + len(body)
+
+
+def run_variant(address, cookies, path, requests, warmup, encoding=None, revalidate=False):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    connection = http.client.HTTPConnection(*address, timeout=60)
+    base = {**headers, 'Cookie': '; '.join(f'{name}={value}' for name, value in cookies.items())}
+    ttfbs, totals, sizes, statuses = [], [], [], set()
+    etag = None
+    for number in range(warmup + requests):
+        request_headers = dict(base)
+        if revalidate and etag:
+            request_headers['If-None-Match'] = etag
+        response, body, ttfb, total, wire = measure(connection, path, request_headers)
+        etag = response.getheader('ETag') or etag
+        if number < warmup:
+            continue
+        ttfbs.append(ttfb)
+        totals.append(total)
+        sizes.append(wire)
+        statuses.add(response.status)
+        content_encoding = response.getheader('Content-Encoding', 'identity')
+    connection.close()
+    ttfbs.sort()
+    totals.sort()
+    return {
+        'status': sorted(statuses),
+        'content_encoding': content_encoding,
+        'wire_bytes': round(sum(sizes) / len(sizes)),
+        'body_bytes': len(body),
+        'ttfb_p50_ms': round(percentile(ttfbs, 50) * 1000, 2),
+        'ttfb_p95_ms': round(percentile(ttfbs, 95) * 1000, 2),
+        'total_p50_ms': round(percentile(totals, 50) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--path', default='/equipment/')
+    parser.add_argument('--requests', type=int, default=100, help='запросов на вариант')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=1, help='воркеры gunicorn (WEB_CONCURRENCY)')
+    parser.add_argument('--render-cache', choices=('memory', 'disk', 'none'), default='memory')
+    parser.add_argument('--output', help='записать результаты в JSON')
+    args = parser.parse_args()
+
+    path, equipment, users = dataset.from_arguments(args)
+    work_dir = tempfile.mkdtemp(prefix='compression-bench-')
+    database = dataset.working_copy(path, os.path.join(work_dir, 'bench.db'))
+    os.environ.setdefault('RENDER_CACHE_DIR', os.path.join(work_dir, 'render-cache'))
+    render_cache = None if args.render_cache == 'none' else args.render_cache
+
+    variants = [('identity', None, False), ('gzip', 'gzip', False)]
+    if brotli is not None:
+        variants.append(('br', 'br, gzip', False))
+    variants.append(('revalidate', 'br, gzip' if brotli is not None else 'gzip', True))
+
+    print(f"equipment={equipment} users={users} path={args.path} render_cache={render_cache}")
+    results = {}
+    for middleware in ('off', 'on'):
+        os.environ['COMPRESSION_ENABLED'] = os.environ['PAGE_ETAGS_ENABLED'] = '1' if middleware == 'on' else '0'
+        with gunicorn_server(database, args.workers, None, render_cache,
+                             os.path.join(work_dir, f'gunicorn-{middleware}.log')) as address:
+            session = logged_in(HttpSession(address), READER)
+            cookies = dict(session.cookies)
+            session.close()
+            for name, encoding, revalidate in variants if middleware == 'on' else variants[:1]:
+                result = results[f'{middleware}/{name}'] = run_variant(
+                    address, cookies, args.path, args.requests, args.warmup, encoding, revalidate)
+                print(f"{middleware:>3} {name:>10}: HTTP {','.join(map(str, result['status']))} "
+                      f"{result['content_encoding']:>8} wire {result['wire_bytes']:>8} B  "
+                      f"TTFB p50 {result['ttfb_p50_ms']:6.2f} ms p95 {result['ttfb_p95_ms']:6.2f} ms  "
+                      f"total p50 {result['total_p50_ms']:6.2f} ms", flush=True)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'dataset': {'equipment': equipment, 'users': users}, 'path': args.path,
+                       'render_cache': render_cache, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
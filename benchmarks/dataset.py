@@ -0,0 +1,164 @@
+"""Синтетические наборы данных для бенчмарков: оборудование и пользователи в файловой SQLite.
+
+    python -m benchmarks.dataset --dataset 100k
+    python -m benchmarks.dataset --equipment 250000 --users 3000 --data-dir /tmp/bench-data
+
+Набор определяется размерами и зерном генератора, поэтому повторная сборка даёт тот же файл,
+а уже собранный файл переиспользуется. Все пользователи получают пароль BENCH_PASSWORD.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.migrations import upgrade_schema  # noqa: E402
+from app.model.equipment import EquipmentRepo  # noqa: E402
+from app.model.lookup import DEFAULT_LOOKUPS  # noqa: E402
+from app.model.table_version import TableVersionRepo  # noqa: E402
+from app.model.user import User  # noqa: E402
+from config import TestingConfig  # noqa: E402
+
+# Имя -> (единиц оборудования, пользователей)
+DATASETS = {
+    '10k': (10_000, 1_000),
+    '100k': (100_000, 2_000),
+    '1m': (1_000_000, 5_000),
+}
+BENCH_PASSWORD = 'password123'
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'flask-detalki-bench')
+
+VENDORS = ['Dell', 'HP', 'Lenovo', 'Acer', 'Asus', 'Samsung', 'LG', 'Canon', 'Cisco', 'Huawei']
+SERIES = ['Elite', 'Pro', 'Think', 'Vostro', 'Aspire', 'Latitude', 'Laser']
+WORDS = ['процессор', 'память', 'диск', 'матрица', 'гарантия', 'клавиатура', 'беспроводной',
+         'gigabit', 'ssd', 'ram', 'intel', 'amd', 'hdmi', 'usb', 'wifi', 'raid', 'xeon', 'core']
+# Даты покупки отсчитываются от фиксированного дня, чтобы набор не зависел от даты сборки
+LAST_PURCHASE_DATE = date(2024, 12, 31)
+
+
+def dataset_path(data_dir, equipment, users, seed=42):
+    return os.path.join(data_dir, f'equipment-{equipment}-users-{users}-seed-{seed}.db')
+
+
+def use_database(path):
+    """Направляет create_app('testing') на файл набора вместо SQLite в памяти."""
+    TestingConfig.SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+    TestingConfig.DATABASE_ENGINE_PROFILE = 'sqlite'
+
+
+def user_rows(count, password_hash):
+    # admin и manager нужны сценариям записи; остальные — обычные сотрудники с ролями вперемешку
+    rows = [{'username': 'admin', 'password_hash': password_hash, 'role': 'admin'},
+            {'username': 'manager', 'password_hash': password_hash, 'role': 'manager'}]
+    for number in range(max(0, count - len(rows))):
+        role = 'manager' if number % 50 == 0 else 'user'
+        rows.append({'username': f'user{number}', 'password_hash': password_hash, 'role': role})
+    return rows
+
+
+def equipment_rows(start, stop, user_count, rng):
+    for number in range(start, stop):
+        type_ = rng.choice(DEFAULT_LOOKUPS['type'])
+        vendor = rng.choice(VENDORS)
+        status = rng.choice(DEFAULT_LOOKUPS['status'])
+        yield {
+            'name': f'{type_} {vendor} {number}',
+            'type': type_,
+            'model': f'{vendor} {rng.choice(SERIES)}-{rng.randint(1, 999)}',
+            'inventory_number': f'INV-{number:07d}',
+            'status': status,
+            'location': rng.choice(DEFAULT_LOOKUPS['location']),
+            'purchase_date': LAST_PURCHASE_DATE - timedelta(days=rng.randint(0, 6 * 365)),
+            'price': float(rng.randint(50, 3000) * 10),
+            'specification': ' '.join(rng.choice(WORDS) for _ in range(10)),
+            'user_id': rng.randint(1, user_count) if status == 'in_use' else None,
+        }
+
+
+def build(path, equipment, users, seed=42, batch=5000, log=print):
+    """Собирает набор в path, если его ещё нет, и возвращает path.
+
+    Сборка идёт во временный файл, который переименовывается только в конце,
+    поэтому прерванная сборка не будет принята за готовый набор.
+    """
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.building'
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(tmp_path + suffix):
+            os.remove(tmp_path + suffix)
+
+    use_database(tmp_path)
+    app = create_app('testing')
+    started = time.perf_counter()
+    with app.app_context():
+        upgrade_schema()
+        # Один хэш на всех: сборка не тратит минуты на хэширование тысяч одинаковых паролей
+        password_hash = generate_password_hash(BENCH_PASSWORD, method=app.config['PASSWORD_HASH_METHOD'])
+        rows = user_rows(users, password_hash)
+        for offset in range(0, len(rows), batch):
+            db.session.execute(insert(User), rows[offset:offset + batch])
+        TableVersionRepo().bump('users')
+        db.session.commit()
+
+        repo = EquipmentRepo()
+        rng = random.Random(seed)
+        for offset in range(0, equipment, batch):
+            repo.bulk_add(list(equipment_rows(offset, min(offset + batch, equipment), len(rows), rng)))
+            db.session.expunge_all()
+        db.engine.dispose()
+
+    os.replace(tmp_path, path)
+    log(f"dataset equipment={equipment} users={users} built in {time.perf_counter() - started:.1f}s: {path}")
+    return path
+
+
+def working_copy(path, target):
+    """Копирует набор в target и доводит схему копии до текущей: набор, собранный
+    до новых миграций, переиспользуется, а таблицы вроде sessions появляются в копии."""
+    shutil.copyfile(path, target)
+    use_database(target)
+    app = create_app('testing')
+    with app.app_context():
+        upgrade_schema()
+        db.engine.dispose()
+    return target
+
+
+def add_arguments(parser):
+    parser.add_argument('--dataset', choices=sorted(DATASETS), default='10k',
+                        help='готовый размер: ' + ', '.join(f'{name}={e}/{u}' for name, (e, u) in DATASETS.items()))
+    parser.add_argument('--equipment', type=int, help='единиц оборудования (вместо --dataset)')
+    parser.add_argument('--users', type=int, help='пользователей (вместо --dataset)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='каталог собранных наборов')
+
+
+def from_arguments(args):
+    """Возвращает (путь, единиц оборудования, пользователей), собирая набор при необходимости."""
+    equipment, users = DATASETS[args.dataset]
+    equipment = args.equipment if args.equipment is not None else equipment
+    users = args.users if args.users is not None else users
+    path = build(dataset_path(args.data_dir, equipment, users, args.seed), equipment, users, args.seed)
+    return path, equipment, users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    path, _, _ = from_arguments(parser.parse_args())
+    print(path)
+
+
+if __name__ == '__main__':
+    main()
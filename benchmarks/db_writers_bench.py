@@ -0,0 +1,71 @@
+"""Пропускная способность параллельных писателей в файловую SQLite с профилем движка и без него.
+
+    python -m benchmarks.db_writers_bench --writers 8 --rows 200
+
+Каждый писатель добавляет оборудование через EquipmentRepo.add (одна транзакция на строку),
+как это делает веб-форма. Ошибки "database is locked" считаются отдельно.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.model.equipment import EquipmentRepo  # noqa: E402
+from app.model.lookup import LookupRepo  # noqa: E402
+from config import TestingConfig  # noqa: E402
+
+
+def run(profile, writers, rows):
+    directory = tempfile.mkdtemp(prefix='writers-bench-')
+    TestingConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    TestingConfig.DATABASE_ENGINE_PROFILE = profile
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        LookupRepo().seed_defaults()
+
+    errors = []
+
+    def writer(number):
+        with app.app_context():
+            repo = EquipmentRepo()
+            for i in range(rows):
+                try:
+                    repo.add(f'Ноутбук {number}-{i}', 'Ноутбук', 'HP', f'INV-{number}-{i}', 'available', 'Склад')
+                except OperationalError as e:
+                    db.session.rollback()
+                    errors.append(str(e.orig))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        written = len(EquipmentRepo().all())
+        db.engine.dispose()
+    print(f"profile={profile or 'default':8} writers={writers} rows={written} errors={len(errors)} "
+          f"elapsed={elapsed:.2f}s rows/sec={written / elapsed:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=200)
+    args = parser.parse_args()
+    run(None, args.writers, args.rows)
+    run('sqlite', args.writers, args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,407 @@
+"""Нагрузочный бенчмарк HTTP-эндпоинтов: задержки p50/p95/p99 и пропускная способность.
+
+    python -m benchmarks.http_bench --dataset 10k --mode client
+    python -m benchmarks.http_bench --dataset 100k --mode server --workers 3 --concurrency 8
+    python -m benchmarks.http_bench --dataset 10k --save-baseline benchmarks/baselines/10k-client.json
+    python -m benchmarks.http_bench --dataset 10k --compare benchmarks/baselines/10k-client.json
+
+Режим client гоняет запросы через тестовый клиент Flask в этом процессе, без сети; режим server
+поднимает gunicorn с gunicorn.conf.py и ходит к нему по HTTP с keep-alive. Оба работают с рабочей
+копией набора из benchmarks.dataset, так что сценарии записи не портят сам набор. Каждый сценарий
+выполняется отдельно: --requests запросов, поделённых между --concurrency клиентами.
+
+Хэши паролей в наборе дешёвые (метод TestingConfig), поэтому сценарий login меряет путь входа
+без стоимости scrypt; её отдельно меряет benchmarks.login_bench.
+
+Сравнение с базовой линией завершается с кодом 1, если у сценария p95 вырос или пропускная
+способность упала больше чем на --tolerance, либо появились ошибки.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from itertools import count
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from app.model.equipment import encode_cursor  # noqa: E402
+from app.model.lookup import DEFAULT_LOOKUPS  # noqa: E402
+from benchmarks import dataset  # noqa: E402
+from config import TestingConfig  # noqa: E402
+
+# Пользователи набора, под которыми идут сценарии: чтение — обычный сотрудник, запись — администратор
+READER = 'user1'
+WRITER = 'admin'
+
+
+class Scenario:
+    def __init__(self, name, role, build, expected=(200,), fresh_session=False):
+        self.name = name
+        self.role = role
+        self.build = build  # rng -> (метод, путь, данные формы)
+        self.expected = expected
+        # Для входа нужен новый, ещё не аутентифицированный клиент на каждый запрос
+        self.fresh_session = fresh_session
+
+
+def scenarios(equipment, users):
+    types, statuses, locations = (DEFAULT_LOOKUPS[kind] for kind in ('type', 'status', 'location'))
+    created = count(1)
+    # Удаляем с конца набора, чтобы не пересекаться с обновлениями в начале диапазона
+    deleted = count(equipment, -1)
+
+    def list_page(rng):
+        after = rng.randint(1, equipment)
+        return 'GET', '/equipment/?' + urlencode({'after': encode_cursor(after, after)}), None
+
+    def filtered(rng):
+        params = {'type': rng.choice(types), 'status': rng.choice(statuses), 'location': rng.choice(locations)}
+        return 'GET', '/equipment/?' + urlencode(params), None
+
+    def search(rng):
+        query = f"{rng.choice(dataset.VENDORS)} {rng.choice(dataset.SERIES)}"
+        return 'GET', '/equipment/?' + urlencode({'q': query}), None
+
+    def create(rng):
+        number = next(created)
+        return 'POST', '/equipment/', {
+            'name': f'Ноутбук бенчмарк {number}', 'type': rng.choice(types), 'model': 'HP Bench',
+            'inventory_number': f'BENCH-{number:07d}', 'status': 'available', 'location': rng.choice(locations),
+            'purchase_date': '2024-06-01', 'price': '1000',
+        }
+
+    def update(rng):
+        return 'POST', '/equipment/update', {
+            'id': rng.randint(1, equipment // 2), 'new_name': f'Обновлено {rng.randint(1, 10 ** 6)}',
+            'new_status': rng.choice(statuses),
+        }
+
+    def delete(rng):
+        return 'POST', f'/equipment/delete/{next(deleted)}', None
+
+    def login(rng):
+        username = f'user{rng.randint(1, max(1, users - 3))}'
+        return 'POST', '/auth/login', {'username': username, 'password': dataset.BENCH_PASSWORD}
+
+    return [
+        Scenario('list', READER, lambda rng: ('GET', '/equipment/', None)),
+        Scenario('list_pages', READER, list_page),
+        Scenario('filter', READER, filtered),
+        Scenario('search', READER, search),
+        Scenario('create', WRITER, create, expected=(302,)),
+        Scenario('update', WRITER, update, expected=(302,)),
+        Scenario('delete', WRITER, delete, expected=(302,)),
+        Scenario('login', None, login, expected=(302,), fresh_session=True),
+    ]
+
+
+class ClientSession:
+    """Тестовый клиент Flask: запрос проходит весь стек приложения, но без сокетов и сервера."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HttpSession:
+    """Клиент HTTP/1.1 с keep-alive и cookie сессии; редиректы не выполняются."""
+
+    def __init__(self, address):
+        self.address = address
+        self.cookies = {}
+        self.connection = None
+
+    def request(self, method, path, data=None):
+        body = urlencode(data) if data else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(*self.address, timeout=60)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Сервер закрыл простаивающее соединение: переподключаемся один раз
+                self.close()
+                if attempt:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def percentile(sorted_values, p):
+    # Ранговый перцентиль: значение, не меньше которого p% наблюдений
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {'requests': 0, 'errors': errors}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def run_scenario(scenario, new_session, requests, concurrency, warmup, seed):
+    rngs = [random.Random(f'{seed}-{scenario.name}-{number}') for number in range(concurrency)]
+    sessions = [None if scenario.fresh_session else new_session(scenario.role) for _ in range(concurrency)]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one_request(session, rng):
+        own = session is None
+        if own:
+            session = new_session(None)
+        method, path, data = scenario.build(rng)
+        started = time.perf_counter()
+        try:
+            status = session.request(method, path, data)
+        except Exception:
+            status = None
+        elapsed = time.perf_counter() - started
+        if own:
+            session.close()
+        return elapsed, status in scenario.expected
+
+    def worker(number, total):
+        local, failed = [], 0
+        for _ in range(total):
+            elapsed, ok = one_request(sessions[number], rngs[number])
+            local.append(elapsed)
+            failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    # Прогрев: кэши процесса, соединения и планы запросов
+    for number in range(concurrency):
+        for _ in range(warmup):
+            one_request(sessions[number], rngs[number])
+
+    shares = [requests // concurrency + (number < requests % concurrency) for number in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(number, share)) for number, share in enumerate(shares)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    for session in sessions:
+        if session is not None:
+            session.close()
+    return summarize(latencies, errors[0], elapsed)
+
+
+def logged_in(session, username):
+    if username is not None:
+        status = session.request('POST', '/auth/login', {'username': username, 'password': dataset.BENCH_PASSWORD})
+        if status != 302:
+            raise RuntimeError(f"Не удалось войти как {username}: HTTP {status}")
+    return session
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def gunicorn_server(database, workers, threads, render_cache, log_path):
+    """Запускает gunicorn -c gunicorn.conf.py wsgi:app на свободном порту и ждёт первого ответа."""
+    address = ('127.0.0.1', free_port())
+    env = dict(os.environ,
+               FLASK_CONFIG='production',
+               DATABASE_URL=f'sqlite:///{database}',
+               GUNICORN_BIND='%s:%d' % address,
+               PASSWORD_HASH_METHOD=TestingConfig.PASSWORD_HASH_METHOD,
+               RENDER_CACHE_BACKEND=render_cache or '')
+    if workers:
+        env['WEB_CONCURRENCY'] = str(workers)
+    if threads:
+        env['GUNICORN_THREADS'] = str(threads)
+
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                                   cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn завершился с кодом {process.returncode}, см. {log_path}")
+            try:
+                session = HttpSession(address)
+                session.request('GET', '/auth/login')
+                session.close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"gunicorn не ответил за 60 с, см. {log_path}")
+                time.sleep(0.2)
+        yield address
+    finally:
+        process.terminate()
+        process.wait(30)
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно базовой линии (пустой — регрессий нет)."""
+    regressions = []
+    for name, base in baseline['scenarios'].items():
+        current = results['scenarios'].get(name)
+        if current is None or 'p95_ms' not in base:
+            continue
+        if current['errors'] > base['errors']:
+            regressions.append(f"{name}: ошибок {current['errors']} (было {base['errors']})")
+        if 'p95_ms' not in current:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']} мс (было {base['p95_ms']} мс)")
+        if current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: {current['throughput_rps']} запросов/с "
+                               f"(было {base['throughput_rps']} запросов/с)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--mode', choices=('client', 'server'), default='client')
+    parser.add_argument('--workers', type=int, default=None, help='воркеры gunicorn (WEB_CONCURRENCY)')
+    parser.add_argument('--threads', type=int, default=None, help='потоки воркера gunicorn (GUNICORN_THREADS)')
+    parser.add_argument('--render-cache', choices=('memory', 'disk', 'none'), default='memory')
+    parser.add_argument('--scenarios', help='через запятую; по умолчанию все')
+    parser.add_argument('--requests', type=int, default=200, help='запросов на сценарий')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=5, help='запросов прогрева на клиента')
+    parser.add_argument('--output', help='записать результаты в JSON')
+    parser.add_argument('--save-baseline', help='записать результаты как базовую линию')
+    parser.add_argument('--compare', help='сравнить с базовой линией из JSON')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое ухудшение, доля')
+    args = parser.parse_args()
+
+    path, equipment, users = dataset.from_arguments(args)
+    selected = scenarios(equipment, users)
+    if args.scenarios:
+        names = set(args.scenarios.split(','))
+        unknown = names - {scenario.name for scenario in selected}
+        if unknown:
+            parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+        selected = [scenario for scenario in selected if scenario.name in names]
+
+    # Рабочая копия: сценарии записи меняют БД, а набор должен оставаться прежним
+    work_dir = tempfile.mkdtemp(prefix='http-bench-')
+    database = os.path.join(work_dir, 'bench.db')
+    dataset.working_copy(path, database)
+    render_cache = None if args.render_cache == 'none' else args.render_cache
+
+    results = {
+        'meta': {
+            'dataset': {'equipment': equipment, 'users': users, 'seed': args.seed},
+            'mode': args.mode,
+            'workers': args.workers if args.mode == 'server' else None,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'render_cache': render_cache,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        'scenarios': {},
+    }
+
+    def run_all(new_session):
+        for scenario in selected:
+            result = run_scenario(scenario, new_session, args.requests, args.concurrency, args.warmup, args.seed)
+            results['scenarios'][scenario.name] = result
+            if result['requests']:
+                print(f"{scenario.name:12} n={result['requests']:5} errors={result['errors']:3} "
+                      f"p50={result['p50_ms']:7.1f}ms p95={result['p95_ms']:7.1f}ms p99={result['p99_ms']:7.1f}ms "
+                      f"rps={result['throughput_rps']:7.1f}", flush=True)
+
+    print(f"mode={args.mode} equipment={equipment} users={users} concurrency={args.concurrency} "
+          f"render_cache={render_cache}")
+    if args.mode == 'client':
+        dataset.use_database(database)
+        TestingConfig.RENDER_CACHE_BACKEND = render_cache
+        TestingConfig.RENDER_CACHE_DIR = os.path.join(work_dir, 'render-cache')
+        app = create_app('testing')
+        # Исключения превращаются в 500, как на сервере, а не пробрасываются в поток клиента
+        app.testing = False
+        app.config['PROPAGATE_EXCEPTIONS'] = False
+        run_all(lambda username: logged_in(ClientSession(app), username))
+    else:
+        os.environ.setdefault('RENDER_CACHE_DIR', os.path.join(work_dir, 'render-cache'))
+        with gunicorn_server(database, args.workers, args.threads, render_cache,
+                             os.path.join(work_dir, 'gunicorn.log')) as address:
+            run_all(lambda username: logged_in(HttpSession(address), username))
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    for target in (args.output, args.save_baseline):
+        if target:
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            with open(target, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+                f.write('\n')
+            print(f"results written to {target}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ('dataset', 'mode', 'concurrency', 'render_cache'):
+            if baseline['meta'].get(key) != results['meta'][key]:
+                print(f"warning: {key} differs from baseline: {baseline['meta'].get(key)} != {results['meta'][key]}")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Замер пропускной способности /auth/login.
+
+    python -m benchmarks.login_bench --method scrypt:32768:8:1 --clients 8 --logins 200
+
+Печатает логины в секунду всего и на одно ядро пула хэширования.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.model.user import UserRepo  # noqa: E402
+
+
+def run(method, clients, logins, workers):
+    app = create_app('testing')
+    app.config['PASSWORD_HASH_METHOD'] = method
+    if workers:
+        app.config['PASSWORD_HASH_WORKERS'] = workers
+        from app.service.password_service import password_hasher
+        password_hasher.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        UserRepo().add('bench', 'password123')
+
+    per_client = logins // clients
+    errors = []
+
+    def worker():
+        client = app.test_client()
+        for _ in range(per_client):
+            response = client.post('/auth/login', data={'username': 'bench', 'password': 'password123'})
+            if response.status_code != 302:
+                errors.append(response.status_code)
+            client.get('/auth/logout')
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = per_client * clients
+    cores = min(app.config['PASSWORD_HASH_WORKERS'], os.cpu_count() or 1)
+    rate = total / elapsed
+    print(f"method={method} clients={clients} hash_workers={app.config['PASSWORD_HASH_WORKERS']}")
+    print(f"logins={total} errors={len(errors)} elapsed={elapsed:.2f}s")
+    print(f"logins/sec={rate:.1f} logins/sec/core={rate / cores:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--method', default='scrypt:32768:8:1')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None, help='PASSWORD_HASH_WORKERS')
+    args = parser.parse_args()
+    run(args.method, args.clients, args.logins, args.workers)
+
+
+if __name__ == '__main__':
+    main()
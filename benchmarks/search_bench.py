@@ -0,0 +1,75 @@
+"""Задержка полнотекстового поиска EquipmentRepo.search на синтетической таблице.
+
+    python -m benchmarks.search_bench --rows 500000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.model.equipment import EquipmentRepo  # noqa: E402
+from app.model.lookup import LookupRepo  # noqa: E402
+from config import TestingConfig  # noqa: E402
+
+VENDORS = ['Dell', 'HP', 'Lenovo', 'Acer', 'Asus', 'Samsung', 'LG', 'Canon', 'Cisco', 'Huawei']
+TYPES = ['Компьютер', 'Ноутбук', 'Монитор', 'Принтер', 'Сканер', 'Сервер', 'Роутер']
+WORDS = ['процессор', 'память', 'диск', 'матрица', 'гарантия', 'клавиатура', 'сенсорный', 'беспроводной',
+         'gigabit', 'ssd', 'ram', 'intel', 'amd', 'hdmi', 'usb', 'wifi', 'bluetooth', 'raid', 'xeon', 'core']
+QUERIES = ['dell', 'ноутбук lenovo', 'INV-0042', 'xeon raid', 'монит', 'hp elite', 'ssd 512', 'cisco роутер']
+
+
+def populate(rows, batch=5000):
+    repo = EquipmentRepo()
+    rng = random.Random(42)
+    for start in range(0, rows, batch):
+        repo.bulk_add([{
+            'name': f'{rng.choice(TYPES)} {rng.choice(VENDORS)} {i}',
+            'type': rng.choice(TYPES),
+            'model': f'{rng.choice(VENDORS)} {rng.choice(["Elite", "Pro", "Think", "Vostro", "Aspire"])}-{rng.randint(1, 999)}',
+            'inventory_number': f'INV-{i:07d}',
+            'status': 'available',
+            'location': 'Склад',
+            'purchase_date': None,
+            'price': None,
+            'specification': ' '.join(rng.choice(WORDS) for _ in range(12)) + f' ssd {rng.choice([256, 512, 1024])}',
+            'user_id': None,
+        } for i in range(start, min(start + batch, rows))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='search-bench-'), 'bench.db')
+    TestingConfig.SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+    TestingConfig.DATABASE_ENGINE_PROFILE = 'sqlite'
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        LookupRepo().seed_defaults()
+        started = time.perf_counter()
+        populate(args.rows)
+        print(f"rows={args.rows} populate={time.perf_counter() - started:.1f}s")
+
+        repo = EquipmentRepo()
+        for query in QUERIES:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                found = repo.search(query, limit=50)
+                timings.append(time.perf_counter() - started)
+                db.session.expunge_all()
+            timings.sort()
+            print(f"q={query!r:18} hits={len(found):3} p50={timings[len(timings) // 2] * 1000:.1f}ms "
+                  f"max={timings[-1] * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
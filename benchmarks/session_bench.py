@@ -0,0 +1,129 @@
+"""Накладные расходы сессии на один запрос: подписанная cookie против серверных хранилищ.
+
+    python -m benchmarks.session_bench --iterations 5000
+    python -m benchmarks.session_bench --flashes 5 --backends cookie database
+
+Меряется ровно то, что Flask делает с сессией в каждом запросе: open_session по cookie
+из заголовка и save_session в ответ. Сценарии:
+  read  — сессия вошедшего пользователя только читается (обычная страница);
+  write — сессия меняется (flash после POST и его показ на следующей странице);
+  cold  — чтение при пустом LRU процесса (первый запрос в другой воркер), только для серверных.
+--flashes добавляет в сессию столько неразобранных сообщений, чтобы увидеть, как растёт cookie.
+Основная БД и файл сессий — временные файлы SQLite, как у воркера gunicorn.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from http.cookies import SimpleCookie
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.service.session_store import SESSION_BACKENDS, ServerSessionInterface  # noqa: E402
+from benchmarks.http_bench import percentile  # noqa: E402
+from config import TestingConfig  # noqa: E402
+
+# Что кладёт в сессию Flask-Login после входа
+LOGIN_STATE = {'_user_id': '1', '_fresh': True, '_id': 'f' * 128}
+
+
+def make_app(backend, directory):
+    TestingConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, f'app-{backend}.db')}"
+    TestingConfig.DATABASE_ENGINE_PROFILE = 'sqlite'
+    TestingConfig.SESSION_BACKEND = backend
+    TestingConfig.SESSION_SQLITE_PATH = os.path.join(directory, 'sessions.db')
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def cookie_from(app, response, current):
+    for header in response.headers.getlist('Set-Cookie'):
+        cookie = SimpleCookie(header).get(app.config['SESSION_COOKIE_NAME'])
+        if cookie is not None:
+            return cookie.value
+    return current
+
+
+def request_for(app, cookie):
+    builder = EnvironBuilder(path='/equipment/', headers={'Cookie': f"{app.config['SESSION_COOKIE_NAME']}={cookie}"})
+    return app.request_class(builder.get_environ())
+
+
+def initial_cookie(app, flashes):
+    interface = app.session_interface
+    session = interface.open_session(app, app.request_class(EnvironBuilder().get_environ()))
+    session.update(LOGIN_STATE)
+    if flashes:
+        session['_flashes'] = [('info', f'Сообщение {number}: оборудование обновлено') for number in range(flashes)]
+    response = app.response_class()
+    interface.save_session(app, session, response)
+    return cookie_from(app, response, None)
+
+
+def run(app, scenario, iterations, flashes):
+    interface = app.session_interface
+    latencies = []
+    with app.app_context():
+        cookie = initial_cookie(app, flashes)
+        for number in range(iterations):
+            request = request_for(app, cookie)
+            response = app.response_class()
+            if scenario == 'cold':
+                interface.cache.clear()
+            started = time.perf_counter()
+            session = interface.open_session(app, request)
+            if scenario == 'write':
+                if number % 2:
+                    session.pop('_flashes', None)
+                else:
+                    session.setdefault('_flashes', []).append(('success', 'Оборудование успешно добавлено!'))
+                    session.modified = True
+            elif session.get('_user_id') != '1':
+                raise RuntimeError(f"Сессия не прочитана ({scenario})")
+            interface.save_session(app, session, response)
+            latencies.append(time.perf_counter() - started)
+            cookie = cookie_from(app, response, cookie)
+    latencies.sort()
+    return {
+        'p50_us': round(percentile(latencies, 50) * 1e6, 1),
+        'p95_us': round(percentile(latencies, 95) * 1e6, 1),
+        'p99_us': round(percentile(latencies, 99) * 1e6, 1),
+        'cookie_bytes': len(cookie),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', choices=SESSION_BACKENDS, default=list(SESSION_BACKENDS))
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--flashes', type=int, default=0, help='неразобранных flash-сообщений в сессии')
+    parser.add_argument('--output', help='куда записать результаты в JSON')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends:
+            app = make_app(backend, directory)
+            server = isinstance(app.session_interface, ServerSessionInterface)
+            for scenario in ('read', 'write') + (('cold',) if server else ()):
+                result = results[f'{backend}/{scenario}'] = run(app, scenario, args.iterations, args.flashes)
+                print(f"{backend:>8} {scenario:>5}: p50 {result['p50_us']:>7.1f} µs  p95 {result['p95_us']:>7.1f} µs  "
+                      f"p99 {result['p99_us']:>7.1f} µs  cookie {result['cookie_bytes']} B")
+            with app.app_context():
+                db.engine.dispose()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'iterations': args.iterations, 'flashes': args.flashes, 'results': results}, f,
+                      ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
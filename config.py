@@ -2,23 +2,136 @@ import os
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+# Профили настройки движка БД. engine_options уходят в SQLALCHEMY_ENGINE_OPTIONS,
+# pragmas выполняются для каждого нового соединения SQLite
+ENGINE_PROFILES = {
+    'sqlite': {
+        'engine_options': {
+            # Ожидание блокировки на уровне драйвера вместо немедленного "database is locked"
+            'connect_args': {'timeout': 30, 'check_same_thread': False},
+        },
+        'pragmas': {
+            'journal_mode': 'WAL',        # читатели не блокируют писателя и наоборот
+            'synchronous': 'NORMAL',      # в режиме WAL fsync только на checkpoint
+            'busy_timeout': 30000,
+            'mmap_size': 268435456,       # 256 МБ файла БД читаются через mmap
+            'temp_store': 'MEMORY',
+        },
+    },
+    'mysql': {
+        'engine_options': {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': 30,
+            # Меньше wait_timeout MySQL, чтобы не получать "server has gone away"
+            'pool_recycle': 280,
+            'pool_pre_ping': True,
+        },
+    },
+}
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'key1220__Botik__'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     # Абсолютный путь к БД в папке instance
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'sqlite:///{os.path.join(basedir, "instance", "computer_equipment.db")}'
+    # Профиль движка из ENGINE_PROFILES: None, 'sqlite', 'mysql' или 'auto' (по SQLALCHEMY_DATABASE_URI)
+    DATABASE_ENGINE_PROFILE = None
+    # Пагинация списка оборудования
+    EQUIPMENT_PAGE_SIZE = 50
+    EQUIPMENT_MAX_PAGE_SIZE = 500
+    # Сколько секунд живёт снимок статистики дашборда (None — до первой записи)
+    STATS_CACHE_TTL = 30
+    # Политика хэширования паролей: формат метода как у werkzeug.security.generate_password_hash.
+    # При входе хэши с устаревшими параметрами пересчитываются по текущему методу
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # Проверка паролей идёт в отдельном пуле, чтобы шторм логинов не занимал все ядра.
+    # PASSWORD_HASH_HOST_WORKERS — потоков хэширования на всю машину: каждый процесс gunicorn получает
+    # долю, поделённую на WEB_CONCURRENCY (не меньше одного потока). PASSWORD_HASH_WORKERS задаёт пул
+    # процесса явно; очередь PASSWORD_HASH_QUEUE — тоже на процесс
+    PASSWORD_HASH_HOST_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0) or None
+    PASSWORD_HASH_QUEUE = 32
+    PASSWORD_HASH_TIMEOUT = 10
+    # Кэш пользователя для user_loader: сколько секунд живёт запись и сколько записей хранится
+    USER_CACHE_TTL = 60
+    USER_CACHE_SIZE = 1024
+    # Массовый импорт оборудования
+    IMPORT_BATCH_SIZE = 1000
+    IMPORT_MAX_REPORTED_ERRORS = 100
+    # Сколько лучших по релевантности совпадений полнотекстового поиска (SQLite FTS5) соединяется с equipment
+    SEARCH_RANK_CANDIDATES = 2000
+    # Максимум ID в одном массовом обновлении
+    BULK_UPDATE_MAX_IDS = 10000
+    # Потоковая выгрузка: сколько строк читается из курсора за раз
+    EXPORT_BATCH_SIZE = 1000
+    # Линейная амортизация для отчёта о стоимости: срок службы в годах, по умолчанию и по типам
+    DEPRECIATION_USEFUL_LIFE_YEARS = 5
+    DEPRECIATION_USEFUL_LIFE_BY_TYPE = {}
+    # Кэш отрендеренных списков оборудования и пользователей: 'memory' (LRU процесса),
+    # 'disk' (каталог RENDER_CACHE_DIR, по умолчанию instance/render-cache) или None — выключен
+    RENDER_CACHE_BACKEND = os.environ.get('RENDER_CACHE_BACKEND', 'memory') or None
+    RENDER_CACHE_SIZE = 256
+    RENDER_CACHE_TTL = 300
+    RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR')
+    # Инструментирование запросов: Server-Timing, гистограммы Prometheus и предупреждения о N+1
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED') == '1'
+    INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 10
+    INSTRUMENTATION_METRICS_PATH = '/metrics'
+    # Кому отдаются метрики: адреса и сети через запятую и/или Bearer-токен
+    INSTRUMENTATION_METRICS_ALLOW = os.environ.get('INSTRUMENTATION_METRICS_ALLOW', '127.0.0.1,::1')
+    INSTRUMENTATION_METRICS_TOKEN = os.environ.get('INSTRUMENTATION_METRICS_TOKEN')
+    # Фоновые задачи (flask jobs worker): потоков в воркере, опрос очереди и отчёт о прогрессе (секунды),
+    # через сколько секунд без прогресса задача считается брошенной, как часто воркер ищет такие задачи
+    # и сколько дней хранятся завершённые
+    JOB_WORKERS = 2
+    JOB_POLL_INTERVAL = 1.0
+    JOB_PROGRESS_INTERVAL = 1.0
+    JOB_STALE_AFTER = 900
+    JOB_STALE_SWEEP_INTERVAL = 60
+    JOB_RETENTION_DAYS = 7
+    # Каталог загрузок и результатов задач (по умолчанию instance/jobs)
+    JOB_STORAGE_DIR = os.environ.get('JOB_STORAGE_DIR')
+    # Файлы импорта больше этого размера (байт) обрабатываются фоновой задачей
+    IMPORT_INLINE_MAX_BYTES = 1024 * 1024
+    # Хранилище сессий: 'database' (таблица sessions), 'sqlite' (файл SESSION_SQLITE_PATH,
+    # по умолчанию instance/sessions.db) или 'cookie' (подписанная cookie Flask). В серверных
+    # вариантах cookie несёт только id, перед хранилищем — LRU на SESSION_CACHE_SIZE записей
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'database')
+    SESSION_SQLITE_PATH = os.environ.get('SESSION_SQLITE_PATH')
+    SESSION_CACHE_SIZE = 4096
+    SESSION_CACHE_TTL = 300
+    # Сколько секунд после смены id принимается старая cookie и как часто (в сохранениях) чистить истёкшие
+    SESSION_ROTATE_GRACE = 10
+    SESSION_SWEEP_EVERY = 1000
+    # Собранная статика (flask build-assets): каталог сборки (по умолчанию app/static/dist)
+    # и срок кэширования файлов с хэшем в имени, секунды
+    ASSETS_DIR = os.environ.get('ASSETS_DIR')
+    ASSETS_MAX_AGE = 365 * 24 * 3600
+    # Сжатие текстовых ответов (br при установленном brotli, иначе gzip) от COMPRESSION_MIN_SIZE байт
+    # и слабые ETag для HTML-страниц: неизменённая страница отдаётся как 304 без тела
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1') == '1'
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 4
+    COMPRESSION_CACHE_SIZE = 64
+    PAGE_ETAGS_ENABLED = os.environ.get('PAGE_ETAGS_ENABLED', '1') == '1'
 
 class DevelopmentConfig(Config):
     DEBUG = True
 
 class ProductionConfig(Config):
     DEBUG = False
+    DATABASE_ENGINE_PROFILE = os.environ.get('DATABASE_ENGINE_PROFILE') or 'auto'
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    # Дешёвый хэш, чтобы тесты не тратили время на scrypt
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
 
 config = {
     'development': DevelopmentConfig,
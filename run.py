@@ -1,17 +1,13 @@
 from app import create_app, db
-from app.model.user import User, UserRepo
-from app.model.equipment import Equipment
+from app.bootstrap import init_database, seed_admin
 
 app = create_app()
 
-with app.app_context():
-    db.create_all()
-    repo = UserRepo()
-    if not repo.get_by_username('admin'):
-        admin_user = repo.add('admin', 'password123')
-        admin_user.role = 'admin'
-        db.session.commit()
-
 if __name__ == "__main__":
+    # Сервер разработки готовит БД сам; в продакшене это делают `flask init-db` и `flask seed-admin`
+    with app.app_context():
+        init_database()
+        seed_admin()
+        db.engine.dispose()
     # Для Docker важно слушать все интерфейсы
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
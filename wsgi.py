@@ -0,0 +1,7 @@
+import os
+
+from app import create_app
+
+# Точка входа для WSGI-сервера (gunicorn wsgi:app). Импорт не трогает БД: схема и администратор
+# создаются заранее командами `flask init-db` и `flask seed-admin`
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))